@@ -7,13 +7,13 @@ from app.api.schemas.user import UserResponse
 from app.auth.dependencies import get_current_user
 from app.db.crud.application import (
     cancel_user_application,
+    count_applications_by_job,
     create_application,
-    get_applications_by_job,
+    get_applicants_by_job,
     get_applications_by_user,
     get_user_application_for_job,
 )
 from app.db.crud.job import get_job_by_id, get_jobs
-from app.db.crud.user import get_user_by_id
 from app.db.model.user import User
 from app.db.session import get_db
 
@@ -129,16 +129,14 @@ async def get_jobs_with_applicants_dashboard(
     This endpoint is for admins to see an overview of all jobs and how many people applied.
     """
     jobs = get_jobs(db, skip=0, limit=1000)
+    counts = count_applications_by_job(db, [job.id for job in jobs])
     
     jobs_with_counts = []
     for job in jobs:
-        applications = get_applications_by_job(db, job.id)
-        applicant_count = len(applications)
-        
         jobs_with_counts.append(
             JobWithApplicantsCount(
                 job=job,
-                applicants_count=applicant_count
+                applicants_count=counts.get(job.id, 0)
             )
         )
     
@@ -165,19 +163,15 @@ async def get_job_applicants(
             detail="Job not found",
         )
     
-    applications = get_applications_by_job(db, job_id)
-    
     applicants = []
-    for application in applications:
-        user = get_user_by_id(db, application.user_id)
-        if user:
-            applicants.append(
-                ApplicantInfo(
-                    application_id=application.id,
-                    user_id=application.user_id,
-                    applied_at=application.created_at,
-                    user=UserResponse.model_validate(user),
-                )
+    for application, user in get_applicants_by_job(db, job_id):
+        applicants.append(
+            ApplicantInfo(
+                application_id=application.id,
+                user_id=application.user_id,
+                applied_at=application.created_at,
+                user=UserResponse.model_validate(user),
             )
+        )
     
     return applicants
\ No newline at end of file
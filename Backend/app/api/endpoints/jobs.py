@@ -1,14 +1,22 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from app.api.schemas.job import JobCreate, JobResponse, JobUpdate
-from app.api.schemas.recommendation import JobRecommendation
+from app.api.schemas.job import JobCreate, JobResponse, JobSummary, JobUpdate
+from app.api.schemas.recommendation import (
+    ExplainedJobRecommendations,
+    JobRecommendation,
+)
 from app.db.crud.job import create_job as crud_create_job
 from app.db.crud.job import delete_job as crud_delete_job
 from app.db.crud.job import get_job_by_id, get_jobs
 from app.db.crud.job import update_job as crud_update_job
 from app.db.model.job import ExperienceLevel, JobType
 from app.db.session import get_db
+from app.services.embedding_queue import embedding_queue
+from app.services.metrics import metrics
+from app.services.neighbour_service import neighbour_service
+from app.services.ranking_pipeline import RankingTrace
 from app.services.recommendation_service import recommendation_service
+from app.services.tfidf_service import JOBS
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
@@ -41,7 +49,7 @@ async def create_job(job: JobCreate, db: Session = Depends(get_db)):
         )
 
 
-@router.get("/", response_model=List[JobResponse])
+@router.get("/", response_model=Union[List[JobResponse], List[JobSummary]])
 async def list_jobs(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(
@@ -54,6 +62,9 @@ async def list_jobs(
     skills: Optional[str] = Query(
         None, description="Comma-separated list of skills to filter by"
     ),
+    summary: bool = Query(
+        False, description="Return summaries without the job description"
+    ),
     db: Session = Depends(get_db),
 ):
     """
@@ -64,6 +75,7 @@ async def list_jobs(
     - **job_type**: Filter by job type (INTERNSHIP, PART_TIME, FULL_TIME, FREELANCE)
     - **experience_level**: Filter by experience level (STUDENT, ENTRY, JUNIOR)
     - **skills**: Comma-separated list of skills (e.g., "Python,JavaScript")
+    - **summary**: Return lightweight summaries (no description) for large pages
     """
     # Parse skills if provided
     skills_list = None
@@ -77,7 +89,10 @@ async def list_jobs(
         job_type=job_type,
         experience_level=experience_level,
         skills=skills_list,
+        summary=summary,
     )
+    if summary:
+        return [JobSummary.model_validate(row) for row in jobs]
     return jobs
 
 
@@ -142,25 +157,54 @@ async def delete_job(job_id: str, db: Session = Depends(get_db)):
     return {"message": "Job deleted successfully"}
 
 
-@router.get("/{job_id}/similar", response_model=List[JobRecommendation])
+@router.get(
+    "/{job_id}/similar",
+    response_model=Union[List[JobRecommendation], ExplainedJobRecommendations],
+)
 async def get_similar_jobs(
     job_id: str,
     limit: int = Query(
         5, ge=1, le=20, description="Maximum number of similar jobs to return"
     ),
+    ef_search: Optional[int] = Query(
+        None, ge=1, le=1000, description="HNSW search breadth (higher = better recall)"
+    ),
+    probes: Optional[int] = Query(
+        None, ge=1, le=1000, description="IVFFlat probes (higher = better recall)"
+    ),
+    explain: bool = Query(
+        False, description="Return stage timings, SQL plans and scores"
+    ),
     db: Session = Depends(get_db),
 ):
     """
     Get jobs similar to the specified job based on vector similarity.
 
     Returns jobs ranked by similarity to the specified job's content (title, description, skills, experience level).
+    Served from the precomputed neighbour lists unless search tuning is given.
     Each result includes the job details and a similarity score (0-1).
 
     - **job_id**: The unique identifier of the job to find similar jobs for
     - **limit**: Maximum number of similar jobs (default: 5, max: 20)
+    - **ef_search**: Optional HNSW search breadth, trades latency for recall
+    - **probes**: Optional IVFFlat probes, trades latency for recall
+    - **explain**: Query live and wrap the results as
+      `{"results": [...], "explain": {...}}` with wall times, EXPLAIN ANALYZE
+      summaries of the retrieval queries and each job's similarity
     """
+    # Stored neighbour lists answer with one indexed lookup; explicit search
+    # tuning, explain mode or a missing list falls through to a live vector query
+    trace = RankingTrace() if explain else None
+    if trace is None and ef_search is None and probes is None:
+        results = neighbour_service.get_similar(db, JOBS, job_id, limit)
+        if results:
+            return [
+                JobRecommendation(job=similar_job, similarity_score=max(score, 0.0))
+                for similar_job, score in results
+            ]
+
     # Get the specified job
-    job = get_job_by_id(db, job_id)
+    job = get_job_by_id(db, job_id, with_embedding=True)
     if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -169,6 +213,12 @@ async def get_similar_jobs(
 
     # Check if job has an embedding
     if job.embedding is None:
+        if embedding_queue.is_pending(db, JOBS, job_id):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Job embedding is being computed. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Job embedding not available",
@@ -176,13 +226,24 @@ async def get_similar_jobs(
 
     # Get similar jobs using cosine similarity
     results = recommendation_service.get_similar_jobs(
-        db=db, job_embedding=job.embedding, exclude_job_id=job_id, limit=limit
+        db=db,
+        job_embedding=job.embedding,
+        exclude_job_id=job_id,
+        limit=limit,
+        ef_search=ef_search,
+        probes=probes,
+        trace=trace,
     )
 
     # Format response with similarity scores
-    recommendations = [
-        JobRecommendation(job=similar_job, similarity_score=score)
-        for similar_job, score in results
-    ]
+    with metrics.time("similar.jobs.serialize", trace):
+        recommendations = [
+            JobRecommendation(job=similar_job, similarity_score=max(score, 0.0))
+            for similar_job, score in results
+        ]
+    if trace is not None:
+        return ExplainedJobRecommendations(
+            results=recommendations, explain=trace.finish(db)
+        )
 
     return recommendations
@@ -2,106 +2,428 @@
 API endpoints for personalized recommendations based on vector similarity.
 """
 
-from typing import Annotated, List
+import json
+from typing import Annotated, List, Optional, Union
 
-from app.api.schemas.recommendation import JobRecommendation, ResourceRecommendation
+from app.api.schemas.recommendation import (
+    BatchJobRecommendation,
+    BatchRecommendationRequest,
+    ExplainedJobRecommendations,
+    ExplainedResourceRecommendations,
+    JobRecommendation,
+    ResourceRecommendation,
+)
 from app.auth.dependencies import get_current_user
+from app.core.config import settings
 from app.core.exceptions import EmbeddingNotAvailableError
 from app.db.model.user import User
-from app.db.session import get_db
-from app.services.recommendation_service import recommendation_service
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.db.session import SessionLocal, get_db
+from app.services.embedding_cache import embedding_cache
+from app.services.embedding_queue import USERS, embedding_queue
+from app.services.embedding_service import embedding_service
+from app.services.metrics import metrics
+from app.services.ranking_pipeline import RankingTrace
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_service import (
+    DEFAULT_EMBEDDING_WEIGHT,
+    DEFAULT_TFIDF_WEIGHT,
+    recommendation_service,
+)
+from app.services.recommendation_store import recommendation_store
+from app.services.skill_index import skill_index
+from app.services.tfidf_service import JOBS, RESOURCES
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
 
-@router.get("/jobs", response_model=List[JobRecommendation])
+def _cache_lookup(kind: str, user: User, response: Response, if_none_match, **params):
+    """
+    Look up a cached recommendation response and set its ETag
+
+    Returns:
+        Tuple of (cache key, cached value or a 304 Response, or None on a miss)
+    """
+    key = recommendation_cache.make_key(
+        kind,
+        user.embedding,
+        user.id,
+        embedding_weight=DEFAULT_EMBEDDING_WEIGHT,
+        tfidf_weight=DEFAULT_TFIDF_WEIGHT,
+        **params,
+    )
+    etag = f'"{key}"'
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    cached = recommendation_cache.get(key)
+    if cached is not None and if_none_match:
+        # Only answer 304 while the entry is cached, so the TTL also bounds
+        # how long another worker's stale version can be confirmed
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return key, Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers)
+            )
+    return key, cached
+
+
+@router.get(
+    "/jobs",
+    response_model=Union[List[JobRecommendation], ExplainedJobRecommendations],
+)
 async def get_job_recommendations(
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(
         10, ge=1, le=50, description="Maximum number of recommendations to return"
     ),
+    ef_search: Optional[int] = Query(
+        None, ge=1, le=1000, description="HNSW search breadth (higher = better recall)"
+    ),
+    probes: Optional[int] = Query(
+        None, ge=1, le=1000, description="IVFFlat probes (higher = better recall)"
+    ),
+    diversity: Optional[float] = Query(
+        None, ge=0, le=1, description="MMR trade-off: 0 = by score, 1 = most diverse"
+    ),
+    max_per_company: Optional[int] = Query(
+        None, ge=1, le=50, description="Maximum jobs from one company"
+    ),
+    explain: bool = Query(
+        False, description="Return stage timings, SQL plans and component scores"
+    ),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Get personalized job recommendations for the authenticated user.
 
     Uses a hybrid approach combining:
-    - **TF-IDF** (40%): Keyword-based similarity for exact skill/term matching
+    - **Keywords** (40%): Full-text (or TF-IDF) matching of skills and terms
     - **Vector Embeddings** (60%): Semantic similarity for contextual understanding
+    - **Skill overlap**: Jaccard similarity of the user's and the job's skills
 
     Returns jobs ranked by combined similarity score to the user's profile (skills, education, career track).
+    Each job lists the required skills the user already has and the ones they lack.
+    Results are served from the precomputed per-user store while it is fresh.
+    Responses carry an ETag; repeat requests sending it in `If-None-Match` get
+    a 304 while the catalog and the profile are unchanged.
     Each result includes the job details and a similarity score (0-1).
 
     - **limit**: Maximum number of recommendations (default: 10, max: 50)
+    - **ef_search**: Optional HNSW search breadth, trades latency for recall
+    - **probes**: Optional IVFFlat probes, trades latency for recall
+    - **diversity**: Optional MMR weight (0-1); higher values penalize results
+      similar to ones already listed
+    - **max_per_company**: Optional cap on results from one company
+    - **explain**: Rank live (no cache or store) and wrap the results as
+      `{"results": [...], "explain": {...}}` with per-stage wall times and
+      candidate counts, EXPLAIN ANALYZE summaries of the retrieval queries and
+      each job's vector, keyword, fused and skill scores
 
     Requires authentication.
     """
     # Check if user has an embedding
     if current_user.embedding is None:
+        if embedding_queue.is_pending(db, USERS, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="User profile embedding is being computed. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User profile embedding not available. Please update your profile.",
         )
 
-    # Get recommended jobs using hybrid TF-IDF + vector similarity
-    results = recommendation_service.get_recommended_jobs(
-        db=db,
-        user_embedding=current_user.embedding,
-        user=current_user,  # Pass user for TF-IDF calculation
-        limit=limit,
-    )
+    # Repeat loads are answered from the result cache (or with a 304);
+    # explain mode always ranks live
+    trace = RankingTrace() if explain else None
+    if trace is None:
+        key, cached = _cache_lookup(
+            JOBS,
+            current_user,
+            response,
+            if_none_match,
+            limit=limit,
+            ef_search=ef_search,
+            probes=probes,
+            diversity=diversity,
+            max_per_company=max_per_company,
+        )
+        if cached is not None:
+            return cached
 
-    # Format response with similarity scores
-    recommendations = [
-        JobRecommendation(job=job, similarity_score=score) for job, score in results
-    ]
+    # Get recommended jobs using hybrid TF-IDF + vector similarity. Explicit
+    # search tuning or diversification bypasses the materialized store.
+    with metrics.time("recommendations.jobs.results"):
+        if trace is None and all(
+            option is None for option in (ef_search, probes, diversity, max_per_company)
+        ):
+            results = recommendation_store.get_recommendations(
+                db, current_user, JOBS, limit
+            )
+        else:
+            results = recommendation_service.get_recommended_jobs(
+                db=db,
+                user_embedding=current_user.embedding,
+                user=current_user,  # Pass user for TF-IDF calculation
+                limit=limit,
+                ef_search=ef_search,
+                probes=probes,
+                diversity=diversity or 0.0,
+                max_per_company=max_per_company,
+                trace=trace,
+            )
+
+    # Format response with similarity scores (clamped to the schema's 0-1
+    # range; deep filtered candidates can have a slightly negative cosine).
+    # Skill explanations come from the in-memory bitsets, not the DB.
+    with metrics.time("recommendations.jobs.serialize", trace):
+        skill_index.ensure_loaded(db)
+        explanations = skill_index.explain(
+            current_user.skills, [job.id for job, _ in results]
+        )
+        recommendations = [
+            JobRecommendation(
+                job=job,
+                similarity_score=max(score, 0.0),
+                matched_skills=matched,
+                missing_skills=missing,
+            )
+            for (job, score), (matched, missing) in zip(results, explanations)
+        ]
+    if trace is not None:
+        return ExplainedJobRecommendations(
+            results=recommendations, explain=trace.finish(db)
+        )
+    recommendation_cache.put(key, recommendations)
 
     return recommendations
 
 
-@router.get("/resources", response_model=List[ResourceRecommendation])
+@router.get(
+    "/resources",
+    response_model=Union[List[ResourceRecommendation], ExplainedResourceRecommendations],
+)
 async def get_resource_recommendations(
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(
         10, ge=1, le=50, description="Maximum number of recommendations to return"
     ),
+    ef_search: Optional[int] = Query(
+        None, ge=1, le=1000, description="HNSW search breadth (higher = better recall)"
+    ),
+    probes: Optional[int] = Query(
+        None, ge=1, le=1000, description="IVFFlat probes (higher = better recall)"
+    ),
+    diversity: Optional[float] = Query(
+        None, ge=0, le=1, description="MMR trade-off: 0 = by score, 1 = most diverse"
+    ),
+    max_per_platform: Optional[int] = Query(
+        None, ge=1, le=50, description="Maximum resources from one platform"
+    ),
+    explain: bool = Query(
+        False, description="Return stage timings, SQL plans and component scores"
+    ),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Get personalized learning resource recommendations for the authenticated user.
 
     Uses a hybrid approach combining:
-    - **TF-IDF** (40%): Keyword-based similarity for exact skill/term matching
+    - **Keywords** (40%): Full-text (or TF-IDF) matching of skills and terms
     - **Vector Embeddings** (60%): Semantic similarity for contextual understanding
 
     Returns resources ranked by combined similarity score to the user's profile (skills, education, career track).
+    Results are served from the precomputed per-user store while it is fresh.
+    Responses carry an ETag; repeat requests sending it in `If-None-Match` get
+    a 304 while the catalog and the profile are unchanged.
     Each result includes the resource details and a similarity score (0-1).
 
     - **limit**: Maximum number of recommendations (default: 10, max: 50)
+    - **ef_search**: Optional HNSW search breadth, trades latency for recall
+    - **probes**: Optional IVFFlat probes, trades latency for recall
+    - **diversity**: Optional MMR weight (0-1); higher values penalize results
+      similar to ones already listed
+    - **max_per_platform**: Optional cap on results from one platform
+    - **explain**: Rank live (no cache or store) and wrap the results as
+      `{"results": [...], "explain": {...}}` with per-stage wall times and
+      candidate counts, EXPLAIN ANALYZE summaries of the retrieval queries and
+      each resource's vector, keyword and fused scores
 
     Requires authentication.
     """
     # Check if user has an embedding
     if current_user.embedding is None:
+        if embedding_queue.is_pending(db, USERS, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="User profile embedding is being computed. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User profile embedding not available. Please update your profile.",
         )
 
-    # Get recommended resources using hybrid TF-IDF + vector similarity
-    results = recommendation_service.get_recommended_resources(
-        db=db,
-        user_embedding=current_user.embedding,
-        user=current_user,  # Pass user for TF-IDF calculation
-        limit=limit,
-    )
+    # Repeat loads are answered from the result cache (or with a 304);
+    # explain mode always ranks live
+    trace = RankingTrace() if explain else None
+    if trace is None:
+        key, cached = _cache_lookup(
+            RESOURCES,
+            current_user,
+            response,
+            if_none_match,
+            limit=limit,
+            ef_search=ef_search,
+            probes=probes,
+            diversity=diversity,
+            max_per_platform=max_per_platform,
+        )
+        if cached is not None:
+            return cached
 
-    # Format response with similarity scores
-    recommendations = [
-        ResourceRecommendation(resource=resource, similarity_score=score)
-        for resource, score in results
-    ]
+    # Get recommended resources using hybrid TF-IDF + vector similarity.
+    # Explicit search tuning or diversification bypasses the materialized store.
+    with metrics.time("recommendations.resources.results"):
+        if trace is None and all(
+            option is None for option in (ef_search, probes, diversity, max_per_platform)
+        ):
+            results = recommendation_store.get_recommendations(
+                db, current_user, RESOURCES, limit
+            )
+        else:
+            results = recommendation_service.get_recommended_resources(
+                db=db,
+                user_embedding=current_user.embedding,
+                user=current_user,  # Pass user for TF-IDF calculation
+                limit=limit,
+                ef_search=ef_search,
+                probes=probes,
+                diversity=diversity or 0.0,
+                max_per_platform=max_per_platform,
+                trace=trace,
+            )
+
+    # Format response with similarity scores (clamped to the schema's 0-1 range)
+    with metrics.time("recommendations.resources.serialize", trace):
+        recommendations = [
+            ResourceRecommendation(resource=resource, similarity_score=max(score, 0.0))
+            for resource, score in results
+        ]
+    if trace is not None:
+        return ExplainedResourceRecommendations(
+            results=recommendations, explain=trace.finish(db)
+        )
+    recommendation_cache.put(key, recommendations)
 
     return recommendations
+
+
+@router.get("/cache/stats")
+def get_recommendation_cache_stats():
+    """
+    Admin: hit/miss counters and size of the recommendation result cache.
+    """
+    return recommendation_cache.stats()
+
+
+@router.get("/embedding-cache/stats")
+def get_embedding_cache_stats():
+    """
+    Admin: hit rates of the embedding cache (in-memory and table tiers).
+    """
+    return embedding_cache.stats()
+
+
+@router.get("/embedding-pool/stats")
+def get_embedding_pool_stats():
+    """
+    Admin: embedding model sessions, how many are idle or waited for, and
+    texts embedded. Checkout wait and model run times are under
+    `embedding_pool.wait` / `embedding_pool.run` in /recommendations/metrics.
+    """
+    return embedding_service.pool_stats()
+
+
+@router.get("/embedding-batcher/stats")
+def get_embedding_batcher_stats():
+    """
+    Admin: micro-batching of concurrent embedding requests - histograms of
+    texts per coalesced model call and of the time requests queued (null
+    when EMBEDDING_MICROBATCH_ENABLED is off).
+    """
+    return embedding_service.batcher_stats()
+
+
+@router.get("/embedding-queue/stats")
+def get_embedding_queue_stats(db: Session = Depends(get_db)):
+    """
+    Admin: background embedding queue depth, lag and failed tasks.
+
+    `ready` tasks wait for a worker and `oldest_ready_age_seconds` is how far
+    behind the workers are; `delayed` tasks wait for a retry and `dead` ones
+    gave up after EMBEDDING_QUEUE_MAX_ATTEMPTS. Enqueue-to-embedding lag
+    percentiles are under `embedding_queue.lag` in /recommendations/metrics.
+    """
+    return embedding_queue.stats(db)
+
+
+@router.get("/metrics")
+def get_recommendation_metrics():
+    """
+    Admin: latency percentiles of the recommendation paths.
+
+    One entry per ranking stage (`ranking.<kind>.<stage>`), similar-items
+    lookup and endpoint phase, with count, mean, p50, p95, p99 and max in
+    milliseconds over the most recent samples of this worker.
+    """
+    return metrics.snapshot()
+
+
+@router.post("/batch/jobs")
+def get_batch_job_recommendations(
+    request: BatchRecommendationRequest,
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    """
+    Admin: compute job recommendations for many users in one run.
+
+    Users are scored in blocks with one matrix multiply per block, and results
+    stream back as NDJSON, one `BatchJobRecommendation` object per line.
+    Requires authentication as one of RECOMMENDATION_BATCH_ADMINS (the
+    endpoint is disabled while that list is empty).
+
+    - **user_ids**: Users to score, at most 1000 (omit to score every user
+      with an embedding)
+    - **limit**: Recommendations per user (default: 10, max: 50)
+    """
+    if current_user.email not in settings.RECOMMENDATION_BATCH_ADMINS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Batch recommendations are restricted to administrators",
+        )
+
+    def stream():
+        # The streaming body outlives the request dependencies, so it uses
+        # its own session
+        db = SessionLocal()
+        try:
+            for chunk in recommendation_service.iter_batch_recommended_jobs(
+                db, user_ids=request.user_ids, limit=request.limit
+            ):
+                yield "".join(
+                    json.dumps(BatchJobRecommendation(**result).model_dump()) + "\n"
+                    for result in chunk
+                )
+        finally:
+            db.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,13 +1,26 @@
-from typing import List, Optional
-
-from app.api.schemas.recommendation import ResourceRecommendation
-from app.api.schemas.resources import ResourceCreate, ResourceResponse, ResourceUpdate
+from typing import List, Optional, Union
+
+from app.api.schemas.recommendation import (
+    ExplainedResourceRecommendations,
+    ResourceRecommendation,
+)
+from app.api.schemas.resources import (
+    ResourceCreate,
+    ResourceResponse,
+    ResourceSummary,
+    ResourceUpdate,
+)
 from app.db.crud.resources import create_resource as crud_create_resource
 from app.db.crud.resources import delete_resource as crud_delete_resource
 from app.db.crud.resources import get_resource_by_id, get_resources
 from app.db.crud.resources import update_resource as crud_update_resource
 from app.db.session import get_db
+from app.services.embedding_queue import embedding_queue
+from app.services.metrics import metrics
+from app.services.neighbour_service import neighbour_service
+from app.services.ranking_pipeline import RankingTrace
 from app.services.recommendation_service import recommendation_service
+from app.services.tfidf_service import RESOURCES
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
@@ -36,7 +49,7 @@ async def create_resource(resource: ResourceCreate, db: Session = Depends(get_db
         )
 
 
-@router.get("/", response_model=List[ResourceResponse])
+@router.get("/", response_model=Union[List[ResourceResponse], List[ResourceSummary]])
 async def list_resources(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(
@@ -45,6 +58,9 @@ async def list_resources(
     tags: Optional[str] = Query(
         None, description="Comma-separated list of tags to filter by"
     ),
+    summary: bool = Query(
+        False, description="Return summaries without the resource description"
+    ),
     db: Session = Depends(get_db),
 ):
     """
@@ -53,6 +69,7 @@ async def list_resources(
     - **skip**: Number of records to skip (for pagination)
     - **limit**: Maximum number of records to return (default: 100, max: 1000)
     - **tags**: Comma-separated list of tags (e.g., "Python,Web Development")
+    - **summary**: Return lightweight summaries (no description) for large pages
     """
     # Parse tags if provided
     tags_list = None
@@ -64,7 +81,10 @@ async def list_resources(
         skip=skip,
         limit=limit,
         tags=tags_list,
+        summary=summary,
     )
+    if summary:
+        return [ResourceSummary.model_validate(row) for row in resources]
     return resources
 
 
@@ -132,25 +152,56 @@ async def delete_resource(resource_id: str, db: Session = Depends(get_db)):
     return {"message": "Resource deleted successfully"}
 
 
-@router.get("/{resource_id}/similar", response_model=List[ResourceRecommendation])
+@router.get(
+    "/{resource_id}/similar",
+    response_model=Union[List[ResourceRecommendation], ExplainedResourceRecommendations],
+)
 async def get_similar_resources(
     resource_id: str,
     limit: int = Query(
         5, ge=1, le=20, description="Maximum number of similar resources to return"
     ),
+    ef_search: Optional[int] = Query(
+        None, ge=1, le=1000, description="HNSW search breadth (higher = better recall)"
+    ),
+    probes: Optional[int] = Query(
+        None, ge=1, le=1000, description="IVFFlat probes (higher = better recall)"
+    ),
+    explain: bool = Query(
+        False, description="Return stage timings, SQL plans and scores"
+    ),
     db: Session = Depends(get_db),
 ):
     """
     Get learning resources similar to the specified resource based on vector similarity.
 
     Returns resources ranked by similarity to the specified resource's content (name, description, tags).
+    Served from the precomputed neighbour lists unless search tuning is given.
     Each result includes the resource details and a similarity score (0-1).
 
     - **resource_id**: The unique identifier of the resource to find similar resources for
     - **limit**: Maximum number of similar resources (default: 5, max: 20)
+    - **ef_search**: Optional HNSW search breadth, trades latency for recall
+    - **probes**: Optional IVFFlat probes, trades latency for recall
+    - **explain**: Query live and wrap the results as
+      `{"results": [...], "explain": {...}}` with wall times, EXPLAIN ANALYZE
+      summaries of the retrieval queries and each resource's similarity
     """
+    # Stored neighbour lists answer with one indexed lookup; explicit search
+    # tuning, explain mode or a missing list falls through to a live vector query
+    trace = RankingTrace() if explain else None
+    if trace is None and ef_search is None and probes is None:
+        results = neighbour_service.get_similar(db, RESOURCES, resource_id, limit)
+        if results:
+            return [
+                ResourceRecommendation(
+                    resource=similar_resource, similarity_score=max(score, 0.0)
+                )
+                for similar_resource, score in results
+            ]
+
     # Get the specified resource
-    resource = get_resource_by_id(db, resource_id)
+    resource = get_resource_by_id(db, resource_id, with_embedding=True)
     if not resource:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -159,6 +210,12 @@ async def get_similar_resources(
 
     # Check if resource has an embedding
     if resource.embedding is None:
+        if embedding_queue.is_pending(db, RESOURCES, resource_id):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Resource embedding is being computed. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Resource embedding not available",
@@ -170,12 +227,22 @@ async def get_similar_resources(
         resource_embedding=resource.embedding,
         exclude_resource_id=resource_id,
         limit=limit,
+        ef_search=ef_search,
+        probes=probes,
+        trace=trace,
     )
 
     # Format response with similarity scores
-    recommendations = [
-        ResourceRecommendation(resource=similar_resource, similarity_score=score)
-        for similar_resource, score in results
-    ]
+    with metrics.time("similar.resources.serialize", trace):
+        recommendations = [
+            ResourceRecommendation(
+                resource=similar_resource, similarity_score=max(score, 0.0)
+            )
+            for similar_resource, score in results
+        ]
+    if trace is not None:
+        return ExplainedResourceRecommendations(
+            results=recommendations, explain=trace.finish(db)
+        )
 
     return recommendations
@@ -105,6 +105,23 @@ class JobResponse(BaseModel):
         from_attributes = True  # For SQLAlchemy ORM compatibility
 
 
+# Schema for job list summaries (no description, for large list pages)
+class JobSummary(BaseModel):
+    id: str
+    title: str
+    company: str
+    job_type: JobType
+    job_location: Optional[JobLocation]
+    required_skills: List[str]
+    recommended_experience_level: ExperienceLevel
+    salary_range_min: Optional[float]
+    salary_range_max: Optional[float]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Schema for job in database (internal use, same as response for now)
 class JobInDB(JobResponse):
     id: str = Field(default_factory=lambda: str(uuid4()))
@@ -2,10 +2,15 @@
 Pydantic schemas for recommendation responses with similarity scores.
 """
 
+from typing import List, Optional
+
 from app.api.schemas.job import JobResponse
 from app.api.schemas.resources import ResourceResponse
 from pydantic import BaseModel, Field
 
+# Users per batch recommendation request
+MAX_BATCH_USERS = 1000
+
 
 class JobRecommendation(BaseModel):
     """Job with similarity score"""
@@ -14,6 +19,12 @@ class JobRecommendation(BaseModel):
     similarity_score: float = Field(
         ..., ge=0, le=1, description="Cosine similarity score between 0 and 1"
     )
+    matched_skills: List[str] = Field(
+        default_factory=list, description="Required skills the user already has"
+    )
+    missing_skills: List[str] = Field(
+        default_factory=list, description="Required skills the user lacks"
+    )
 
     class Config:
         from_attributes = True
@@ -29,3 +40,84 @@ class ResourceRecommendation(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class BatchRecommendationRequest(BaseModel):
+    """Users to score in a batch recommendation run"""
+
+    user_ids: Optional[List[str]] = Field(
+        None,
+        max_length=MAX_BATCH_USERS,
+        description="User IDs to score (default: every user with an embedding)",
+    )
+    limit: int = Field(10, ge=1, le=50, description="Recommendations per user")
+
+
+class ScoredJob(BaseModel):
+    """Job ID with similarity score (batch results carry no job details)"""
+
+    job_id: str
+    similarity_score: float
+
+
+class BatchJobRecommendation(BaseModel):
+    """Top jobs for one user in a batch run (one NDJSON line per user)"""
+
+    user_id: str
+    recommendations: List[ScoredJob]
+
+
+class StageTiming(BaseModel):
+    """Wall time of one ranking stage in explain mode"""
+
+    name: str
+    ms: float
+    candidates: Optional[int] = Field(
+        None, description="Candidates left after the stage"
+    )
+
+
+class QueryPlan(BaseModel):
+    """Condensed EXPLAIN ANALYZE of one retrieval query"""
+
+    query: str
+    planning_ms: Optional[float] = None
+    execution_ms: Optional[float] = None
+    nodes: List[str] = Field(default_factory=list, description="One line per plan node")
+
+
+class ItemScores(BaseModel):
+    """Component scores of one returned item"""
+
+    id: str
+    vector: float = Field(..., description="Cosine similarity to the profile")
+    lexical: Optional[float] = Field(None, description="Full-text or TF-IDF score")
+    fused: Optional[float] = Field(None, description="Vector and keyword scores combined")
+    skill: Optional[float] = Field(None, description="Jaccard skill overlap (jobs)")
+    score: float = Field(..., description="Final ranking score")
+
+
+class RankingExplain(BaseModel):
+    """Per-request diagnostics of explain mode"""
+
+    total_ms: float
+    stages: List[StageTiming]
+    plans: List[QueryPlan]
+    items: List[ItemScores]
+    degraded: List[str] = Field(
+        default_factory=list, description="Stages that gave up on their time budget"
+    )
+
+
+class ExplainedJobRecommendations(BaseModel):
+    """Job recommendations with their ranking diagnostics (explain=true)"""
+
+    results: List[JobRecommendation]
+    explain: RankingExplain
+
+
+class ExplainedResourceRecommendations(BaseModel):
+    """Resource recommendations with their ranking diagnostics (explain=true)"""
+
+    results: List[ResourceRecommendation]
+    explain: RankingExplain
@@ -45,6 +45,21 @@ class ResourceResponse(BaseModel):
         from_attributes = True  # For SQLAlchemy ORM compatibility
 
 
+# Schema for resource list summaries (no description, for large list pages)
+class ResourceSummary(BaseModel):
+    id: str
+    name: str
+    url: str
+    tags: List[str]
+    pricing: Optional[str] = None
+    platform: Optional[str] = None
+    duration: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Schema for resource in database (internal use, same as response for now)
 class ResourceInDB(ResourceResponse):
     pass
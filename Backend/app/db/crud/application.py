@@ -1,5 +1,22 @@
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, defer
 from app.db.model.application import ApplicationList
+from app.db.model.user import User
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_store import recommendation_store
+from app.services.tfidf_service import JOBS
+
+
+def _sync_user_recommendations(user_id: str, job_id: str, applied: bool):
+    """Keep a user's recommendations free of jobs they applied to"""
+    if applied:
+        recommendation_store.remove_item(JOBS, job_id, user_id=user_id)
+    else:
+        # The job may belong back in the list; recompute on next read
+        recommendation_store.invalidate_user(user_id, JOBS)
+    recommendation_cache.bump_user(user_id)
 
 
 def create_application(db: Session, user_id: str, job_id: str):
@@ -8,6 +25,7 @@ def create_application(db: Session, user_id: str, job_id: str):
     db.add(application)
     db.commit()
     db.refresh(application)
+    _sync_user_recommendations(user_id, job_id, applied=True)
     return application
 
 
@@ -29,6 +47,30 @@ def get_applications_by_job(db: Session, job_id: str):
     return db.query(ApplicationList).filter(ApplicationList.job_id == job_id).all()
 
 
+def count_applications_by_job(
+    db: Session, job_ids: Optional[List[str]] = None
+) -> Dict[str, int]:
+    """Map job ID -> number of applications, in one grouped query"""
+    query = db.query(ApplicationList.job_id, func.count(ApplicationList.id)).group_by(
+        ApplicationList.job_id
+    )
+    if job_ids is not None:
+        query = query.filter(ApplicationList.job_id.in_(job_ids))
+    return dict(query.all())
+
+
+def get_applicants_by_job(db: Session, job_id: str) -> List[Tuple[ApplicationList, User]]:
+    """Get (application, user) pairs for a job in one joined query, without
+    loading the users' embeddings"""
+    return (
+        db.query(ApplicationList, User)
+        .join(User, User.id == ApplicationList.user_id)
+        .filter(ApplicationList.job_id == job_id)
+        .options(defer(User.embedding))
+        .all()
+    )
+
+
 def get_applications_by_user(db: Session, user_id: str):
     """Get all applications made by a specific user"""
     return db.query(ApplicationList).filter(ApplicationList.user_id == user_id).all()
@@ -38,8 +80,10 @@ def delete_application(db: Session, application_id: str):
     """Delete an application by ID"""
     application = get_application(db, application_id)
     if application:
+        user_id, job_id = application.user_id, application.job_id
         db.delete(application)
         db.commit()
+        _sync_user_recommendations(user_id, job_id, applied=False)
         return True
     return False
 
@@ -50,6 +94,7 @@ def cancel_user_application(db: Session, user_id: str, job_id: str):
     if application:
         db.delete(application)
         db.commit()
+        _sync_user_recommendations(user_id, job_id, applied=False)
         return True
     return False
 
@@ -3,41 +3,106 @@ import uuid
 from typing import Optional
 
 from app.core.exceptions import EmbeddingGenerationError
+from app.db.fulltext import to_search_vector
 from app.db.model.job import ExperienceLevel, Job, JobType
+from app.services.ann_index import ann_service
+from app.services.embedding_queue import embedding_queue
 from app.services.embedding_service import embedding_service
-from sqlalchemy.orm import Session
-from sqlalchemy import func, cast
-from sqlalchemy.dialects.postgresql import ARRAY
-from sqlalchemy.types import String
+from app.services.neighbour_service import neighbour_service
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_store import recommendation_store
+from app.services.skill_dictionary import skill_dictionary
+from app.services.skill_index import skill_index
+from app.services.tfidf_service import JOBS, job_text_func, tfidf_service
+from sqlalchemy.orm import Session, undefer
 
 logger = logging.getLogger(__name__)
 
+# Columns of the list-view summary projection (no description, no embedding)
+JOB_SUMMARY_COLUMNS = (
+    Job.id,
+    Job.title,
+    Job.company,
+    Job.job_type,
+    Job.job_location,
+    Job.required_skills,
+    Job.recommended_experience_level,
+    Job.salary_range_min,
+    Job.salary_range_max,
+    Job.created_at,
+)
+
+# Job columns that job_filters() / job_matches_user() check against user preferences
+FILTER_FIELDS = ("job_type", "job_location", "recommended_experience_level")
+
+
+def _sync_job_indexes(db_job: Job):
+    """Propagate a job write to the in-process indexes, stored lists and result cache"""
+    tfidf_service.upsert(JOBS, db_job.id, job_text_func(db_job))
+    skill_index.upsert(db_job.id, db_job.required_skills)
+    if embedding_queue.enabled:
+        # The embedding worker calls sync_job_embedding once the job is embedded
+        recommendation_cache.bump_version(JOBS)
+    else:
+        sync_job_embedding(db_job)
+
+
+def sync_job_embedding(db_job: Job):
+    """Propagate a new job embedding to the ANN index, stored lists and result cache"""
+    ann_service.upsert(JOBS, db_job.id, db_job.embedding)
+    neighbour_service.on_item_changed(JOBS, db_job)
+    recommendation_store.on_item_changed(JOBS, db_job)
+    recommendation_cache.bump_version(JOBS)
+
+
+def _remove_job_from_indexes(job_id: str):
+    """Drop a deleted job from the in-process indexes, stored lists and result cache"""
+    tfidf_service.remove(JOBS, job_id)
+    ann_service.remove(JOBS, job_id)
+    skill_index.remove(job_id)
+    neighbour_service.remove_item(JOBS, job_id)
+    recommendation_store.remove_item(JOBS, job_id)
+    recommendation_cache.bump_version(JOBS)
+
 
 def create_job(db: Session, job_data: dict):
     """Create a new job listing"""
     db_job = Job(id=str(uuid.uuid4()), **job_data)
+    db_job.search_vector = to_search_vector(job_text_func(db_job))
+    db_job.required_skill_ids = skill_dictionary.resolve(db, db_job.required_skills)
 
     db.add(db_job)
+    if embedding_queue.enabled:
+        # Embedded by the background worker, committed with the job
+        embedding_queue.enqueue(db, JOBS, db_job.id)
     db.commit()
     db.refresh(db_job)
 
-    # Generate and store embedding
-    try:
-        embedding = embedding_service.generate_job_embedding(db_job)
-        db_job.embedding = embedding
-        db.commit()
-        db.refresh(db_job)
-        logger.info(f"Successfully generated embedding for job {db_job.id}")
-    except EmbeddingGenerationError as e:
-        logger.error(f"Failed to generate embedding for job {db_job.id}: {e}")
-        # Continue without embedding - job creation should not fail
+    if embedding_queue.enabled:
+        embedding_queue.notify()
+    else:
+        # Generate and store embedding
+        try:
+            embedding = embedding_service.generate_job_embedding(db_job)
+            embedding_service.store_embedding(db_job, embedding)
+            db.commit()
+            db.refresh(db_job)
+            logger.info(f"Successfully generated embedding for job {db_job.id}")
+        except EmbeddingGenerationError as e:
+            logger.error(f"Failed to generate embedding for job {db_job.id}: {e}")
+            # Continue without embedding - job creation should not fail
+
+    _sync_job_indexes(db_job)
 
     return db_job
 
 
-def get_job_by_id(db: Session, job_id: str):
-    """Get job by ID"""
-    return db.query(Job).filter(Job.id == job_id).first()
+def get_job_by_id(db: Session, job_id: str, with_embedding: bool = False):
+    """Get job by ID (the deferred embedding is loaded only if requested)"""
+    query = db.query(Job).filter(Job.id == job_id)
+    if with_embedding:
+        query = query.options(undefer(Job.embedding))
+    return query.first()
 
 
 def get_jobs(
@@ -47,9 +112,15 @@ def get_jobs(
     job_type: Optional[JobType] = None,
     experience_level: Optional[ExperienceLevel] = None,
     skills: Optional[list[str]] = None,
+    summary: bool = False,
 ):
-    """Get jobs with optional filtering"""
-    query = db.query(Job)
+    """
+    Get jobs with optional filtering
+
+    With summary=True only JOB_SUMMARY_COLUMNS are selected and plain rows
+    are returned instead of ORM objects.
+    """
+    query = db.query(*JOB_SUMMARY_COLUMNS) if summary else db.query(Job)
 
     if job_type:
         query = query.filter(Job.job_type == job_type)
@@ -58,9 +129,12 @@ def get_jobs(
         query = query.filter(Job.recommended_experience_level == experience_level)
 
     if skills:
-        # Use PostgreSQL && (overlap) operator for array matching
-        # This checks if any of the user's skills match any of the job's required skills
-        query = query.filter(Job.required_skills.op('&&')(cast(skills, ARRAY(String))))
+        # Overlap (&&) on the GIN-indexed canonical skill ids, so "python",
+        # "Python " and "Python3" all match a job requiring "Python"
+        skill_ids = skill_dictionary.resolve(db, skills, create=False)
+        if not skill_ids:
+            return []
+        query = query.filter(Job.required_skill_ids.overlap(skill_ids))
 
     return query.offset(skip).limit(limit).all()
 
@@ -71,35 +145,56 @@ def update_job(db: Session, job_id: str, update_data: dict):
     if not job:
         return None
 
-    # Check if embedding-relevant fields are being updated
-    embedding_fields = {
-        "title",
-        "description",
-        "required_skills",
-        "recommended_experience_level",
-    }
-    should_regenerate_embedding = any(
-        field in update_data for field in embedding_fields
-    )
-
+    old_text = job_text_func(job)
+    old_filters = [getattr(job, field) for field in FILTER_FIELDS]
     for key, value in update_data.items():
         if hasattr(job, key) and key not in ["id", "created_at"]:
             setattr(job, key, value)
+    # The keyword indexes follow any change of the job text (see job_text_func);
+    # the embedding is recomputed only if the text differs from the one it
+    # was computed from (an edit reverted before the worker ran does not)
+    text_changed = job_text_func(job) != old_text
+    filters_changed = old_filters != [getattr(job, field) for field in FILTER_FIELDS]
+    should_regenerate_embedding = embedding_service.needs_embedding(job)
+    # The full-text document is built from the same fields as the embedding
+    if text_changed:
+        job.search_vector = to_search_vector(job_text_func(job))
+    if "required_skills" in update_data:
+        job.required_skill_ids = skill_dictionary.resolve(db, job.required_skills)
+    if should_regenerate_embedding and embedding_queue.enabled:
+        embedding_queue.enqueue(db, JOBS, job.id)
 
     db.commit()
     db.refresh(job)
 
-    # Regenerate embedding if relevant fields changed
+    # Regenerate embedding if the embedded text changed
     if should_regenerate_embedding:
-        try:
-            embedding = embedding_service.generate_job_embedding(job)
-            job.embedding = embedding
-            db.commit()
-            db.refresh(job)
-            logger.info(f"Successfully regenerated embedding for job {job.id}")
-        except EmbeddingGenerationError as e:
-            logger.error(f"Failed to regenerate embedding for job {job.id}: {e}")
-            # Continue without embedding update
+        if embedding_queue.enabled:
+            embedding_queue.notify()
+        else:
+            try:
+                embedding = embedding_service.generate_job_embedding(job)
+                embedding_service.store_embedding(job, embedding)
+                db.commit()
+                db.refresh(job)
+                logger.info(f"Successfully regenerated embedding for job {job.id}")
+            except EmbeddingGenerationError as e:
+                logger.error(f"Failed to regenerate embedding for job {job.id}: {e}")
+                # Continue without embedding update
+
+    reindex = text_changed or should_regenerate_embedding
+    # Inline embedding patches the stored lists in _sync_job_indexes already
+    if filters_changed and not (reindex and not embedding_queue.enabled):
+        # Stored lists are read without re-checking the user's preferences:
+        # evict the job from the lists of users it no longer fits (and add it
+        # where it now does) right away, not only after re-embedding
+        recommendation_store.on_item_changed(JOBS, job)
+
+    if reindex:
+        _sync_job_indexes(job)
+    else:
+        # Cached responses embed the job details
+        recommendation_cache.bump_version(JOBS)
 
     return job
 
@@ -112,4 +207,6 @@ def delete_job(db: Session, job_id: str):
 
     db.delete(job)
     db.commit()
+
+    _remove_job_from_indexes(job_id)
     return True
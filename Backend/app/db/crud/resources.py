@@ -3,48 +3,121 @@ import uuid
 from typing import Optional
 
 from app.core.exceptions import EmbeddingGenerationError
+from app.db.fulltext import to_search_vector
 from app.db.model.resources import Resource
+from app.services.ann_index import ann_service
+from app.services.embedding_queue import embedding_queue
 from app.services.embedding_service import embedding_service
-from sqlalchemy.orm import Session
+from app.services.neighbour_service import neighbour_service
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_store import recommendation_store
+from app.services.skill_dictionary import skill_dictionary
+from app.services.tfidf_service import RESOURCES, resource_text_func, tfidf_service
+from sqlalchemy.orm import Session, undefer
 
 logger = logging.getLogger(__name__)
 
+# Columns of the list-view summary projection (no description, no embedding)
+RESOURCE_SUMMARY_COLUMNS = (
+    Resource.id,
+    Resource.name,
+    Resource.url,
+    Resource.tags,
+    Resource.pricing,
+    Resource.platform,
+    Resource.duration,
+    Resource.created_at,
+)
+
+
+def _sync_resource_indexes(db_resource: Resource):
+    """Propagate a resource write to the in-process indexes, stored lists and result cache"""
+    tfidf_service.upsert(RESOURCES, db_resource.id, resource_text_func(db_resource))
+    if embedding_queue.enabled:
+        # The embedding worker calls sync_resource_embedding once it is embedded
+        recommendation_cache.bump_version(RESOURCES)
+    else:
+        sync_resource_embedding(db_resource)
+
+
+def sync_resource_embedding(db_resource: Resource):
+    """Propagate a new resource embedding to the ANN index, stored lists and result cache"""
+    ann_service.upsert(RESOURCES, db_resource.id, db_resource.embedding)
+    neighbour_service.on_item_changed(RESOURCES, db_resource)
+    recommendation_store.on_item_changed(RESOURCES, db_resource)
+    recommendation_cache.bump_version(RESOURCES)
+
+
+def _remove_resource_from_indexes(resource_id: str):
+    """Drop a deleted resource from the in-process indexes, stored lists and result cache"""
+    tfidf_service.remove(RESOURCES, resource_id)
+    ann_service.remove(RESOURCES, resource_id)
+    neighbour_service.remove_item(RESOURCES, resource_id)
+    recommendation_store.remove_item(RESOURCES, resource_id)
+    recommendation_cache.bump_version(RESOURCES)
+
 
 def create_resource(db: Session, resource_data: dict):
     """Create a new learning resource"""
     db_resource = Resource(id=str(uuid.uuid4()), **resource_data)
+    db_resource.search_vector = to_search_vector(resource_text_func(db_resource))
+    db_resource.tag_ids = skill_dictionary.resolve(db, db_resource.tags)
 
     db.add(db_resource)
+    if embedding_queue.enabled:
+        # Embedded by the background worker, committed with the resource
+        embedding_queue.enqueue(db, RESOURCES, db_resource.id)
     db.commit()
     db.refresh(db_resource)
 
-    # Generate and store embedding
-    try:
-        embedding = embedding_service.generate_resource_embedding(db_resource)
-        db_resource.embedding = embedding
-        db.commit()
-        db.refresh(db_resource)
-        logger.info(f"Successfully generated embedding for resource {db_resource.id}")
-    except EmbeddingGenerationError as e:
-        logger.error(f"Failed to generate embedding for resource {db_resource.id}: {e}")
-        # Continue without embedding - resource creation should not fail
+    if embedding_queue.enabled:
+        embedding_queue.notify()
+    else:
+        # Generate and store embedding
+        try:
+            embedding = embedding_service.generate_resource_embedding(db_resource)
+            embedding_service.store_embedding(db_resource, embedding)
+            db.commit()
+            db.refresh(db_resource)
+            logger.info(f"Successfully generated embedding for resource {db_resource.id}")
+        except EmbeddingGenerationError as e:
+            logger.error(f"Failed to generate embedding for resource {db_resource.id}: {e}")
+            # Continue without embedding - resource creation should not fail
+
+    _sync_resource_indexes(db_resource)
 
     return db_resource
 
 
-def get_resource_by_id(db: Session, resource_id: str):
-    """Get resource by ID"""
-    return db.query(Resource).filter(Resource.id == resource_id).first()
+def get_resource_by_id(db: Session, resource_id: str, with_embedding: bool = False):
+    """Get resource by ID (the deferred embedding is loaded only if requested)"""
+    query = db.query(Resource).filter(Resource.id == resource_id)
+    if with_embedding:
+        query = query.options(undefer(Resource.embedding))
+    return query.first()
 
 
 def get_resources(
-    db: Session, skip: int = 0, limit: int = 100, tags: Optional[list[str]] = None
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    tags: Optional[list[str]] = None,
+    summary: bool = False,
 ):
-    """Get resources with optional filtering by tags"""
-    query = db.query(Resource)
+    """
+    Get resources with optional filtering by tags
+
+    With summary=True only RESOURCE_SUMMARY_COLUMNS are selected and plain rows
+    are returned instead of ORM objects.
+    """
+    query = db.query(*RESOURCE_SUMMARY_COLUMNS) if summary else db.query(Resource)
 
     if tags:
-        query = query.filter(Resource.tags.overlap(tags))
+        # Overlap on the GIN-indexed canonical ids of the tags
+        tag_ids = skill_dictionary.resolve(db, tags, create=False)
+        if not tag_ids:
+            return []
+        query = query.filter(Resource.tag_ids.overlap(tag_ids))
 
     return query.offset(skip).limit(limit).all()
 
@@ -55,34 +128,50 @@ def update_resource(db: Session, resource_id: str, update_data: dict):
     if not resource:
         return None
 
-    # Check if embedding-relevant fields are being updated
-    embedding_fields = {"name", "description", "tags"}
-    should_regenerate_embedding = any(
-        field in update_data for field in embedding_fields
-    )
-
+    old_text = resource_text_func(resource)
     for key, value in update_data.items():
         if hasattr(resource, key) and key not in ["id", "created_at"]:
             setattr(resource, key, value)
+    # The keyword indexes follow any change of the name, description or tags;
+    # the embedding is recomputed only if the text differs from the one it
+    # was computed from (an edit reverted before the worker ran does not)
+    text_changed = resource_text_func(resource) != old_text
+    should_regenerate_embedding = embedding_service.needs_embedding(resource)
+    # The full-text document is built from the same fields as the embedding
+    if text_changed:
+        resource.search_vector = to_search_vector(resource_text_func(resource))
+    if "tags" in update_data:
+        resource.tag_ids = skill_dictionary.resolve(db, resource.tags)
+    if should_regenerate_embedding and embedding_queue.enabled:
+        embedding_queue.enqueue(db, RESOURCES, resource.id)
 
     db.commit()
     db.refresh(resource)
 
-    # Regenerate embedding if relevant fields changed
+    # Regenerate embedding if the embedded text changed
     if should_regenerate_embedding:
-        try:
-            embedding = embedding_service.generate_resource_embedding(resource)
-            resource.embedding = embedding
-            db.commit()
-            db.refresh(resource)
-            logger.info(
-                f"Successfully regenerated embedding for resource {resource.id}"
-            )
-        except EmbeddingGenerationError as e:
-            logger.error(
-                f"Failed to regenerate embedding for resource {resource.id}: {e}"
-            )
-            # Continue without embedding update
+        if embedding_queue.enabled:
+            embedding_queue.notify()
+        else:
+            try:
+                embedding = embedding_service.generate_resource_embedding(resource)
+                embedding_service.store_embedding(resource, embedding)
+                db.commit()
+                db.refresh(resource)
+                logger.info(
+                    f"Successfully regenerated embedding for resource {resource.id}"
+                )
+            except EmbeddingGenerationError as e:
+                logger.error(
+                    f"Failed to regenerate embedding for resource {resource.id}: {e}"
+                )
+                # Continue without embedding update
+
+    if text_changed or should_regenerate_embedding:
+        _sync_resource_indexes(resource)
+    else:
+        # Cached responses embed the resource details
+        recommendation_cache.bump_version(RESOURCES)
 
     return resource
 
@@ -95,4 +184,6 @@ def delete_resource(db: Session, resource_id: str):
 
     db.delete(resource)
     db.commit()
+
+    _remove_resource_from_indexes(resource_id)
     return True
@@ -5,11 +5,19 @@ from app.api.schemas.user import UserRegister
 from app.auth.security import get_password_hash
 from app.core.exceptions import EmbeddingGenerationError
 from app.db.model.user import User
+from app.services.embedding_queue import USERS, embedding_queue
 from app.services.embedding_service import embedding_service
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_store import recommendation_store
+from app.services.skill_dictionary import skill_dictionary
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Profile fields that filter job recommendations (job_filters) without being embedded
+PREFERENCE_FIELDS = ("preferred_job_type", "preferred_job_location", "experience_level")
+
 
 def get_user_by_email(db: Session, email: str):
     """Get user by email"""
@@ -28,16 +36,24 @@ def create_user(db: Session, user: UserRegister):
         preferred_career_track=user.preferred_career_track,
         hashed_password=hashed_password,
         skills=user.skills,  # Skills from UserRegister schema (defaults to empty list)
+        skill_ids=skill_dictionary.resolve(db, user.skills),
     )
 
     db.add(db_user)
+    if embedding_queue.enabled:
+        # Embedded by the background worker, committed with the user
+        embedding_queue.enqueue(db, USERS, db_user.id)
     db.commit()
     db.refresh(db_user)
 
+    if embedding_queue.enabled:
+        embedding_queue.notify()
+        return db_user
+
     # Generate and store embedding
     try:
         embedding = embedding_service.generate_user_embedding(db_user)
-        db_user.embedding = embedding
+        embedding_service.store_embedding(db_user, embedding)
         db.commit()
         db.refresh(db_user)
         logger.info(f"Successfully generated embedding for user {db_user.id}")
@@ -48,6 +64,11 @@ def create_user(db: Session, user: UserRegister):
     return db_user
 
 
+def sync_user_embedding(db: Session, user: User):
+    """Recompute the stored recommendation lists of a newly embedded user"""
+    recommendation_store.refresh_user(db, user)
+
+
 def authenticate_user(db: Session, email: str, password: str):
     """Authenticate user with email and password"""
     from app.auth.security import verify_password
@@ -71,41 +92,49 @@ def update_user(db: Session, user_id: str, update_data: dict):
     if not user:
         return None
 
-    # Check if embedding-relevant fields are being updated
-    embedding_fields = {
-        "skills",
-        "education_level",
-        "preferred_career_track",
-        "field_of_study",
-        "cgpa",
-        "location",
-        "preferred_job_location",
-        "preferred_job_type",
-        "bio",
-    }
-    should_regenerate_embedding = any(
-        field in update_data for field in embedding_fields
-    )
-
+    old_preferences = [getattr(user, field) for field in PREFERENCE_FIELDS]
     for key, value in update_data.items():
         if hasattr(user, key) and key not in ["id", "hashed_password", "created_at"]:
             setattr(user, key, value)
+    if "skills" in update_data:
+        user.skill_ids = skill_dictionary.resolve(db, user.skills)
+    preferences_changed = old_preferences != [
+        getattr(user, field) for field in PREFERENCE_FIELDS
+    ]
+
+    # Re-embed only if the embedded text (skills, education, career track)
+    # actually changed, not whenever a profile field is sent
+    should_regenerate_embedding = embedding_service.needs_embedding(user)
+    if should_regenerate_embedding and embedding_queue.enabled:
+        embedding_queue.enqueue(db, USERS, user.id)
 
     db.commit()
     db.refresh(user)
 
-    # Regenerate embedding if relevant fields changed
-    if should_regenerate_embedding:
+    # Regenerate embedding if the embedded text changed
+    refreshed = False
+    if should_regenerate_embedding and embedding_queue.enabled:
+        # The worker refreshes the stored lists once the user is re-embedded
+        embedding_queue.notify()
+    elif should_regenerate_embedding:
         try:
             embedding = embedding_service.generate_user_embedding(user)
-            user.embedding = embedding
+            embedding_service.store_embedding(user, embedding)
             db.commit()
             db.refresh(user)
             logger.info(f"Successfully regenerated embedding for user {user.id}")
+            recommendation_store.refresh_user(db, user)
+            refreshed = True
         except EmbeddingGenerationError as e:
             logger.error(f"Failed to regenerate embedding for user {user.id}: {e}")
             # Continue without embedding update
 
+    if preferences_changed:
+        # Stored lists and cached responses were filtered by the old preferences
+        if not refreshed:
+            recommendation_store.refresh_user(db, user)
+        recommendation_cache.bump_user(user.id)
+
     return user
 
 
@@ -117,18 +146,25 @@ def add_user_skill(db: Session, user_id: str, skill: str):
 
     if skill and skill not in user.skills:
         user.skills = user.skills + [skill]
+        user.skill_ids = skill_dictionary.resolve(db, user.skills)
+        if embedding_queue.enabled:
+            embedding_queue.enqueue(db, USERS, user.id)
         db.commit()
         db.refresh(user)
 
         # Regenerate embedding since skills changed
+        if embedding_queue.enabled:
+            embedding_queue.notify()
+            return user
         try:
             embedding = embedding_service.generate_user_embedding(user)
-            user.embedding = embedding
+            embedding_service.store_embedding(user, embedding)
             db.commit()
             db.refresh(user)
             logger.info(
                 f"Successfully regenerated embedding for user {user.id} after adding skill"
             )
+            recommendation_store.refresh_user(db, user)
         except EmbeddingGenerationError as e:
             logger.error(f"Failed to regenerate embedding for user {user.id}: {e}")
 
@@ -143,18 +179,25 @@ def remove_user_skill(db: Session, user_id: str, skill: str):
 
     if skill in user.skills:
         user.skills = [s for s in user.skills if s != skill]
+        user.skill_ids = skill_dictionary.resolve(db, user.skills)
+        if embedding_queue.enabled:
+            embedding_queue.enqueue(db, USERS, user.id)
         db.commit()
         db.refresh(user)
 
         # Regenerate embedding since skills changed
+        if embedding_queue.enabled:
+            embedding_queue.notify()
+            return user
         try:
             embedding = embedding_service.generate_user_embedding(user)
-            user.embedding = embedding
+            embedding_service.store_embedding(user, embedding)
             db.commit()
             db.refresh(user)
             logger.info(
                 f"Successfully regenerated embedding for user {user.id} after removing skill"
             )
+            recommendation_store.refresh_user(db, user)
         except EmbeddingGenerationError as e:
             logger.error(f"Failed to regenerate embedding for user {user.id}: {e}")
 
@@ -164,10 +207,27 @@ def remove_user_skill(db: Session, user_id: str, skill: str):
 def get_users_by_skills(
     db: Session, skills: list[str], skip: int = 0, limit: int = 100
 ):
-    """Get users that have any of the specified skills"""
+    """
+    Get users that have any of the specified skills, most shared skills first
+
+    Skills are matched on canonical ids, so spelling variants and aliases
+    match; the GIN index on User.skill_ids serves the overlap filter.
+    """
+    skill_ids = skill_dictionary.resolve(db, skills, create=False)
+    if not skill_ids:
+        return []
+
+    user_skill = func.unnest(User.skill_ids).table_valued("skill_id").render_derived()
+    shared = (
+        select(func.count())
+        .select_from(user_skill)
+        .where(user_skill.c.skill_id.in_(skill_ids))
+        .scalar_subquery()
+    )
     return (
         db.query(User)
-        .filter(User.skills.overlap(skills))
+        .filter(User.skill_ids.overlap(skill_ids))
+        .order_by(shared.desc(), User.id)
         .offset(skip)
         .limit(limit)
         .all()
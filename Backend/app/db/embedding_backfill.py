@@ -0,0 +1,196 @@
+"""
+Batch (re-)embedding and reconciliation of stored jobs, resources and users.
+
+Every stored embedding carries a fingerprint of the text it was computed
+from and the model id (see EmbeddingService.store_embedding). The reconciler,
+reconcile_embeddings(), scans each table and finds the rows whose embedding
+is NULL or whose fingerprint or model no longer matches the row: rows written
+by SQL or bulk imports, edited outside the CRUD functions, embedded before
+fingerprints were stored or by another model. With the embedding queue
+enabled those rows are queued for the worker; otherwise they are embedded in
+place.
+
+ensure_embeddings() adds the fingerprint columns to databases created before
+they existed and runs the reconciler at startup (or only fills NULL
+embeddings, with EMBEDDING_RECONCILE_ON_STARTUP off); reembed_all()
+recomputes every row. All of them embed a whole batch of rows per model call
+through EmbeddingService.embed_jobs/embed_resources/embed_users, instead of
+one call per row.
+"""
+
+from typing import Dict, List
+
+from sqlalchemy import bindparam, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.exceptions import EmbeddingGenerationError
+from app.core.logging_config import get_logger
+from app.db.model.job import Job
+from app.db.model.resources import Resource
+from app.db.model.user import User
+from app.db.session import engine
+from app.services.embedding_queue import embedding_queue
+from app.services.embedding_service import MODEL_NAME, embedding_service, text_fingerprint
+
+logger = get_logger(__name__)
+
+EMBEDDERS = (
+    (Job, embedding_service.embed_jobs),
+    (Resource, embedding_service.embed_resources),
+    (User, embedding_service.embed_users),
+)
+
+# Rows selected by embed_rows()
+MISSING = "missing"  # embedding is NULL
+STALE = "stale"  # embedding is NULL, or fingerprint / model out of date
+ALL = "all"
+
+
+def ensure_fingerprint_columns() -> None:
+    """Add the embedding fingerprint and model columns if missing"""
+    with engine.begin() as connection:
+        for model, _ in EMBEDDERS:
+            table_name = model.__tablename__
+            # Checked first: ALTER TABLE locks the table even when it is a no-op
+            existing = connection.execute(
+                text(
+                    "SELECT count(*) FROM information_schema.columns WHERE table_name = :table "
+                    "AND column_name IN ('embedding_fingerprint', 'embedding_model')"
+                ),
+                {"table": table_name},
+            ).scalar()
+            if existing == 2:
+                continue
+            connection.execute(
+                text(
+                    f"ALTER TABLE {table_name} "
+                    "ADD COLUMN IF NOT EXISTS embedding_fingerprint varchar(64), "
+                    "ADD COLUMN IF NOT EXISTS embedding_model varchar"
+                )
+            )
+
+
+def embed_rows(model, embed, rows: str = STALE, enqueue: bool = False) -> int:
+    """
+    Embed (or queue) the selected rows of one table in batches of EMBEDDING_BATCH_SIZE
+
+    Each batch is committed on its own, so an interrupted run keeps its
+    progress (and the next reconcile picks up the rest).
+
+    Args:
+        model: Job, Resource or User
+        embed: Matching EmbeddingService.embed_* method
+        rows: MISSING, STALE or ALL
+        enqueue: Queue embedding tasks for the worker instead of embedding;
+            rows that already have a queued task are skipped
+
+    Returns:
+        Number of rows embedded or queued
+    """
+    table = model.__table__
+    kind = model.__tablename__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(
+            embedding=bindparam("vector", type_=table.c.embedding.type),
+            embedding_fingerprint=bindparam("fingerprint"),
+            embedding_model=bindparam("model_name"),
+        )
+    )
+    embedded, last_id = 0, ""
+    while True:
+        with engine.begin() as connection:
+            # Keyset pagination on the primary key keeps each batch an index scan
+            with Session(bind=connection) as session:
+                query = session.query(model, model.embedding.is_(None)).filter(
+                    model.id > last_id
+                )
+                if rows == MISSING:
+                    query = query.filter(model.embedding.is_(None))
+                batch = query.order_by(model.id).limit(settings.EMBEDDING_BATCH_SIZE).all()
+                if not batch:
+                    break
+                last_id = batch[-1][0].id
+                # The text fingerprint is computed here, not in SQL, so it
+                # always matches what EmbeddingService would embed
+                items = [
+                    item
+                    for item, missing in batch
+                    if rows != STALE or missing or embedding_service.needs_embedding(item)
+                ]
+                values = []
+                if items and enqueue:
+                    pending = embedding_queue.pending_ids(
+                        session, kind, [item.id for item in items]
+                    )
+                    for item in items:
+                        if item.id not in pending:
+                            embedding_queue.enqueue(session, kind, item.id)
+                            embedded += 1
+                    session.flush()
+                elif items:
+                    values = _embed_batch(model, embed, items)
+            if values:
+                connection.execute(statement, values)
+        embedded += len(values)
+    return embedded
+
+
+def _embed_batch(model, embed, items) -> List[Dict]:
+    """Update parameters for a batch; rows that cannot be embedded are skipped"""
+    try:
+        pairs = list(zip(items, embed(items)))
+    except EmbeddingGenerationError:
+        # One row without text fails the whole batch: embed the rest one by one
+        pairs = []
+        for item in items:
+            try:
+                pairs.append((item, embed([item])[0]))
+            except EmbeddingGenerationError as e:
+                logger.warning(f"Skipping {model.__tablename__} {item.id}: {e}")
+    return [
+        {
+            "row_id": item.id,
+            "vector": vector,
+            "fingerprint": text_fingerprint(embedding_service.item_text(item)),
+            "model_name": MODEL_NAME,
+        }
+        for item, vector in pairs
+    ]
+
+
+def reconcile_embeddings(rows: str = STALE) -> Dict[str, int]:
+    """
+    Embed, or queue for the worker, every job, resource and user whose
+    embedding is missing (or also stale, with rows=STALE)
+
+    Returns:
+        Rows embedded or queued, by table
+    """
+    enqueue = embedding_queue.enabled
+    counts = {}
+    for model, embed in EMBEDDERS:
+        counts[model.__tablename__] = embed_rows(model, embed, rows, enqueue)
+        if counts[model.__tablename__]:
+            logger.info(
+                f"{'Queued' if enqueue else 'Embedded'} {counts[model.__tablename__]} "
+                f"{rows} {model.__tablename__} embeddings"
+            )
+    if enqueue and any(counts.values()):
+        embedding_queue.notify()
+    return counts
+
+
+def ensure_embeddings() -> None:
+    """Add the fingerprint columns and reconcile missing (and stale) embeddings"""
+    ensure_fingerprint_columns()
+    reconcile_embeddings(STALE if settings.EMBEDDING_RECONCILE_ON_STARTUP else MISSING)
+
+
+def reembed_all() -> None:
+    """Recompute the embedding of every job, resource and user"""
+    for model, embed in EMBEDDERS:
+        embedded = embed_rows(model, embed, ALL)
+        logger.info(f"Re-embedded {embedded} {model.__tablename__}")
@@ -0,0 +1,126 @@
+"""
+Conversion of existing embedding columns to the configured EMBEDDING_STORAGE.
+
+create_all never alters existing columns, so switching storage modes on a
+populated database goes through here at startup:
+
+- vector <-> halfvec: ALTER COLUMN ... TYPE with a cast, done in Postgres
+- to or from int8 (bytea): rows are converted in Python, in batches, into a
+  new column that then replaces the old one
+
+The managed ANN indexes of a converted column are dropped first;
+ensure_vector_indexes recreates them with the new operator class.
+"""
+
+from typing import Optional
+
+from pgvector.sqlalchemy import HALFVEC, Vector
+from sqlalchemy import bindparam, column, select, table, text, update
+
+from app.core.logging_config import get_logger
+from app.db.base import Base
+from app.db.embedding_types import EMBEDDING_DIM, HalfVec, Int8Vector
+from app.db.session import engine
+from app.db.vector_indexes import VECTOR_TABLES, drop_vector_indexes
+
+logger = get_logger(__name__)
+
+BATCH_SIZE = 500
+TEMP_COLUMN = "embedding_converted"
+
+
+def _sql_type_name(column_type) -> str:
+    """The format_type() spelling of an embedding column type"""
+    if isinstance(column_type, Int8Vector):
+        return "bytea"
+    if isinstance(column_type, HALFVEC):
+        return f"halfvec({EMBEDDING_DIM})"
+    return f"vector({EMBEDDING_DIM})"
+
+
+def _column_type(type_name: str):
+    """SQLAlchemy type reading/writing a column of the given format_type()"""
+    if type_name == "bytea":
+        return Int8Vector()
+    if type_name.startswith("halfvec"):
+        return HalfVec(EMBEDDING_DIM)
+    return Vector(EMBEDDING_DIM)
+
+
+def _current_type(connection, table_name: str) -> Optional[str]:
+    return connection.execute(
+        text(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:table) AND attname = 'embedding' "
+            "AND NOT attisdropped"
+        ),
+        {"table": table_name},
+    ).scalar()
+
+
+def _copy_in_python(connection, table_name: str, current: str, target: str) -> int:
+    """Re-encode every embedding into a new column of the target type"""
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {TEMP_COLUMN} {target}"))
+    rows = table(
+        table_name,
+        column("id"),
+        column("embedding", _column_type(current)),
+        column(TEMP_COLUMN, _column_type(target)),
+    )
+    statement = (
+        update(rows)
+        .where(rows.c.id == bindparam("row_id"))
+        .values({TEMP_COLUMN: bindparam("vector", type_=_column_type(target))})
+    )
+
+    converted, last_id = 0, ""
+    while True:
+        # Keyset pagination on the primary key keeps each batch an index scan
+        batch = connection.execute(
+            select(rows.c.id, rows.c.embedding)
+            .where(rows.c.id > last_id, rows.c.embedding.isnot(None))
+            .order_by(rows.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        connection.execute(
+            statement,
+            [{"row_id": row_id, "vector": embedding} for row_id, embedding in batch],
+        )
+        converted += len(batch)
+        last_id = batch[-1][0]
+
+    connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN embedding"))
+    connection.execute(
+        text(f"ALTER TABLE {table_name} RENAME COLUMN {TEMP_COLUMN} TO embedding")
+    )
+    return converted
+
+
+def ensure_embedding_storage() -> None:
+    """
+    Convert any embedding column whose type differs from its model's
+    (i.e. from the configured EMBEDDING_STORAGE). Each table is converted in
+    its own transaction.
+    """
+    for table_name in VECTOR_TABLES:
+        target = _sql_type_name(Base.metadata.tables[table_name].c.embedding.type)
+        with engine.begin() as connection:
+            current = _current_type(connection, table_name)
+            if current is None or current == target:
+                continue
+
+            logger.info(f"Converting {table_name}.embedding from {current} to {target}")
+            drop_vector_indexes(connection, table_name)
+
+            if "bytea" in (current, target):
+                converted = _copy_in_python(connection, table_name, current, target)
+                logger.info(f"Re-encoded {converted} {table_name} embeddings")
+            else:
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {table_name} ALTER COLUMN embedding "
+                        f"TYPE {target} USING embedding::{target}"
+                    )
+                )
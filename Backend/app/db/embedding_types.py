@@ -0,0 +1,138 @@
+"""
+Column types for the embedding storage modes (settings.EMBEDDING_STORAGE).
+
+- vector: pgvector float32, 4 bytes per dimension (default)
+- halfvec: pgvector float16, half the size, same similarity operators
+  (requires pgvector >= 0.7)
+- int8: scalar-quantized int8 codes with a per-vector float32 scale, stored
+  as bytea (388 bytes for 384 dims). Postgres cannot score these, so
+  similarity search runs in-process (see ann_index.Int8FlatIndex).
+
+Every type reads back as a float32 NumPy array, so code outside the DB layer
+does not depend on the storage mode.
+"""
+
+import struct
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from pgvector.sqlalchemy import HALFVEC, Vector
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+from app.core.config import settings
+
+EMBEDDING_DIM = 384
+
+VECTOR = "vector"
+HALFVEC_STORAGE = "halfvec"
+INT8 = "int8"
+STORAGE_MODES = (VECTOR, HALFVEC_STORAGE, INT8)
+
+_SCALE = struct.Struct("<f")
+
+
+def quantize_int8(vector: Sequence[float]) -> Tuple[np.ndarray, float]:
+    """
+    Symmetric per-vector int8 quantization
+
+    Args:
+        vector: Float embedding
+
+    Returns:
+        (codes, scale) with vector ~= codes * scale
+    """
+    array = np.asarray(vector, dtype=np.float32)
+    peak = float(np.abs(array).max()) if array.size else 0.0
+    scale = peak / 127 if peak > 0 else 1.0
+    codes = np.clip(np.rint(array / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def dequantize_int8(codes: np.ndarray, scale: float) -> np.ndarray:
+    return codes.astype(np.float32) * np.float32(scale)
+
+
+def round_trip(
+    vector: Optional[Sequence[float]],
+    sql_similarity: bool = False,
+    storage: Optional[str] = None,
+):
+    """
+    Return the value a vector reads back as after storage (None stays None)
+
+    Args:
+        vector: Float embedding, or a matrix with one embedding per row
+        sql_similarity: As in embedding_column_type
+        storage: Override for settings.EMBEDDING_STORAGE
+    """
+    if vector is None:
+        return None
+    storage = storage or settings.EMBEDDING_STORAGE
+    array = np.asarray(vector, dtype=np.float32)
+    if storage == HALFVEC_STORAGE:
+        return array.astype(np.float16).astype(np.float32)
+    if storage == INT8 and not sql_similarity:
+        if array.ndim == 2:
+            # Each row is quantized with its own scale
+            rows = [dequantize_int8(*quantize_int8(row)) for row in array]
+            return np.stack(rows) if rows else array
+        return dequantize_int8(*quantize_int8(array))
+    return array
+
+
+class HalfVec(HALFVEC):
+    """pgvector halfvec column that reads back as a float32 array"""
+
+    cache_ok = True
+
+    def result_processor(self, dialect, coltype):
+        parent = super().result_processor(dialect, coltype)
+
+        def process(value):
+            value = parent(value)
+            return None if value is None else value.to_numpy().astype(np.float32)
+
+        return process
+
+
+class Int8Vector(TypeDecorator):
+    """int8 codes + float32 scale in a bytea column"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        codes, scale = quantize_int8(value)
+        return _SCALE.pack(scale) + codes.tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        value = bytes(value)
+        (scale,) = _SCALE.unpack_from(value)
+        codes = np.frombuffer(value, dtype=np.int8, offset=_SCALE.size)
+        return dequantize_int8(codes, scale)
+
+
+def embedding_column_type(sql_similarity: bool = False, storage: Optional[str] = None):
+    """
+    Column type for an embedding column in the configured storage mode
+
+    Args:
+        sql_similarity: The column is searched by similarity in SQL, so the
+            int8 mode (no SQL operators) falls back to float32
+        storage: Override for settings.EMBEDDING_STORAGE
+
+    Returns:
+        SQLAlchemy column type
+    """
+    storage = storage or settings.EMBEDDING_STORAGE
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unknown EMBEDDING_STORAGE '{storage}'")
+    if storage == HALFVEC_STORAGE:
+        return HalfVec(EMBEDDING_DIM)
+    if storage == INT8 and not sql_similarity:
+        return Int8Vector()
+    return Vector(EMBEDDING_DIM)
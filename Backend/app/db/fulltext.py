@@ -0,0 +1,97 @@
+"""
+Postgres full-text search columns for the lexical half of hybrid ranking.
+
+Jobs and resources carry a `search_vector` tsvector built from the same text
+as the TF-IDF model (job_text_func / resource_text_func), with a GIN index.
+The CRUD modules set it on write; ensure_search_vectors() adds the column and
+index to databases created before it existed and backfills NULL rows (e.g.
+items inserted by the seed scripts).
+"""
+
+import re
+
+from sqlalchemy import bindparam, column, func, select, table, text, update
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import get_logger
+from app.db.model.job import Job
+from app.db.model.resources import Resource
+from app.db.session import engine
+from app.services.tfidf_service import job_text_func, resource_text_func
+
+logger = get_logger(__name__)
+
+# Text search configuration (stemming and stop words)
+SEARCH_CONFIG = "english"
+
+BATCH_SIZE = 500
+
+# websearch_to_tsquery syntax characters: quotes and leading "-" (negation)
+_QUERY_SYNTAX = re.compile(r'["\-]+')
+
+
+def to_search_vector(text_value: str):
+    """SQL expression for the search_vector of an item's keyword text"""
+    return func.to_tsvector(SEARCH_CONFIG, text_value)
+
+
+def search_query_text(text_value: str) -> str:
+    """websearch_to_tsquery input matching any word of a text (see to_search_query)"""
+    words = [
+        word
+        for word in _QUERY_SYNTAX.sub(" ", text_value).split()
+        if word.lower() != "or"
+    ]
+    return " or ".join(words)
+
+
+def to_search_query(text_value: str):
+    """
+    SQL expression matching documents that share any word with a text
+
+    The words are joined with "or" for websearch_to_tsquery, which stems them
+    with the same configuration as the documents and never raises on odd input.
+    """
+    return func.websearch_to_tsquery(SEARCH_CONFIG, search_query_text(text_value))
+
+
+def ensure_search_vectors() -> None:
+    """Add the search_vector column and GIN index if missing and fill NULL rows"""
+    for model, text_func in ((Job, job_text_func), (Resource, resource_text_func)):
+        table_name = model.__tablename__
+        with engine.begin() as connection:
+            connection.execute(
+                text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS search_vector tsvector")
+            )
+            connection.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search_vector "
+                    f"ON {table_name} USING gin (search_vector)"
+                )
+            )
+
+        rows = table(table_name, column("id"), column("search_vector"))
+        statement = (
+            update(rows)
+            .where(rows.c.id == bindparam("row_id"))
+            .values(search_vector=func.to_tsvector(SEARCH_CONFIG, bindparam("document")))
+        )
+        filled = 0
+        while True:
+            with engine.begin() as connection:
+                ids = connection.execute(
+                    select(rows.c.id).where(rows.c.search_vector.is_(None)).limit(BATCH_SIZE)
+                ).scalars().all()
+                if not ids:
+                    break
+                # Load through the ORM so the text functions see enum members
+                with Session(bind=connection) as session:
+                    items = session.query(model).filter(model.id.in_(ids)).all()
+                    documents = [
+                        {"row_id": item.id, "document": text_func(item)} for item in items
+                    ]
+                connection.execute(statement, documents)
+                filled += len(documents)
+
+        if filled:
+            logger.info(f"Backfilled search_vector for {filled} {table_name}")
@@ -4,12 +4,22 @@ from sqlalchemy import text
 
 from app.core.logging_config import get_logger
 from app.db.base import Base  # This import ensures all models are registered
+from app.db.model.embedding_cache import EmbeddingCacheEntry  # noqa: F401
+from app.db.model.embedding_task import EmbeddingTask  # noqa: F401
 from app.db.model.job import Job  # noqa: F401
+from app.db.model.recommendation import ItemNeighbour, UserRecommendation  # noqa: F401
 from app.db.model.resources import Resource  # noqa: F401
+from app.db.model.skill import Skill, SkillAlias  # noqa: F401
 
 # Import all models explicitly to ensure they're registered before table creation
 from app.db.model.user import User  # noqa: F401
+from app.db.embedding_storage import ensure_embedding_storage
+from app.db.embedding_backfill import ensure_embeddings
+from app.db.fulltext import ensure_search_vectors
 from app.db.session import engine
+from app.db.skill_ids import ensure_skill_ids
+from app.db.vector_indexes import ensure_vector_indexes
+from app.services.embedding_cache import ensure_embedding_cache_table
 
 logger = get_logger(__name__)
 
@@ -49,6 +59,24 @@ async def init_db():
         table_names = [table.name for table in Base.metadata.sorted_tables]
         logger.info(f"Database tables created successfully.")
 
+        # Full-text columns for the lexical ranking (added/backfilled if missing)
+        ensure_search_vectors()
+
+        # Canonical skill id arrays for skill filters (added/backfilled if missing)
+        ensure_skill_ids()
+
+        # Convert existing embedding columns if EMBEDDING_STORAGE changed
+        ensure_embedding_storage()
+
+        # Drop stale embedding cache entries
+        ensure_embedding_cache_table()
+
+        # Embed rows stored without an embedding (batched model calls)
+        ensure_embeddings()
+
+        # Create or adjust the ANN indexes on the embedding columns
+        ensure_vector_indexes()
+
     except Exception as e:
         logger.error(f"Error creating database tables: {e}", exc_info=True)
         raise RuntimeError(f"Failed to initialize database: {str(e)}") from e
@@ -0,0 +1,26 @@
+from app.db.base import Base
+from app.db.embedding_types import EMBEDDING_DIM
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Column, DateTime, String, func
+
+
+class EmbeddingCacheEntry(Base):
+    """Model output for one normalized text (persistent tier of the embedding cache)"""
+
+    __tablename__ = "embedding_cache"
+
+    # sha256 of the model name and the normalized text
+    key = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    # Raw float32 model output, before quantization to EMBEDDING_STORAGE
+    embedding = Column(Vector(EMBEDDING_DIM), nullable=False)
+    created_at = Column(
+        DateTime, nullable=False, default=func.now(), server_default=func.now()
+    )
+    # Refreshed (at most daily) on lookups; pruning drops the least recently used
+    last_used_at = Column(
+        DateTime, nullable=False, default=func.now(), server_default=func.now(), index=True
+    )
+
+    def __repr__(self):
+        return f"<EmbeddingCacheEntry(key={self.key}, model={self.model})>"
@@ -0,0 +1,25 @@
+from app.db.base import Base
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, func
+
+
+class EmbeddingTask(Base):
+    """Pending (re-)embedding of a job, resource or user (background queue)"""
+
+    __tablename__ = "embedding_tasks"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    item_type = Column(String, nullable=False)  # "jobs", "resources" or "users"
+    item_id = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Earliest time the task may run; pushed back on each failed attempt
+    run_at = Column(DateTime, nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_embedding_tasks_run_at", "run_at"),
+        Index("ix_embedding_tasks_item", "item_type", "item_id"),
+    )
+
+    def __repr__(self):
+        return f"<EmbeddingTask(id={self.id}, item_type={self.item_type}, item_id={self.item_id}, attempts={self.attempts})>"
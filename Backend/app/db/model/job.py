@@ -2,8 +2,10 @@ import uuid
 from enum import Enum
 
 from app.db.base import Base
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import ARRAY, Column, DateTime, Enum as SQLEnum, Float, Index, String, func
+from app.db.embedding_types import embedding_column_type
+from sqlalchemy import Column, DateTime, Enum as SQLEnum, Float, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred
 
 
 class JobType(str, Enum):
@@ -37,6 +39,8 @@ class Job(Base):
     job_location = Column(SQLEnum(JobLocation), nullable=True)  # optional
 
     required_skills = Column(ARRAY(String), nullable=False, default=list)
+    # Canonical skill ids of required_skills (see app/db/skill_ids.py)
+    required_skill_ids = Column(ARRAY(Integer), nullable=True)
     url = Column(String, nullable=True)
 
     recommended_experience_level = Column(
@@ -50,7 +54,20 @@ class Job(Base):
     updated_at = Column(
         DateTime, nullable=False, default=func.now(), onupdate=func.now()
     )
-    embedding = Column(Vector(384), nullable=True)
+    # Deferred: only similarity code needs the vector; list/detail reads skip it
+    embedding = deferred(Column(embedding_column_type(), nullable=True))
+    # Hash of the text the embedding was computed from, and the model that
+    # computed it; re-embedding is skipped while both match (see
+    # EmbeddingService.needs_embedding)
+    embedding_fingerprint = Column(String(64), nullable=True)
+    embedding_model = Column(String, nullable=True)
+    # Full-text document for the lexical ranking (see app/db/fulltext.py)
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+
+    __table_args__ = (
+        Index("ix_jobs_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_jobs_required_skill_ids", "required_skill_ids", postgresql_using="gin"),
+    )
 
     def __repr__(self):
         return f"<Job(id={self.id}, title={self.title}, company={self.company}, job_type={self.job_type}, job_location={self.job_location}, required_skills={self.required_skills}, recommended_experience_level={self.recommended_experience_level}, salary_range_min={self.salary_range_min}, salary_range_max={self.salary_range_max})>"
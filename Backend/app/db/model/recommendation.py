@@ -0,0 +1,49 @@
+import uuid
+
+from app.db.base import Base
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, String, func
+
+
+class UserRecommendation(Base):
+    """Precomputed top-N job/resource recommendation for a user"""
+
+    __tablename__ = "user_recommendations"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(
+        String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    item_type = Column(String, nullable=False)  # "jobs" or "resources"
+    item_id = Column(String, nullable=False, index=True)
+    score = Column(Float, nullable=False)
+    # Time the user's full list was computed; patched rows keep the list's time
+    computed_at = Column(DateTime, nullable=False, server_default=func.now())
+    # The list holds every item eligible for the user (it came out shorter
+    # than requested), so reads may serve it even below their limit
+    complete = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    __table_args__ = (
+        Index("ix_user_recommendations_user_type", "user_id", "item_type"),
+    )
+
+    def __repr__(self):
+        return f"<UserRecommendation(user_id={self.user_id}, item_type={self.item_type}, item_id={self.item_id}, score={self.score})>"
+
+
+class ItemNeighbour(Base):
+    """Precomputed nearest neighbour of a job/resource (for "similar items")"""
+
+    __tablename__ = "item_neighbours"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    item_type = Column(String, nullable=False)  # "jobs" or "resources"
+    item_id = Column(String, nullable=False)
+    neighbour_id = Column(String, nullable=False, index=True)
+    score = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_item_neighbours_type_item", "item_type", "item_id"),
+    )
+
+    def __repr__(self):
+        return f"<ItemNeighbour(item_type={self.item_type}, item_id={self.item_id}, neighbour_id={self.neighbour_id}, score={self.score})>"
@@ -1,8 +1,10 @@
 import uuid
 
 from app.db.base import Base
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import ARRAY, Column, DateTime, String, func
+from app.db.embedding_types import embedding_column_type
+from sqlalchemy import Column, DateTime, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred
 
 
 class Resource(Base):
@@ -13,6 +15,8 @@ class Resource(Base):
     description = Column(String, nullable=False)
     url = Column(String, nullable=False)
     tags = Column(ARRAY(String), nullable=True, default=list, server_default="{}")
+    # Canonical skill ids of tags (see app/db/skill_ids.py)
+    tag_ids = Column(ARRAY(Integer), nullable=True)
     pricing = Column(String, nullable=True,default="Free")
     platform = Column(String, nullable=True)
     duration = Column(String, nullable=True)
@@ -26,7 +30,20 @@ class Resource(Base):
         onupdate=func.now(),
         server_default=func.now(),
     )
-    embedding = Column(Vector(384), nullable=True)
+    # Deferred: only similarity code needs the vector; list/detail reads skip it
+    embedding = deferred(Column(embedding_column_type(), nullable=True))
+    # Hash of the text the embedding was computed from, and the model that
+    # computed it; re-embedding is skipped while both match (see
+    # EmbeddingService.needs_embedding)
+    embedding_fingerprint = Column(String(64), nullable=True)
+    embedding_model = Column(String, nullable=True)
+    # Full-text document for the lexical ranking (see app/db/fulltext.py)
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+
+    __table_args__ = (
+        Index("ix_resources_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_resources_tag_ids", "tag_ids", postgresql_using="gin"),
+    )
 
     def __repr__(self):
         return f"<Resource(id={self.id}, name={self.name}, url={self.url}, tags={self.tags})>"
@@ -0,0 +1,35 @@
+from app.db.base import Base
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+
+
+class Skill(Base):
+    """Canonical skill; free-text skills and tags resolve to one of these ids"""
+
+    __tablename__ = "skills"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Normalized key (lower case, single spaces), e.g. "node.js"
+    name = Column(String, nullable=False, unique=True)
+    # First spelling seen (or the built-in canonical spelling), e.g. "Node.js"
+    display_name = Column(String, nullable=False)
+    created_at = Column(
+        DateTime, nullable=False, default=func.now(), server_default=func.now()
+    )
+
+    def __repr__(self):
+        return f"<Skill(id={self.id}, name={self.name}, display_name={self.display_name})>"
+
+
+class SkillAlias(Base):
+    """Alternative spelling of a canonical skill, e.g. "nodejs" -> Node.js"""
+
+    __tablename__ = "skill_aliases"
+
+    # Normalized like Skill.name
+    alias = Column(String, primary_key=True)
+    skill_id = Column(
+        Integer, ForeignKey("skills.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+
+    def __repr__(self):
+        return f"<SkillAlias(alias={self.alias}, skill_id={self.skill_id})>"
@@ -6,8 +6,9 @@ from app.api.schemas.user import (
     PreferredJobType,
 )
 from app.db.base import Base
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import ARRAY, Boolean, Column, DateTime, Enum as SQLEnum, Float, Integer, JSON, String, func
+from app.db.embedding_types import embedding_column_type
+from sqlalchemy import Boolean, Column, DateTime, Enum as SQLEnum, Float, Index, Integer, JSON, String, func
+from sqlalchemy.dialects.postgresql import ARRAY
 
 
 class User(Base):
@@ -20,6 +21,8 @@ class User(Base):
     preferred_career_track = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     skills = Column(ARRAY(String), nullable=False, default=list, server_default="{}")
+    # Canonical skill ids of skills (see app/db/skill_ids.py)
+    skill_ids = Column(ARRAY(Integer), nullable=True)
     is_active = Column(Boolean, nullable=False, default=True, server_default="true")
     created_at = Column(
         DateTime, nullable=False, default=func.now(), server_default=func.now()
@@ -31,7 +34,13 @@ class User(Base):
         onupdate=func.now(),
         server_default=func.now(),
     )
-    embedding = Column(Vector(384), nullable=True)
+    # Searched by similarity in SQL (store fan-out), so never int8
+    embedding = Column(embedding_column_type(sql_similarity=True), nullable=True)
+    # Hash of the text the embedding was computed from, and the model that
+    # computed it; re-embedding is skipped while both match (see
+    # EmbeddingService.needs_embedding)
+    embedding_fingerprint = Column(String(64), nullable=True)
+    embedding_model = Column(String, nullable=True)
 
     # optional fields
     profile_picture = Column(String, nullable=True)
@@ -50,5 +59,9 @@ class User(Base):
     brief_experience = Column(String, nullable=True)
     project_description = Column(JSON, nullable=True)
 
+    __table_args__ = (
+        Index("ix_users_skill_ids", "skill_ids", postgresql_using="gin"),
+    )
+
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, full_name={self.full_name}, skills={self.skills}, is_active={self.is_active})>"
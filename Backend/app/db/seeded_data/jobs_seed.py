@@ -453,7 +453,7 @@ def seed_jobs(db_session):
         int: Number of jobs created
     """
     jobs_data = get_jobs_seed_data()
-    jobs_created = 0
+    new_jobs = []
 
     for job_data in jobs_data:
         # Check if job already exists (by title and company)
@@ -464,9 +464,16 @@ def seed_jobs(db_session):
         )
 
         if not existing_job:
-            job = Job(**job_data)
-            db_session.add(job)
-            jobs_created += 1
+            new_jobs.append(Job(**job_data))
+
+    # Embed all new jobs in batched model calls rather than one by one
+    if new_jobs:
+        # Imported here so reading the seed data does not load the model
+        from app.services.embedding_service import embedding_service
+
+        for job, embedding in zip(new_jobs, embedding_service.embed_jobs(new_jobs)):
+            embedding_service.store_embedding(job, embedding)
+        db_session.add_all(new_jobs)
 
     db_session.commit()
-    return jobs_created
+    return len(new_jobs)
@@ -173,7 +173,7 @@ def seed_resources(db_session):
         int: Number of resources created
     """
     resources_data = get_resources_seed_data()
-    resources_created = 0
+    new_resources = []
 
     for resource_data in resources_data:
         # Check if resource already exists (by URL)
@@ -184,9 +184,16 @@ def seed_resources(db_session):
         )
 
         if not existing_resource:
-            resource = Resource(**resource_data)
-            db_session.add(resource)
-            resources_created += 1
+            new_resources.append(Resource(**resource_data))
+
+    # Embed all new resources in batched model calls rather than one by one
+    if new_resources:
+        # Imported here so reading the seed data does not load the model
+        from app.services.embedding_service import embedding_service
+
+        for resource, embedding in zip(new_resources, embedding_service.embed_resources(new_resources)):
+            embedding_service.store_embedding(resource, embedding)
+        db_session.add_all(new_resources)
 
     db_session.commit()
-    return resources_created
+    return len(new_resources)
@@ -1,5 +1,7 @@
+from typing import Dict
+
 from app.core.config import settings
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
@@ -35,6 +37,17 @@ def get_db():
         db.close()
 
 
+
+def database_status() -> Dict[str, object]:
+    """Check out a pooled connection and run SELECT 1 (readiness probe)."""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return {"ready": True, "pool": engine.pool.status()}
+    except Exception as e:
+        return {"ready": False, "pool": engine.pool.status(), "error": str(e)}
+
+
 # async def get_async_db():
 #     """Async database session."""
 #     async with AsyncSessionLocal() as session:
@@ -0,0 +1,81 @@
+"""
+Interned skill id arrays beside the free-text skill columns.
+
+jobs.required_skill_ids, users.skill_ids and resources.tag_ids hold the
+canonical skill ids (see app/services/skill_dictionary.py) of
+required_skills, skills and tags, with GIN indexes so skill filters (`&&`)
+and overlap counts are index scans over integers instead of sequential scans
+over string arrays. The CRUD modules set them on write; ensure_skill_ids()
+seeds the built-in aliases, adds the columns and indexes to databases created
+before they existed and backfills NULL rows (e.g. rows inserted by the seed
+scripts).
+"""
+
+from sqlalchemy import bindparam, column, select, table, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Integer, String
+
+from app.core.logging_config import get_logger
+from app.db.session import engine
+from app.services.skill_dictionary import skill_dictionary
+
+logger = get_logger(__name__)
+
+# (table, free-text column, id column)
+SKILL_ID_COLUMNS = (
+    ("jobs", "required_skills", "required_skill_ids"),
+    ("users", "skills", "skill_ids"),
+    ("resources", "tags", "tag_ids"),
+)
+
+BATCH_SIZE = 500
+
+
+def ensure_skill_ids() -> None:
+    """Add the skill id columns and GIN indexes if missing and fill NULL rows"""
+    skill_dictionary.seed_builtin_aliases()
+
+    for table_name, text_column, id_column in SKILL_ID_COLUMNS:
+        with engine.begin() as connection:
+            connection.execute(
+                text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {id_column} integer[]")
+            )
+            connection.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{id_column} "
+                    f"ON {table_name} USING gin ({id_column})"
+                )
+            )
+
+        rows = table(
+            table_name,
+            column("id"),
+            column(text_column, ARRAY(String)),
+            column(id_column, ARRAY(Integer)),
+        )
+        statement = (
+            update(rows)
+            .where(rows.c.id == bindparam("row_id"))
+            .values({id_column: bindparam("skill_ids", type_=ARRAY(Integer))})
+        )
+        filled = 0
+        while True:
+            with engine.begin() as connection:
+                batch = connection.execute(
+                    select(rows.c.id, rows.c[text_column])
+                    .where(rows.c[id_column].is_(None))
+                    .limit(BATCH_SIZE)
+                ).all()
+                if not batch:
+                    break
+                with Session(bind=connection) as session:
+                    values = [
+                        {"row_id": row_id, "skill_ids": skill_dictionary.resolve(session, skills)}
+                        for row_id, skills in batch
+                    ]
+                connection.execute(statement, values)
+                filled += len(values)
+
+        if filled:
+            logger.info(f"Backfilled {id_column} for {filled} {table_name}")
@@ -0,0 +1,192 @@
+"""
+Management of pgvector ANN indexes on the embedding columns.
+
+bge-small embeddings are L2-normalized, so inner product equals cosine
+similarity. Indexes are built with the inner-product operator class and the
+similarity queries order by `<#>` (negative inner product) to match them.
+The index type is chosen from the table size and configuration:
+
+- exact: small tables, where a sequential scan beats an index
+- HNSW: the default for anything larger
+- IVFFlat: very large tables, where HNSW build time and memory get expensive
+
+The operator class follows EMBEDDING_STORAGE; int8 columns (bytea) are
+searched in-process and get no index.
+"""
+
+import math
+import re
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.db.embedding_types import HALFVEC_STORAGE, INT8
+from app.db.session import engine
+
+logger = get_logger(__name__)
+
+EXACT = "none"
+HNSW = "hnsw"
+IVFFLAT = "ivfflat"
+
+# Tables with a 384-dim `embedding` column
+VECTOR_TABLES = ("jobs", "resources", "users")
+
+# Tables whose embedding column follows EMBEDDING_STORAGE all the way to int8;
+# users stay searchable in SQL (see embedding_column_type)
+ITEM_TABLES = ("jobs", "resources")
+
+
+def opclass_for(table: str) -> Optional[str]:
+    """Operator class matching the `<#>` operator for a table's column type,
+    or None if the column cannot be indexed"""
+    storage = settings.EMBEDDING_STORAGE
+    if storage == HALFVEC_STORAGE:
+        return "halfvec_ip_ops"
+    if storage == INT8 and table in ITEM_TABLES:
+        return None
+    return "vector_ip_ops"
+
+
+def choose_index_method(row_count: int) -> str:
+    """
+    Pick the index type for a table from its size and the configured method
+
+    Args:
+        row_count: Number of rows with a non-NULL embedding
+
+    Returns:
+        One of EXACT, HNSW or IVFFLAT
+    """
+    method = settings.PGVECTOR_INDEX_METHOD.lower()
+    if method != "auto":
+        return method
+    if row_count < settings.PGVECTOR_INDEX_MIN_ROWS:
+        return EXACT
+    if row_count >= settings.PGVECTOR_IVFFLAT_MIN_ROWS:
+        return IVFFLAT
+    return HNSW
+
+
+def ivfflat_lists(row_count: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond"""
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def index_name(table: str, method: str) -> str:
+    return f"ix_{table}_embedding_{method}"
+
+
+def _existing_indexes(connection, table: str) -> Dict[str, str]:
+    """Map index name -> definition for the managed embedding indexes of a table"""
+    rows = connection.execute(
+        text(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = :table AND indexname LIKE :pattern"
+        ),
+        {"table": table, "pattern": f"ix_{table}_embedding_%"},
+    )
+    return {name: definition for name, definition in rows}
+
+
+def drop_vector_indexes(connection, table: str) -> None:
+    """Drop every managed embedding index of a table (before a type change)"""
+    for name in _existing_indexes(connection, table):
+        logger.info(f"Dropping vector index {name}")
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def _create_statement(table: str, method: str, row_count: int) -> str:
+    name = index_name(table, method)
+    opclass = opclass_for(table)
+    if method == HNSW:
+        options = (
+            f"m = {settings.PGVECTOR_HNSW_M}, "
+            f"ef_construction = {settings.PGVECTOR_HNSW_EF_CONSTRUCTION}"
+        )
+    else:
+        options = f"lists = {ivfflat_lists(row_count)}"
+    return (
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+        f"USING {method} (embedding {opclass}) WITH ({options})"
+    )
+
+
+def _ivfflat_needs_rebuild(definition: str, row_count: int) -> bool:
+    """IVFFlat centroids are fixed at build time; rebuild once the table outgrows them"""
+    match = re.search(r"lists='?(\d+)'?", definition)
+    if not match:
+        return True
+    built_lists = int(match.group(1))
+    return ivfflat_lists(row_count) >= 4 * built_lists
+
+
+def ensure_vector_indexes() -> None:
+    """
+    Create, replace or drop the ANN index of every embedding column so it
+    matches the index type chosen for the table's current size.
+    """
+    with engine.connect() as connection:
+        for table in VECTOR_TABLES:
+            row_count = connection.execute(
+                text(f"SELECT count(*) FROM {table} WHERE embedding IS NOT NULL")
+            ).scalar()
+            opclass = opclass_for(table)
+            method = choose_index_method(row_count) if opclass else EXACT
+            wanted = index_name(table, method) if method != EXACT else None
+            existing = _existing_indexes(connection, table)
+
+            for name, definition in list(existing.items()):
+                stale = name != wanted or opclass not in definition
+                if not stale and method == IVFFLAT:
+                    stale = _ivfflat_needs_rebuild(definition, row_count)
+                if stale:
+                    logger.info(f"Dropping vector index {name}")
+                    connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                    del existing[name]
+
+            if wanted and wanted not in existing:
+                logger.info(
+                    f"Creating {method} index on {table}.embedding ({row_count} rows)"
+                )
+                connection.execute(text(_create_statement(table, method, row_count)))
+            elif not wanted:
+                logger.info(
+                    f"Using exact search on {table}.embedding ({row_count} rows)"
+                )
+
+            connection.commit()
+
+
+def apply_search_params(
+    db: Session,
+    limit: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> None:
+    """
+    Set per-query ANN search parameters for the current transaction
+
+    HNSW scans return at most `ef_search` rows, so it is never set below the
+    number of candidates requested.
+
+    Args:
+        db: Database session
+        limit: Number of candidates the next similarity query will fetch
+        ef_search: HNSW candidate list size (higher = better recall, slower)
+        probes: IVFFlat lists to probe (higher = better recall, slower)
+    """
+    ef_search = max(ef_search or settings.PGVECTOR_HNSW_EF_SEARCH, limit)
+    probes = probes or settings.PGVECTOR_IVFFLAT_PROBES
+    db.execute(
+        text(
+            "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+            "set_config('ivfflat.probes', :probes, true)"
+        ),
+        {"ef_search": str(ef_search), "probes": str(probes)},
+    )
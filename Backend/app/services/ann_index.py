@@ -0,0 +1,658 @@
+"""
+In-process approximate nearest neighbour index mirroring the pgvector
+embedding columns of jobs and resources.
+
+The index is an HNSW-style layered proximity graph over float32 arrays. It is
+loaded from the database at startup and kept in sync by the CRUD modules, so
+RecommendationService can generate candidates without an ORDER BY
+cosine_distance scan in Postgres.
+
+With int8 embedding storage Postgres cannot score the columns at all, so the
+index is always loaded and is an exact int8 scan (Int8FlatIndex) instead.
+With ANN_BINARY_ENABLED the index is a two-stage BinaryQuantizedIndex.
+"""
+
+import heapq
+import logging
+import math
+import random
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from app.core.config import settings
+from app.db.embedding_types import INT8, quantize_int8
+from app.db.model.job import Job
+from app.db.model.resources import Resource
+from app.services.tfidf_service import JOBS, RESOURCES
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    """Return a unit-length float32 copy of a vector"""
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm > 0 else array
+
+
+def _slots(slot_by_id: Dict[str, int], item_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Slot per item id (-1 if absent) and the mask of ids present"""
+    slots = np.fromiter(
+        (slot_by_id.get(item_id, -1) for item_id in item_ids),
+        dtype=np.int64,
+        count=len(item_ids),
+    )
+    return slots, slots >= 0
+
+
+class HNSWIndex:
+    """
+    Hierarchical navigable small world graph for cosine similarity search
+
+    Vectors are stored normalized, so similarity is a plain dot product.
+    Updates and deletes tombstone the old node; the graph is rebuilt once
+    tombstones make up a large share of it.
+    """
+
+    REBUILD_RATIO = 0.3
+
+    def __init__(
+        self,
+        dim: int = 384,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        seed: Optional[int] = None,
+    ):
+        self.dim = dim
+        self.m = m
+        self.m0 = 2 * m  # Layer 0 keeps twice as many links
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1 / math.log(m)
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._vectors = np.zeros((1024, self.dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._slot_by_id: Dict[str, int] = {}
+        self._links: List[List[List[int]]] = []  # slot -> level -> neighbour slots
+        self._deleted: set = set()
+        self._entry: Optional[int] = None
+        self._max_level = -1
+
+    def __len__(self) -> int:
+        return len(self._slot_by_id)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._slot_by_id
+
+    def add(self, item_id: str, vector: Sequence[float]) -> None:
+        """
+        Insert an item, replacing its previous vector if already present
+
+        Args:
+            item_id: ID of the job or resource
+            vector: Embedding vector
+        """
+        query = _normalize(vector)
+        with self._lock:
+            if item_id in self._slot_by_id:
+                self._deleted.add(self._slot_by_id.pop(item_id))
+
+            slot = len(self._ids)
+            if slot == self._vectors.shape[0]:
+                self._vectors = np.concatenate(
+                    [self._vectors, np.zeros_like(self._vectors)]
+                )
+            self._vectors[slot] = query
+            self._ids.append(item_id)
+            self._slot_by_id[item_id] = slot
+
+            level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+            self._links.append([[] for _ in range(level + 1)])
+
+            if self._entry is None:
+                self._entry, self._max_level = slot, level
+                return
+
+            entry = self._entry
+            for layer in range(self._max_level, level, -1):
+                entry = self._greedy_closest(query, entry, layer)
+
+            entries = [entry]
+            for layer in range(min(level, self._max_level), -1, -1):
+                candidates = self._search_layer(
+                    query, entries, self.ef_construction, layer
+                )
+                max_links = self.m0 if layer == 0 else self.m
+                neighbours = self._select_neighbours(candidates, self.m)
+                self._links[slot][layer] = neighbours
+                for neighbour in neighbours:
+                    links = self._links[neighbour][layer]
+                    links.append(slot)
+                    if len(links) > max_links:
+                        self._shrink(neighbour, layer, max_links)
+                entries = [s for _, s in candidates]
+
+            if level > self._max_level:
+                self._entry, self._max_level = slot, level
+
+            if len(self._deleted) > max(1000, len(self._ids) * self.REBUILD_RATIO):
+                self._rebuild()
+
+    def remove(self, item_id: str) -> None:
+        """Tombstone an item so it no longer appears in results"""
+        with self._lock:
+            slot = self._slot_by_id.pop(item_id, None)
+            if slot is not None:
+                self._deleted.add(slot)
+
+    def search(
+        self,
+        vector: Sequence[float],
+        k: int,
+        ef: Optional[int] = None,
+        exclude_id: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the approximate k most similar items
+
+        Args:
+            vector: Query embedding
+            k: Number of results
+            ef: Search beam width (defaults to ef_search, never below k)
+            exclude_id: Item ID to leave out of the results
+
+        Returns:
+            List of (item_id, cosine_similarity) tuples ordered by similarity desc
+        """
+        query = _normalize(vector)
+        with self._lock:
+            if self._entry is None:
+                return []
+
+            entry = self._entry
+            for layer in range(self._max_level, 0, -1):
+                entry = self._greedy_closest(query, entry, layer)
+
+            beam = max(ef or self.ef_search, k + (1 if exclude_id else 0))
+            candidates = self._search_layer(query, [entry], beam, 0)
+
+            results = []
+            for similarity, slot in candidates:
+                if slot in self._deleted or self._ids[slot] == exclude_id:
+                    continue
+                results.append((self._ids[slot], similarity))
+                if len(results) == k:
+                    break
+            return results
+
+    def snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """Return the live item ids and a copy of their normalized vectors"""
+        with self._lock:
+            ids = list(self._slot_by_id.keys())
+            slots = [self._slot_by_id[item_id] for item_id in ids]
+            return ids, self._vectors[slots].copy()
+
+    def vectors(self, item_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Normalized vectors of the given items (zero rows for unknown ids)
+        and a mask of the ids found"""
+        with self._lock:
+            slots, found = _slots(self._slot_by_id, item_ids)
+            matrix = np.zeros((len(item_ids), self.dim), dtype=np.float32)
+            matrix[found] = self._vectors[slots[found]]
+            return matrix, found
+
+    def _greedy_closest(self, query: np.ndarray, entry: int, layer: int) -> int:
+        """Walk to the closest node on a layer, one best neighbour at a time"""
+        best = entry
+        best_similarity = float(self._vectors[entry] @ query)
+        improved = True
+        while improved:
+            improved = False
+            links = self._links[best][layer]
+            if not links:
+                break
+            similarities = self._vectors[links] @ query
+            i = int(np.argmax(similarities))
+            if similarities[i] > best_similarity:
+                best, best_similarity = links[i], float(similarities[i])
+                improved = True
+        return best
+
+    def _search_layer(
+        self, query: np.ndarray, entries: List[int], ef: int, layer: int
+    ) -> List[Tuple[float, int]]:
+        """Beam search on one layer, returning (similarity, slot) sorted desc"""
+        visited = set(entries)
+        similarities = (self._vectors[entries] @ query).tolist()
+        candidates = [(-s, slot) for s, slot in zip(similarities, entries)]
+        heapq.heapify(candidates)
+        results = [(s, slot) for s, slot in zip(similarities, entries)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            negative, current = heapq.heappop(candidates)
+            if len(results) >= ef and -negative < results[0][0]:
+                break
+
+            links = self._links[current]
+            if layer >= len(links):
+                continue
+            neighbours = [n for n in links[layer] if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+
+            neighbour_similarities = (self._vectors[neighbours] @ query).tolist()
+            for similarity, neighbour in zip(neighbour_similarities, neighbours):
+                if len(results) < ef or similarity > results[0][0]:
+                    heapq.heappush(candidates, (-similarity, neighbour))
+                    heapq.heappush(results, (similarity, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _select_neighbours(
+        self, candidates: List[Tuple[float, int]], m: int
+    ) -> List[int]:
+        """
+        HNSW neighbour heuristic: keep a candidate only if it is closer to the
+        new node than to every neighbour already kept, then top up with the
+        nearest pruned candidates.
+        """
+        selected: List[int] = []
+        for similarity, slot in candidates:
+            if len(selected) >= m:
+                break
+            if selected and float(
+                (self._vectors[selected] @ self._vectors[slot]).max()
+            ) > similarity:
+                continue
+            selected.append(slot)
+
+        if len(selected) < m:
+            chosen = set(selected)
+            for _, slot in candidates:
+                if slot not in chosen:
+                    selected.append(slot)
+                    if len(selected) >= m:
+                        break
+        return selected
+
+    def _shrink(self, slot: int, layer: int, max_links: int) -> None:
+        """Keep only the most similar links of a node that overflowed"""
+        links = self._links[slot][layer]
+        similarities = self._vectors[links] @ self._vectors[slot]
+        keep = np.argsort(-similarities)[:max_links]
+        self._links[slot][layer] = [links[i] for i in keep]
+
+    def _rebuild(self) -> None:
+        """Reinsert live items into a fresh graph to drop tombstones"""
+        ids, vectors = self.snapshot()
+        logger.info(f"Rebuilding HNSW index with {len(ids)} live items")
+        self._reset()
+        for item_id, vector in zip(ids, vectors):
+            self.add(item_id, vector)
+
+
+class Int8FlatIndex:
+    """
+    Exact cosine search over int8-quantized vectors
+
+    Each vector is kept as int8 codes plus a float32 scale, about a quarter of
+    the float32 footprint. Queries are scored in float32 chunks of
+    CHUNK_ROWS rows, so the dequantized matrix is never held in memory.
+    Same interface as HNSWIndex.
+    """
+
+    CHUNK_ROWS = 4096
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._codes = np.zeros((1024, dim), dtype=np.int8)
+        self._scales = np.zeros(1024, dtype=np.float32)
+        self._ids: List[str] = []
+        self._slot_by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._slot_by_id
+
+    def add(self, item_id: str, vector: Sequence[float]) -> None:
+        """Insert an item, replacing its previous vector if already present"""
+        codes, _ = quantize_int8(_normalize(vector))
+        # Scale to the norm of the codes rather than the peak, so every stored
+        # vector is exactly unit length and scores stay true cosines
+        scale = 1.0 / max(float(np.linalg.norm(codes.astype(np.float32))), 1e-12)
+        with self._lock:
+            slot = self._slot_by_id.get(item_id)
+            if slot is None:
+                slot = len(self._ids)
+                if slot == self._codes.shape[0]:
+                    self._codes = np.concatenate([self._codes, np.zeros_like(self._codes)])
+                    self._scales = np.concatenate([self._scales, np.zeros_like(self._scales)])
+                self._ids.append(item_id)
+                self._slot_by_id[item_id] = slot
+            self._codes[slot] = codes
+            self._scales[slot] = scale
+
+    def remove(self, item_id: str) -> None:
+        """Drop an item, moving the last row into its slot"""
+        with self._lock:
+            slot = self._slot_by_id.pop(item_id, None)
+            if slot is None:
+                return
+            last = len(self._ids) - 1
+            if slot != last:
+                moved = self._ids[last]
+                self._codes[slot] = self._codes[last]
+                self._scales[slot] = self._scales[last]
+                self._ids[slot] = moved
+                self._slot_by_id[moved] = slot
+            self._ids.pop()
+
+    def search(
+        self,
+        vector: Sequence[float],
+        k: int,
+        ef: Optional[int] = None,
+        exclude_id: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the k most similar items (ef is accepted for interface
+        compatibility; the scan is exhaustive)
+
+        Returns:
+            List of (item_id, cosine_similarity) tuples ordered by similarity desc
+        """
+        query = _normalize(vector)
+        with self._lock:
+            count = len(self._ids)
+            scores = np.empty(count, dtype=np.float32)
+            for start in range(0, count, self.CHUNK_ROWS):
+                end = min(start + self.CHUNK_ROWS, count)
+                scores[start:end] = (
+                    self._codes[start:end].astype(np.float32) @ query
+                ) * self._scales[start:end]
+
+            excluded = self._slot_by_id.get(exclude_id) if exclude_id else None
+            if excluded is not None:
+                scores[excluded] = -np.inf
+            k = min(k, count - (excluded is not None))
+            if k <= 0:
+                return []
+
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._ids[slot], float(scores[slot])) for slot in top]
+
+    def snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """Return the live item ids and their dequantized (unit) vectors"""
+        with self._lock:
+            count = len(self._ids)
+            return (
+                list(self._ids),
+                self._codes[:count].astype(np.float32) * self._scales[:count, None],
+            )
+
+    def vectors(self, item_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Dequantized vectors of the given items (zero rows for unknown ids)
+        and a mask of the ids found"""
+        with self._lock:
+            slots, found = _slots(self._slot_by_id, item_ids)
+            matrix = np.zeros((len(item_ids), self.dim), dtype=np.float32)
+            matrix[found] = (
+                self._codes[slots[found]].astype(np.float32)
+                * self._scales[slots[found], None]
+            )
+            return matrix, found
+
+
+# Set bits per byte value, for Hamming distance over packed bit codes
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class BinaryQuantizedIndex:
+    """
+    Two-stage search: Hamming distance over sign bits, then exact cosine
+
+    Each vector is reduced to one bit per dimension (its sign), packed into
+    dim / 8 bytes. A query first ranks every item by Hamming distance between
+    the packed codes - a cheap XOR and popcount - and keeps the closest
+    `candidates`; those are then reranked by exact cosine against the
+    float32 vectors. Same interface as HNSWIndex, with `ef` taking the role
+    of the candidate count.
+    """
+
+    CHUNK_ROWS = 16384
+
+    def __init__(self, dim: int = 384, candidates: int = 400):
+        self.dim = dim
+        self.candidates = candidates
+        self._lock = threading.RLock()
+        self._bits = np.zeros((1024, dim // 8), dtype=np.uint8)
+        self._vectors = np.zeros((1024, dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._slot_by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._slot_by_id
+
+    def add(self, item_id: str, vector: Sequence[float]) -> None:
+        """Insert an item, replacing its previous vector if already present"""
+        query = _normalize(vector)
+        with self._lock:
+            slot = self._slot_by_id.get(item_id)
+            if slot is None:
+                slot = len(self._ids)
+                if slot == self._bits.shape[0]:
+                    self._bits = np.concatenate([self._bits, np.zeros_like(self._bits)])
+                    self._vectors = np.concatenate(
+                        [self._vectors, np.zeros_like(self._vectors)]
+                    )
+                self._ids.append(item_id)
+                self._slot_by_id[item_id] = slot
+            self._bits[slot] = np.packbits(query > 0)
+            self._vectors[slot] = query
+
+    def remove(self, item_id: str) -> None:
+        """Drop an item, moving the last row into its slot"""
+        with self._lock:
+            slot = self._slot_by_id.pop(item_id, None)
+            if slot is None:
+                return
+            last = len(self._ids) - 1
+            if slot != last:
+                moved = self._ids[last]
+                self._bits[slot] = self._bits[last]
+                self._vectors[slot] = self._vectors[last]
+                self._ids[slot] = moved
+                self._slot_by_id[moved] = slot
+            self._ids.pop()
+
+    def hamming_candidates(self, query: np.ndarray, candidates: int) -> np.ndarray:
+        """Slots of the `candidates` items nearest to a query by Hamming distance"""
+        count = len(self._ids)
+        code = np.packbits(query > 0)
+        distances = np.empty(count, dtype=np.int32)
+        for start in range(0, count, self.CHUNK_ROWS):
+            end = min(start + self.CHUNK_ROWS, count)
+            distances[start:end] = _POPCOUNT[self._bits[start:end] ^ code].sum(axis=1)
+        if candidates >= count:
+            return np.arange(count)
+        return np.argpartition(distances, candidates - 1)[:candidates]
+
+    def search(
+        self,
+        vector: Sequence[float],
+        k: int,
+        ef: Optional[int] = None,
+        exclude_id: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the approximate k most similar items
+
+        Args:
+            vector: Query embedding
+            k: Number of results
+            ef: Hamming candidates reranked exactly (defaults to
+                `candidates`, never below k)
+            exclude_id: Item ID to leave out of the results
+
+        Returns:
+            List of (item_id, cosine_similarity) tuples ordered by similarity desc
+        """
+        query = _normalize(vector)
+        with self._lock:
+            if not self._ids:
+                return []
+            excluded = self._slot_by_id.get(exclude_id) if exclude_id else None
+            slots = self.hamming_candidates(
+                query, max(ef or self.candidates, k + (excluded is not None))
+            )
+            if excluded is not None:
+                slots = slots[slots != excluded]
+
+            scores = self._vectors[slots] @ query
+            k = min(k, len(slots))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._ids[slots[i]], float(scores[i])) for i in top]
+
+    def snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """Return the live item ids and a copy of their normalized vectors"""
+        with self._lock:
+            count = len(self._ids)
+            return list(self._ids), self._vectors[:count].copy()
+
+    def vectors(self, item_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Normalized vectors of the given items (zero rows for unknown ids)
+        and a mask of the ids found"""
+        with self._lock:
+            slots, found = _slots(self._slot_by_id, item_ids)
+            matrix = np.zeros((len(item_ids), self.dim), dtype=np.float32)
+            matrix[found] = self._vectors[slots[found]]
+            return matrix, found
+
+
+class AnnService:
+    """Holds one in-process index per item type and keeps them in sync with the DB"""
+
+    def __init__(self):
+        self._indexes: Dict[str, HNSWIndex] = {}
+
+    @property
+    def required(self) -> bool:
+        """int8 columns cannot be searched in SQL, so the index must be loaded"""
+        return settings.EMBEDDING_STORAGE == INT8
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ANN_INDEX_ENABLED or settings.ANN_BINARY_ENABLED or self.required
+
+    @property
+    def binary(self) -> bool:
+        """Whether candidates come from the two-stage binary-quantized index"""
+        return settings.ANN_BINARY_ENABLED
+
+    def is_ready(self, kind: str) -> bool:
+        return self.enabled and kind in self._indexes
+
+    def index_type(self, kind: str) -> str:
+        """Class name of the loaded index of one kind (for explain output)"""
+        return type(self._indexes[kind]).__name__
+
+    def build_index(self, db: Session, kind: str) -> HNSWIndex:
+        """
+        Build an index for one item type from the embeddings stored in the DB
+
+        Args:
+            db: Database session
+            kind: JOBS or RESOURCES
+
+        Returns:
+            The populated HNSWIndex (BinaryQuantizedIndex with
+            ANN_BINARY_ENABLED, else Int8FlatIndex with int8 storage)
+        """
+        model = Job if kind == JOBS else Resource
+        if self.binary:
+            index = BinaryQuantizedIndex(
+                candidates=settings.ANN_BINARY_CANDIDATES_RECOMMENDED
+            )
+        elif self.required:
+            index = Int8FlatIndex()
+        else:
+            index = HNSWIndex(
+                m=settings.ANN_HNSW_M,
+                ef_construction=settings.ANN_HNSW_EF_CONSTRUCTION,
+                ef_search=settings.ANN_HNSW_EF_SEARCH,
+            )
+        rows = (
+            db.query(model.id, model.embedding)
+            .filter(model.embedding.isnot(None))
+            .yield_per(1000)
+        )
+        for item_id, embedding in rows:
+            index.add(item_id, embedding)
+        return index
+
+    def load(self, db: Session) -> None:
+        """Build the job and resource indexes (called at startup)"""
+        if not self.enabled:
+            return
+        for kind in (JOBS, RESOURCES):
+            self._indexes[kind] = self.build_index(db, kind)
+            logger.info(f"Loaded ANN index for {kind} ({len(self._indexes[kind])} items)")
+
+    def upsert(self, kind: str, item_id: str, embedding) -> None:
+        """Insert or replace an item's vector"""
+        index = self._indexes.get(kind)
+        if index is not None and embedding is not None:
+            index.add(item_id, embedding)
+
+    def remove(self, kind: str, item_id: str) -> None:
+        """Drop an item from the index"""
+        index = self._indexes.get(kind)
+        if index is not None:
+            index.remove(item_id)
+
+    def snapshot(self, kind: str) -> Tuple[List[str], np.ndarray]:
+        """Return (item_ids, normalized vectors) of every live item"""
+        return self._indexes[kind].snapshot()
+
+    def vectors(self, kind: str, item_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (normalized vectors, found mask) of the given items"""
+        return self._indexes[kind].vectors(item_ids)
+
+    def search(
+        self,
+        kind: str,
+        embedding,
+        k: int,
+        exclude_id: Optional[str] = None,
+        ef: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Return (item_id, similarity) for the approximate top-k items
+        (`ef`: search breadth, or rerank candidates of the binary index)"""
+        return self._indexes[kind].search(embedding, k, ef=ef, exclude_id=exclude_id)
+
+
+# Global instance
+ann_service = AnnService()
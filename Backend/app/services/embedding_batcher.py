@@ -0,0 +1,172 @@
+"""
+Micro-batching front end for small embedding requests.
+
+Registrations and profile edits embed one or a few texts each. MicroBatcher
+queues those requests and runs them together: once a pool session is free,
+it takes the queued requests, waits up to EMBEDDING_MICROBATCH_MAX_WAIT_MS
+after the oldest one for more (or until EMBEDDING_MICROBATCH_MAX_SIZE texts
+are queued), runs them as one model call and hands each caller its own rows.
+While every session is busy requests keep queueing, so batches grow with
+load and stay small (one request, no added wait beyond the window) when idle.
+
+submit() returns a Future; embed() blocks on it. If a coalesced call fails,
+its requests are retried one by one, so one bad request cannot fail the
+others. Batch fill (texts per call) and queue delay are recorded as
+histograms, and the delay also in the metrics registry as
+"embedding_batcher.delay".
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from app.services.metrics import Histogram, metrics
+
+logger = logging.getLogger(__name__)
+
+DELAY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class _Request:
+    """Texts of one caller waiting to be embedded"""
+
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """Coalesces concurrent embedding requests into shared model calls"""
+
+    def __init__(
+        self,
+        run: Callable[[List[str]], np.ndarray],
+        max_size: int,
+        max_wait_ms: float,
+        concurrency: int = 1,
+    ):
+        """
+        Args:
+            run: Embeds a list of texts (one model call)
+            max_size: Most texts per coalesced call
+            max_wait_ms: Longest a request waits for others to join its call
+            concurrency: Calls in flight at once (the pool's session count)
+        """
+        self.run = run
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self.concurrency = concurrency
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        self._queued_texts = 0
+        self._slots = threading.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="embedding-batcher"
+        )
+        self._dispatcher: Optional[threading.Thread] = None
+        self.batches = 0
+        self.requests = 0
+        self.fill = Histogram(
+            [2**i for i in range(max_size.bit_length()) if 2**i < max_size] + [max_size]
+        )
+        self.delay = Histogram(DELAY_BUCKETS_MS)
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        """Queue texts for embedding; the Future resolves to their matrix"""
+        request = _Request(list(texts))
+        with self._cond:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch, name="embedding-batcher", daemon=True
+                )
+                self._dispatcher.start()
+            self._queue.append(request)
+            self._queued_texts += len(request.texts)
+            self._cond.notify()
+        return request.future
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts through the batcher, blocking until they are done"""
+        return self.submit(texts).result()
+
+    def _dispatch(self) -> None:
+        while True:
+            # Form a batch only once a session is free to run it
+            self._slots.acquire()
+            batch = self._collect()
+            self._executor.submit(self._run_batch, batch)
+
+    def _collect(self) -> List[_Request]:
+        """Wait for the first request and the batching window, then take a batch"""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0].enqueued + self.max_wait
+            while self._queued_texts < self.max_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, size = [], 0
+            while self._queue and (
+                not batch or size + len(self._queue[0].texts) <= self.max_size
+            ):
+                request = self._queue.popleft()
+                batch.append(request)
+                size += len(request.texts)
+            self._queued_texts -= size
+        return batch
+
+    def _run_batch(self, batch: List[_Request]) -> None:
+        try:
+            start = time.perf_counter()
+            for request in batch:
+                delay_ms = (start - request.enqueued) * 1000
+                self.delay.observe(delay_ms)
+                metrics.observe("embedding_batcher.delay", delay_ms)
+            texts = [text for request in batch for text in request.texts]
+            self.fill.observe(len(texts))
+            with self._cond:
+                self.batches += 1
+                self.requests += len(batch)
+            try:
+                embeddings = self.run(texts)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].future.set_exception(e)
+                    return
+                logger.warning(f"Batch of {len(batch)} embedding requests failed, retrying one by one: {e}")
+                for request in batch:
+                    try:
+                        request.future.set_result(self.run(request.texts))
+                    except Exception as request_error:
+                        request.future.set_exception(request_error)
+                return
+            offset = 0
+            for request in batch:
+                request.future.set_result(embeddings[offset : offset + len(request.texts)])
+                offset += len(request.texts)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "concurrency": self.concurrency,
+            "queued_requests": queued,
+            "batches": self.batches,
+            "requests": self.requests,
+            "batch_fill": self.fill.snapshot(),
+            "queue_delay_ms": self.delay.snapshot(),
+        }
@@ -0,0 +1,250 @@
+"""
+Content-addressed cache of model embeddings.
+
+Entries are keyed on a hash of the model name and the whitespace-normalized
+input text, so identical texts - users with the same skills, education and
+track, jobs re-saved unchanged, a replayed seed - are embedded once. Two
+tiers:
+
+1. an in-process LRU of EMBEDDING_CACHE_SIZE entries
+2. the `embedding_cache` table, shared by every worker and kept across
+   restarts (EMBEDDING_CACHE_PERSISTENT). Lookups refresh an entry's
+   last_used_at at most once a day; prune() drops entries unused for
+   EMBEDDING_CACHE_TTL_DAYS and the least recently used beyond
+   EMBEDDING_CACHE_MAX_ROWS. It runs at startup and from the embedding
+   worker every EMBEDDING_CACHE_PRUNE_INTERVAL_SECONDS.
+
+The cached vectors are the raw float32 model output; callers quantize them
+to EMBEDDING_STORAGE as before, so switching storage modes keeps the cache
+valid. A failing table tier is logged and skipped: embedding never depends
+on it.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from app.core.config import settings
+from app.db.model.embedding_cache import EmbeddingCacheEntry
+from app.db.session import engine
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Input text as the tokenizer sees it (runs of whitespace collapsed)"""
+    return " ".join(text.split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Cache key of a text embedded by a model"""
+    return hashlib.sha256(f"{model_name}\n{normalize_text(text)}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """In-memory LRU tier in front of the persistent embedding_cache table"""
+
+    def __init__(self, max_entries: int, persistent: bool = True):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pruned = 0
+        self._last_prune: Optional[float] = None
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up embeddings by key, memory first, then the table
+
+        Returns:
+            Dict of key -> embedding for the keys found (misses are absent)
+        """
+        found: Dict[str, np.ndarray] = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+        stored = self._load(missing) if missing and self.persistent else {}
+        with self._lock:
+            for key, vector in stored.items():
+                self._remember(key, vector)
+            self.persistent_hits += len(stored)
+            self.misses += len(missing) - len(stored)
+        found.update(stored)
+        return found
+
+    def put_many(self, model_name: str, vectors: Dict[str, np.ndarray]) -> None:
+        """Store freshly computed embeddings in both tiers"""
+        if not vectors:
+            return
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+        if self.persistent:
+            self._store(model_name, vectors)
+
+    def _load(self, keys) -> Dict[str, np.ndarray]:
+        try:
+            with engine.connect() as connection:
+                rows = connection.execute(
+                    select(EmbeddingCacheEntry.key, EmbeddingCacheEntry.embedding).where(
+                        EmbeddingCacheEntry.key.in_(keys)
+                    )
+                ).all()
+                if rows:
+                    # Only entries not touched today are written, so hot keys
+                    # do not cost an update per lookup
+                    connection.execute(
+                        update(EmbeddingCacheEntry)
+                        .where(
+                            EmbeddingCacheEntry.key.in_([key for key, _ in rows]),
+                            EmbeddingCacheEntry.last_used_at
+                            < func.now() - text("interval '1 day'"),
+                        )
+                        .values(last_used_at=func.now())
+                    )
+                    connection.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache table lookup failed: {e}")
+            return {}
+        return {key: np.asarray(vector, dtype=np.float32) for key, vector in rows}
+
+    def _store(self, model_name: str, vectors: Dict[str, np.ndarray]) -> None:
+        # Own transaction, so a rollback of the caller's work keeps the entries
+        try:
+            with engine.begin() as connection:
+                connection.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(
+                        [
+                            {"key": key, "model": model_name, "embedding": vector}
+                            for key, vector in vectors.items()
+                        ]
+                    )
+                    .on_conflict_do_nothing(index_elements=[EmbeddingCacheEntry.key])
+                )
+        except Exception as e:
+            logger.warning(f"Embedding cache table write failed: {e}")
+
+    def prune(
+        self,
+        ttl_days: Optional[int] = None,
+        max_rows: Optional[int] = None,
+    ) -> int:
+        """
+        Bound the table tier
+
+        Deletes entries unused for ttl_days, then the least recently used
+        entries beyond max_rows (settings by default; 0 disables either).
+
+        Returns:
+            Number of entries deleted
+        """
+        ttl_days = settings.EMBEDDING_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+        max_rows = settings.EMBEDDING_CACHE_MAX_ROWS if max_rows is None else max_rows
+        deleted = 0
+        try:
+            with engine.begin() as connection:
+                if ttl_days > 0:
+                    deleted += connection.execute(
+                        delete(EmbeddingCacheEntry).where(
+                            EmbeddingCacheEntry.last_used_at
+                            < func.now() - func.make_interval(0, 0, 0, ttl_days)
+                        )
+                    ).rowcount
+                if max_rows > 0:
+                    excess = (
+                        connection.execute(
+                            select(func.count()).select_from(EmbeddingCacheEntry)
+                        ).scalar()
+                        - max_rows
+                    )
+                    if excess > 0:
+                        oldest = (
+                            select(EmbeddingCacheEntry.key)
+                            .order_by(EmbeddingCacheEntry.last_used_at)
+                            .limit(excess)
+                        )
+                        deleted += connection.execute(
+                            delete(EmbeddingCacheEntry).where(
+                                EmbeddingCacheEntry.key.in_(oldest.scalar_subquery())
+                            )
+                        ).rowcount
+        except Exception as e:
+            logger.warning(f"Embedding cache table prune failed: {e}")
+            return 0
+        self._last_prune = time.monotonic()
+        if deleted:
+            self.pruned += deleted
+            logger.info(f"Pruned {deleted} embedding cache entries")
+        return deleted
+
+    def prune_if_due(self) -> int:
+        """prune() at most every EMBEDDING_CACHE_PRUNE_INTERVAL_SECONDS"""
+        if not self.persistent:
+            return 0
+        if (
+            self._last_prune is not None
+            and time.monotonic() - self._last_prune
+            < settings.EMBEDDING_CACHE_PRUNE_INTERVAL_SECONDS
+        ):
+            return 0
+        return self.prune()
+
+    def clear(self) -> None:
+        """Drop the in-memory entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        hits = self.memory_hits + self.persistent_hits
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": self.persistent,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pruned": self.pruned,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_hit_rate": self.memory_hits / lookups if lookups else 0.0,
+        }
+
+
+def ensure_embedding_cache_table() -> None:
+    """Prune the table tier at startup"""
+    if embedding_cache.persistent:
+        embedding_cache.prune()
+
+
+# Global instance
+embedding_cache = EmbeddingCache(
+    max_entries=settings.EMBEDDING_CACHE_SIZE,
+    persistent=settings.EMBEDDING_CACHE_PERSISTENT,
+)
@@ -0,0 +1,185 @@
+"""
+Pool of embedding model sessions for EmbeddingService.
+
+Each slot holds its own model instance (one ONNX Runtime session) created
+with an explicit intra-op thread count, so concurrent requests run on
+separate sessions instead of contending for the threads of a single shared
+one. ONNX Runtime releases the GIL while it runs, so sessions in threads of
+one process scale across cores without worker processes.
+
+Sizing (EMBEDDING_POOL_SIZE, EMBEDDING_INTRA_OP_THREADS; 0 = auto) splits
+the usable cores of the host: by default up to MAX_AUTO_SESSIONS sessions,
+each with an equal share of the cores as intra-op threads.
+
+Sessions are handed out strictly in arrival order: a released session goes
+straight to the longest-waiting caller rather than back to the pool, so no
+caller can barge ahead. Inputs larger than one batch are split into batches
+that queue for a session one by one; a bulk job then runs on every idle
+session, yet a registration arriving meanwhile waits for one batch, not for
+the whole job.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_AUTO_SESSIONS = 4
+
+
+def usable_cores() -> int:
+    """Cores this process may run on (CPU affinity, where supported)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def pool_shape(cores: int, sessions: int = 0, threads: int = 0) -> Tuple[int, int]:
+    """
+    Number of sessions and intra-op threads per session for a host
+
+    Args:
+        cores: Usable cores
+        sessions: Configured pool size (0 = auto)
+        threads: Configured threads per session (0 = auto)
+
+    Returns:
+        Tuple of (sessions, threads per session)
+    """
+    if sessions <= 0:
+        sessions = max(1, min(MAX_AUTO_SESSIONS, cores // max(threads, 1)))
+    if threads <= 0:
+        threads = max(1, cores // sessions)
+    return sessions, threads
+
+
+class _Waiter:
+    """A caller queued for a session"""
+
+    __slots__ = ("event", "session")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.session = None
+
+
+class EmbeddingPool:
+    """Fixed set of model sessions with first-come, first-served checkout"""
+
+    def __init__(self, factory: Callable[[], Any], size: int, threads: int):
+        """
+        Args:
+            factory: Creates one model session (called `size` times)
+            size: Number of sessions
+            threads: Intra-op threads per session (reported in stats)
+        """
+        self.size = size
+        self.threads = threads
+        self._lock = threading.Lock()
+        self._idle = deque(factory() for _ in range(size))
+        self._waiters: deque = deque()
+        self._executor = (
+            ThreadPoolExecutor(max_workers=size, thread_name_prefix="embedding-pool")
+            if size > 1
+            else None
+        )
+        self.calls = 0
+        self.texts = 0
+        self.busy_seconds = 0.0
+
+    def _checkout(self) -> Any:
+        """Take a session, waiting in line if all are busy"""
+        with self._lock:
+            # Waiters only exist while no session is idle
+            if self._idle:
+                return self._idle.popleft()
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+        waiter.event.wait()
+        return waiter.session
+
+    def _checkin(self, session: Any) -> None:
+        """Hand a session to the longest-waiting caller, or back to the pool"""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.session = session
+                waiter.event.set()
+            else:
+                self._idle.append(session)
+
+    @contextmanager
+    def session(self) -> Iterator[Any]:
+        """Check out a session, waiting in line if all are busy"""
+        start = time.perf_counter()
+        session = self._checkout()
+        metrics.observe("embedding_pool.wait", (time.perf_counter() - start) * 1000)
+        try:
+            yield session
+        finally:
+            self._checkin(session)
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        """Embed one batch on the next free session"""
+        with self.session() as model:
+            start = time.perf_counter()
+            embeddings = np.asarray(
+                list(model.embed(texts, batch_size=len(texts))), dtype=np.float32
+            )
+            elapsed = time.perf_counter() - start
+        metrics.observe("embedding_pool.run", elapsed * 1000)
+        with self._lock:
+            self.calls += 1
+            self.texts += len(texts)
+            self.busy_seconds += elapsed
+        return embeddings
+
+    def embed(self, texts: Sequence[str], batch_size: int) -> np.ndarray:
+        """
+        Embed texts in batches of batch_size, running batches in parallel
+
+        Returns:
+            Matrix with one embedding per text, in input order
+        """
+        batches = [list(texts[i : i + batch_size]) for i in range(0, len(texts), batch_size)]
+        if len(batches) == 1 or self._executor is None:
+            results = [self._run(batch) for batch in batches]
+        else:
+            results = list(self._executor.map(self._run, batches))
+        return np.concatenate(results)
+
+    def warm_up(self, text: str) -> None:
+        """Run one text through every session (call before serving traffic)"""
+        sessions = []
+        try:
+            for _ in range(self.size):
+                sessions.append(self._checkout())
+            for session in sessions:
+                list(session.embed([text]))
+        finally:
+            for session in sessions:
+                self._checkin(session)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return {
+                "sessions": self.size,
+                "threads_per_session": self.threads,
+                "idle": len(self._idle),
+                "waiting": len(self._waiters),
+                "calls": self.calls,
+                "texts": self.texts,
+                "texts_per_busy_second": (
+                    self.texts / self.busy_seconds if self.busy_seconds else None
+                ),
+            }
@@ -0,0 +1,171 @@
+"""
+Durable queue of embedding work (the embedding_tasks table).
+
+Job, resource and user profile writes do not run the embedding model in the
+request: the CRUD functions add a task row in the same transaction as the
+row itself and return once it is committed. EmbeddingWorker
+(app/services/embedding_worker.py) claims ready tasks in batches with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers share the queue
+without running a task twice, and a task whose worker dies is simply
+unlocked again.
+
+A failed task is retried with exponential backoff (EMBEDDING_QUEUE_RETRY_*)
+and kept, with its last error, as dead after EMBEDDING_QUEUE_MAX_ATTEMPTS.
+stats() reports queue depth, age of the oldest ready task and dead tasks for
+backpressure monitoring; the lag from enqueue to embedding is recorded in the
+metrics registry as "embedding_queue.lag".
+"""
+
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.db.model.embedding_task import EmbeddingTask
+from app.services.metrics import metrics
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Item type of user profile tasks (jobs and resources use JOBS / RESOURCES)
+USERS = "users"
+
+
+class EmbeddingQueue:
+    """Enqueues, claims and settles embedding tasks"""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.retried = 0
+        self.dead = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.EMBEDDING_QUEUE_ENABLED
+
+    def enqueue(self, db: Session, kind: str, item_id: str) -> None:
+        """Add a task to the caller's transaction (committed with the item)"""
+        db.add(EmbeddingTask(item_type=kind, item_id=item_id))
+
+    def is_pending(self, db: Session, kind: str, item_id: str) -> bool:
+        """Whether an item has a queued (not dead) embedding task"""
+        return (
+            db.query(EmbeddingTask.id)
+            .filter(
+                EmbeddingTask.item_type == kind,
+                EmbeddingTask.item_id == item_id,
+                EmbeddingTask.attempts < settings.EMBEDDING_QUEUE_MAX_ATTEMPTS,
+            )
+            .first()
+            is not None
+        )
+
+    def pending_ids(self, db: Session, kind: str, item_ids: List[str]) -> Set[str]:
+        """Those of item_ids that have a queued (not dead) embedding task"""
+        rows = db.query(EmbeddingTask.item_id).filter(
+            EmbeddingTask.item_type == kind,
+            EmbeddingTask.item_id.in_(item_ids),
+            EmbeddingTask.attempts < settings.EMBEDDING_QUEUE_MAX_ATTEMPTS,
+        )
+        return {item_id for (item_id,) in rows}
+
+    def notify(self) -> None:
+        """Wake the in-process worker after a commit that enqueued tasks"""
+        self._wake.set()
+
+    def wait(self, timeout: float) -> bool:
+        """Block until notify() or the timeout; True if notified"""
+        woken = self._wake.wait(timeout)
+        self._wake.clear()
+        return woken
+
+    def claim(self, session: Session, limit: int) -> List[EmbeddingTask]:
+        """
+        Lock up to `limit` ready tasks, oldest first
+
+        Tasks locked by another worker are skipped; the locks are held until
+        the session's transaction ends.
+        """
+        return (
+            session.query(EmbeddingTask)
+            .filter(
+                EmbeddingTask.run_at <= func.now(),
+                EmbeddingTask.attempts < settings.EMBEDDING_QUEUE_MAX_ATTEMPTS,
+            )
+            .order_by(EmbeddingTask.run_at, EmbeddingTask.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def complete(self, session: Session, tasks: List[EmbeddingTask]) -> None:
+        """Delete finished tasks (in the transaction that stores the embeddings)"""
+        if not tasks:
+            return
+        ages = session.execute(
+            delete(EmbeddingTask)
+            .where(EmbeddingTask.id.in_([task.id for task in tasks]))
+            .returning(func.extract("epoch", func.now() - EmbeddingTask.created_at))
+            .execution_options(synchronize_session=False)
+        ).scalars()
+        for age in ages:
+            metrics.observe("embedding_queue.lag", float(age) * 1000)
+        with self._lock:
+            self.completed += len(tasks)
+
+    def retry(self, session: Session, failures: List[Tuple[EmbeddingTask, str]]) -> None:
+        """Push failed tasks back with exponential backoff"""
+        for task, error in failures:
+            task.attempts += 1
+            task.last_error = error[:1000]
+            delay = min(
+                settings.EMBEDDING_QUEUE_RETRY_BASE_SECONDS * 2 ** (task.attempts - 1),
+                settings.EMBEDDING_QUEUE_RETRY_MAX_SECONDS,
+            )
+            task.run_at = func.now() + timedelta(seconds=delay)
+            if task.attempts >= settings.EMBEDDING_QUEUE_MAX_ATTEMPTS:
+                logger.error(
+                    f"Giving up embedding {task.item_type} {task.item_id} after "
+                    f"{task.attempts} attempts: {error}"
+                )
+                with self._lock:
+                    self.dead += 1
+            else:
+                logger.warning(
+                    f"Embedding {task.item_type} {task.item_id} failed "
+                    f"(attempt {task.attempts}), retrying in {delay:.0f}s: {error}"
+                )
+                with self._lock:
+                    self.retried += 1
+
+    def stats(self, db: Session) -> Dict[str, Optional[float]]:
+        """Queue depth and lag (all workers) and this process's task counters"""
+        live = EmbeddingTask.attempts < settings.EMBEDDING_QUEUE_MAX_ATTEMPTS
+        ready = and_(live, EmbeddingTask.run_at <= func.now())
+        row = db.execute(
+            select(
+                func.count().filter(ready),
+                func.count().filter(and_(live, EmbeddingTask.run_at > func.now())),
+                func.count().filter(~live),
+                func.extract(
+                    "epoch", func.now() - func.min(EmbeddingTask.created_at).filter(ready)
+                ),
+            )
+        ).one()
+        return {
+            "ready": row[0],
+            "delayed": row[1],
+            "dead": row[2],
+            "oldest_ready_age_seconds": float(row[3]) if row[3] is not None else None,
+            "completed": self.completed,
+            "retried": self.retried,
+            "gave_up": self.dead,
+        }
+
+
+# Global instance
+embedding_queue = EmbeddingQueue()
@@ -1,24 +1,63 @@
 """
 Embedding service for generating text embeddings using FastEmbed.
+
+Profile, job and resource embeddings are quantized to the configured
+EMBEDDING_STORAGE on creation, so the in-memory vectors the services score
+right after a write equal what is read back from the database later.
+
+Bulk paths (seeding, backfill, re-embedding) use embed_jobs/embed_resources/
+embed_users, which embed EMBEDDING_BATCH_SIZE texts per ONNX call instead of
+one call per item. Model calls run on a pool of sessions
+(app/services/embedding_pool.py), so concurrent requests and the batches of
+a bulk call use several cores; concurrent small requests are coalesced into
+shared model calls first (app/services/embedding_batcher.py).
+
+Each stored embedding carries a fingerprint of the exact text it was
+computed from and the model id (store_embedding); writes and the reconciler
+(app/db/embedding_backfill.py) re-embed an item only when needs_embedding()
+finds them changed.
+
+The model is loaded on first use, not at import, so importing the CRUD
+modules (workers, scripts, tests) stays cheap. The API loads and warms it in
+the background at startup (warm_up), and /ready reports 503 until it is warm.
 """
 
+import hashlib
 import logging
-from typing import List, Optional
+import threading
+from typing import Dict, List, Optional, Sequence, Union
 
+import numpy as np
+from app.core.config import settings
 from app.core.exceptions import EmbeddingGenerationError
+from app.db.embedding_types import EMBEDDING_DIM, round_trip
 from app.db.model.job import Job
 from app.db.model.resources import Resource
 from app.db.model.user import User
-from fastembed import TextEmbedding
+from app.services.embedding_batcher import MicroBatcher
+from app.services.embedding_cache import cache_key, embedding_cache, normalize_text
+from app.services.embedding_pool import EmbeddingPool, pool_shape, usable_cores
+from sqlalchemy import inspect
 
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = "BAAI/bge-small-en-v1.5"
+
+
+def text_fingerprint(text: str) -> str:
+    """Fingerprint of an embedded text (hash of the text as the model sees it)"""
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
 
 class EmbeddingService:
     """Service for generating text embeddings using FastEmbed"""
 
     _instance: Optional["EmbeddingService"] = None
-    _model: Optional[TextEmbedding] = None
+    _pool: Optional[EmbeddingPool] = None
+    _batcher: Optional[MicroBatcher] = None
+    _load_lock = threading.Lock()
+    _warm = False
+    _load_error: Optional[str] = None
 
     def __new__(cls):
         """Singleton pattern to avoid reloading model"""
@@ -26,14 +65,44 @@ class EmbeddingService:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        """Initialize FastEmbed model (BAAI/bge-small-en-v1.5)"""
-        if self._model is None:
+    def _ensure_loaded(self) -> EmbeddingPool:
+        """Create the pool of FastEmbed model sessions (BAAI/bge-small-en-v1.5) once"""
+        if self._pool is not None:
+            return self._pool
+        with self._load_lock:
+            if self._pool is not None:
+                return self._pool
             try:
-                logger.info("Initializing FastEmbed model: BAAI/bge-small-en-v1.5")
-                self._model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+                # Imported here: fastembed pulls in onnxruntime and huggingface_hub
+                from fastembed import TextEmbedding
+
+                sessions, threads = pool_shape(
+                    usable_cores(),
+                    settings.EMBEDDING_POOL_SIZE,
+                    settings.EMBEDDING_INTRA_OP_THREADS,
+                )
+                logger.info(
+                    f"Initializing FastEmbed model: {MODEL_NAME} "
+                    f"({sessions} sessions x {threads} threads)"
+                )
+                pool = EmbeddingPool(
+                    lambda: TextEmbedding(model_name=MODEL_NAME, threads=threads),
+                    sessions,
+                    threads,
+                )
+                if settings.EMBEDDING_MICROBATCH_ENABLED:
+                    EmbeddingService._batcher = MicroBatcher(
+                        lambda texts: pool.embed(texts, len(texts)),
+                        settings.EMBEDDING_MICROBATCH_MAX_SIZE,
+                        settings.EMBEDDING_MICROBATCH_MAX_WAIT_MS,
+                        concurrency=sessions,
+                    )
+                EmbeddingService._pool = pool
+                EmbeddingService._load_error = None
                 logger.info("FastEmbed model initialized successfully")
+                return pool
             except Exception as e:
+                EmbeddingService._load_error = str(e)
                 logger.critical(
                     f"Failed to initialize FastEmbed model: {e}", exc_info=True
                 )
@@ -41,50 +110,123 @@ class EmbeddingService:
                     f"Failed to initialize FastEmbed model: {e}"
                 )
 
-    def generate_embedding(self, text: str) -> List[float]:
+    def warm_up(self) -> None:
         """
-        Generate 384-dimensional embedding for input text
+        Load the model and run one embedding on every session
+
+        The first call of an ONNX session allocates its buffers; doing it
+        before traffic keeps that off the first requests. Bypasses the
+        embedding cache.
+
+        Raises:
+            EmbeddingGenerationError: If the model cannot be loaded or run
+        """
+        pool = self._ensure_loaded()
+        try:
+            pool.warm_up("warm up")
+        except Exception as e:
+            EmbeddingService._load_error = str(e)
+            raise EmbeddingGenerationError(f"Model warm-up failed: {e}")
+        EmbeddingService._warm = True
+        logger.info("FastEmbed model warmed up")
+
+    def start_warm_up(self) -> threading.Thread:
+        """Run warm_up() in a background thread (errors are logged)"""
+
+        def run():
+            try:
+                self.warm_up()
+            except EmbeddingGenerationError as e:
+                logger.error(f"Embedding model warm-up failed: {e}")
+
+        thread = threading.Thread(target=run, name="embedding-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def readiness(self) -> Dict[str, object]:
+        """Whether the model is loaded and warm, and the last load error"""
+        return {
+            "loaded": self._pool is not None,
+            "warm": self._warm,
+            "error": self._load_error,
+        }
+
+    def generate_embeddings(
+        self, texts: Sequence[str], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Generate embeddings for many texts, batch_size texts per model call
+
+        Texts already in the embedding cache (by model and normalized text)
+        are not embedded again; each distinct new text is embedded once.
 
         Args:
-            text: Input text to embed
+            texts: Input texts to embed
+            batch_size: Texts per ONNX call; batches run on separate pool
+                sessions (default: EMBEDDING_BATCH_SIZE)
 
         Returns:
-            List of 384 float values representing the embedding
+            float32 matrix with one 384-dim embedding per text
 
         Raises:
-            EmbeddingGenerationError: If embedding generation fails
+            EmbeddingGenerationError: If a text is empty or generation fails
         """
-        if not text or not text.strip():
+        if not texts:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        if any(not text or not text.strip() for text in texts):
             logger.warning("Empty or None text provided for embedding generation")
             raise EmbeddingGenerationError("Cannot generate embedding for empty text")
 
+        keys = [cache_key(MODEL_NAME, text) for text in texts]
+        vectors = embedding_cache.get_many(keys)
+        pending = {
+            key: normalize_text(text) for key, text in zip(keys, texts) if key not in vectors
+        }
+        if pending:
+            computed = self._embed_texts(list(pending.values()), batch_size)
+            fresh = dict(zip(pending, computed))
+            embedding_cache.put_many(MODEL_NAME, fresh)
+            vectors.update(fresh)
+        return np.stack([vectors[key] for key in keys])
+
+    def _embed_texts(self, texts: List[str], batch_size: Optional[int]) -> np.ndarray:
+        """Run the model over non-empty texts"""
+        pool = self._ensure_loaded()
+        texts = [text.strip() for text in texts]
         try:
-            # FastEmbed returns a generator, we take the first result
-            embeddings = list(self._model.embed([text.strip()]))
-            if not embeddings:
-                raise EmbeddingGenerationError("No embedding generated")
+            if self._batcher is not None and len(texts) < self._batcher.max_size:
+                # Small request: share a model call with concurrent ones
+                embeddings = self._batcher.embed(texts)
+            else:
+                embeddings = pool.embed(
+                    texts, batch_size or settings.EMBEDDING_BATCH_SIZE
+                )
+        except Exception as e:
+            logger.error(f"Failed to generate embeddings: {e}", exc_info=True)
+            raise EmbeddingGenerationError(f"Failed to generate embeddings: {e}")
 
-            embedding = embeddings[0].tolist()
+        # Verify shape
+        if embeddings.shape != (len(texts), EMBEDDING_DIM):
+            raise EmbeddingGenerationError(
+                f"Expected {len(texts)} x {EMBEDDING_DIM} embeddings, got {embeddings.shape}"
+            )
+        return embeddings
 
-            # Verify dimensions
-            if len(embedding) != 384:
-                raise EmbeddingGenerationError(
-                    f"Expected 384 dimensions, got {len(embedding)}"
-                )
+    def pool_stats(self) -> Optional[Dict[str, Optional[float]]]:
+        """Sessions, queueing and throughput of the model session pool (None
+        until the model is loaded)"""
+        return self._pool.stats() if self._pool is not None else None
 
-            return embedding
-        except EmbeddingGenerationError:
-            raise
-        except Exception as e:
-            logger.error(f"Failed to generate embedding: {e}", exc_info=True)
-            raise EmbeddingGenerationError(f"Failed to generate embedding: {e}")
+    def batcher_stats(self) -> Optional[Dict[str, object]]:
+        """Batch fill and queue delay histograms of the micro-batcher"""
+        return self._batcher.stats() if self._batcher is not None else None
 
-    def generate_user_embedding(self, user: User) -> List[float]:
+    def generate_embedding(self, text: str) -> List[float]:
         """
-        Generate embedding from user profile fields
+        Generate 384-dimensional embedding for input text
 
         Args:
-            user: User model instance
+            text: Input text to embed
 
         Returns:
             List of 384 float values representing the embedding
@@ -92,57 +234,116 @@ class EmbeddingService:
         Raises:
             EmbeddingGenerationError: If embedding generation fails
         """
-        # Concatenate user profile fields
+        return self.generate_embeddings([text])[0].tolist()
+
+    @staticmethod
+    def user_text(user: User) -> str:
+        """Text embedded for a user profile (skills, education, career track)"""
         skills_text = " ".join(user.skills) if user.skills else ""
         text_parts = [
             skills_text,
             user.education_level or "",
             user.preferred_career_track or "",
         ]
-
         text = " ".join(part for part in text_parts if part.strip())
 
         if not text.strip():
             raise EmbeddingGenerationError("User profile has no content to embed")
+        return text
 
-        logger.debug(f"Generating embedding for user {user.id}")
-        return self.generate_embedding(text)
-
-    def generate_job_embedding(self, job: Job) -> List[float]:
-        """
-        Generate embedding from job listing fields
-
-        Args:
-            job: Job model instance
-
-        Returns:
-            List of 384 float values representing the embedding
-
-        Raises:
-            EmbeddingGenerationError: If embedding generation fails
-        """
-        # Concatenate job fields
+    @staticmethod
+    def job_text(job: Job) -> str:
+        """Text embedded for a job (title, description, skills, level)"""
         skills_text = " ".join(job.required_skills) if job.required_skills else ""
         experience_text = (
             job.recommended_experience_level.value
             if job.recommended_experience_level
             else ""
         )
-
         text_parts = [
             job.title or "",
             job.description or "",
             skills_text,
             experience_text,
         ]
-
         text = " ".join(part for part in text_parts if part.strip())
 
         if not text.strip():
             raise EmbeddingGenerationError("Job listing has no content to embed")
+        return text
+
+    @staticmethod
+    def resource_text(resource: Resource) -> str:
+        """Text embedded for a resource (name, description, tags)"""
+        tags_text = " ".join(resource.tags) if resource.tags else ""
+        text_parts = [resource.name or "", resource.description or "", tags_text]
+        text = " ".join(part for part in text_parts if part.strip())
+
+        if not text.strip():
+            raise EmbeddingGenerationError("Resource has no content to embed")
+        return text
+
+    def item_text(self, item: Union[User, Job, Resource]) -> str:
+        """Text embedded for a user, job or resource"""
+        if isinstance(item, User):
+            return self.user_text(item)
+        if isinstance(item, Job):
+            return self.job_text(item)
+        return self.resource_text(item)
+
+    def needs_embedding(self, item: Union[User, Job, Resource]) -> bool:
+        """
+        Whether an item's stored embedding is missing or stale
+
+        Stale means computed from a different text or by a different model
+        than the current ones. An item with no text to embed never needs one.
+        A deferred embedding column is not loaded to check it for NULL.
+        """
+        try:
+            fingerprint = text_fingerprint(self.item_text(item))
+        except EmbeddingGenerationError:
+            return False
+        if item.embedding_fingerprint != fingerprint or item.embedding_model != MODEL_NAME:
+            return True
+        return "embedding" not in inspect(item).unloaded and item.embedding is None
+
+    def store_embedding(self, item: Union[User, Job, Resource], embedding) -> None:
+        """Set an item's embedding with the fingerprint of its text and the model id"""
+        item.embedding = embedding
+        item.embedding_fingerprint = text_fingerprint(self.item_text(item))
+        item.embedding_model = MODEL_NAME
+
+    def generate_user_embedding(self, user: User) -> List[float]:
+        """
+        Generate embedding from user profile fields
+
+        Args:
+            user: User model instance
+
+        Returns:
+            List of 384 float values representing the embedding
+
+        Raises:
+            EmbeddingGenerationError: If embedding generation fails
+        """
+        logger.debug(f"Generating embedding for user {user.id}")
+        return self.embed_users([user])[0].tolist()
+
+    def generate_job_embedding(self, job: Job) -> List[float]:
+        """
+        Generate embedding from job listing fields
+
+        Args:
+            job: Job model instance
 
+        Returns:
+            List of 384 float values representing the embedding
+
+        Raises:
+            EmbeddingGenerationError: If embedding generation fails
+        """
         logger.debug(f"Generating embedding for job {job.id}")
-        return self.generate_embedding(text)
+        return self.embed_jobs([job])[0].tolist()
 
     def generate_resource_embedding(self, resource: Resource) -> List[float]:
         """
@@ -157,18 +358,51 @@ class EmbeddingService:
         Raises:
             EmbeddingGenerationError: If embedding generation fails
         """
-        # Concatenate resource fields
-        tags_text = " ".join(resource.tags) if resource.tags else ""
+        logger.debug(f"Generating embedding for resource {resource.id}")
+        return self.embed_resources([resource])[0].tolist()
 
-        text_parts = [resource.name or "", resource.description or "", tags_text]
+    def embed_users(
+        self, users: Sequence[User], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Embed many user profiles in batches
 
-        text = " ".join(part for part in text_parts if part.strip())
+        Returns:
+            float32 matrix, one row per user, quantized like the stored column
 
-        if not text.strip():
-            raise EmbeddingGenerationError("Resource has no content to embed")
+        Raises:
+            EmbeddingGenerationError: If a profile is empty or generation fails
+        """
+        texts = [self.user_text(user) for user in users]
+        return round_trip(self.generate_embeddings(texts, batch_size), sql_similarity=True)
 
-        logger.debug(f"Generating embedding for resource {resource.id}")
-        return self.generate_embedding(text)
+    def embed_jobs(self, jobs: Sequence[Job], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Embed many jobs in batches
+
+        Returns:
+            float32 matrix, one row per job, quantized like the stored column
+
+        Raises:
+            EmbeddingGenerationError: If a job is empty or generation fails
+        """
+        texts = [self.job_text(job) for job in jobs]
+        return round_trip(self.generate_embeddings(texts, batch_size))
+
+    def embed_resources(
+        self, resources: Sequence[Resource], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Embed many resources in batches
+
+        Returns:
+            float32 matrix, one row per resource, quantized like the stored column
+
+        Raises:
+            EmbeddingGenerationError: If a resource is empty or generation fails
+        """
+        texts = [self.resource_text(resource) for resource in resources]
+        return round_trip(self.generate_embeddings(texts, batch_size))
 
 
 # Global instance
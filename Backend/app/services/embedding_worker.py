@@ -0,0 +1,178 @@
+"""
+Background worker that drains the embedding queue.
+
+Each batch claims up to EMBEDDING_QUEUE_BATCH_SIZE ready tasks (see
+app/services/embedding_queue.py), embeds the distinct items of each type
+with one EmbeddingService.embed_* call, stores the embeddings and deletes
+the tasks in one transaction, and then updates the ANN index, stored
+recommendation/neighbour lists and result cache as the inline path did.
+Items deleted since they were queued are dropped with their tasks, and items
+whose stored embedding already matches their text and the model (duplicate
+tasks, edits that were reverted) are completed without running the model.
+
+By default every API process runs the worker in a thread, woken by the CRUD
+functions right after they commit. `python worker.py` runs a standalone
+worker instead. The in-process ANN index is only updated in the process that
+embedded the item, so worker.py refuses to start when that index is in use
+(ANN_INDEX_ENABLED, ANN_BINARY_ENABLED or int8 storage), and the API starts
+its in-process worker regardless of EMBEDDING_QUEUE_IN_PROCESS_WORKER.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.crud.job import sync_job_embedding
+from app.db.crud.resources import sync_resource_embedding
+from app.db.crud.user import sync_user_embedding
+from app.db.model.embedding_task import EmbeddingTask
+from app.db.model.job import Job
+from app.db.model.resources import Resource
+from app.db.model.user import User
+from app.db.session import SessionLocal
+from app.services.embedding_cache import embedding_cache
+from app.services.embedding_queue import USERS, embedding_queue
+from app.services.embedding_service import embedding_service
+from app.services.metrics import metrics
+from app.services.tfidf_service import JOBS, RESOURCES
+
+logger = logging.getLogger(__name__)
+
+# Item type -> (model, batch embedder, post-commit sync)
+HANDLERS = {
+    JOBS: (Job, embedding_service.embed_jobs, lambda db, job: sync_job_embedding(job)),
+    RESOURCES: (
+        Resource,
+        embedding_service.embed_resources,
+        lambda db, resource: sync_resource_embedding(resource),
+    ),
+    USERS: (User, embedding_service.embed_users, sync_user_embedding),
+}
+
+
+def _embed_items(kind: str, embed, items) -> Tuple[List[Tuple], Dict[str, str]]:
+    """(item, embedding) pairs and errors by item id; a failed batch is split"""
+    try:
+        return list(zip(items, embed(items))), {}
+    except Exception as e:
+        if len(items) > 1:
+            logger.warning(f"Batch of {len(items)} {kind} failed, embedding one by one: {e}")
+        else:
+            return [], {items[0].id: str(e)}
+    pairs, errors = [], {}
+    for item in items:
+        try:
+            pairs.append((item, embed([item])[0]))
+        except Exception as e:
+            errors[item.id] = str(e)
+    return pairs, errors
+
+
+class EmbeddingWorker:
+    """Claims and processes embedding tasks, in a thread or a standalone loop"""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def process_batch(self) -> int:
+        """
+        Claim and process one batch of ready tasks
+
+        Returns:
+            Number of tasks claimed (0 when the queue has no ready task)
+        """
+        start = time.perf_counter()
+        with SessionLocal() as session:
+            tasks = embedding_queue.claim(session, settings.EMBEDDING_QUEUE_BATCH_SIZE)
+            if not tasks:
+                session.rollback()
+                return 0
+
+            by_item: Dict[str, Dict[str, List[EmbeddingTask]]] = {}
+            for task in tasks:
+                by_item.setdefault(task.item_type, {}).setdefault(task.item_id, []).append(task)
+
+            done, failed, embedded = [], [], []
+            for kind, item_tasks in by_item.items():
+                if kind not in HANDLERS:
+                    failed.extend(
+                        (task, f"Unknown item type {kind}")
+                        for tasks_of_item in item_tasks.values()
+                        for task in tasks_of_item
+                    )
+                    continue
+                model, embed, sync = HANDLERS[kind]
+                items = session.query(model).filter(model.id.in_(list(item_tasks))).all()
+                items = [item for item in items if embedding_service.needs_embedding(item)]
+                pairs, errors = (
+                    _embed_items(kind, embed, items) if items else ([], {})
+                )
+                for item, vector in pairs:
+                    embedding_service.store_embedding(item, vector.tolist())
+                    embedded.append((sync, item))
+                for item_id, tasks_of_item in item_tasks.items():
+                    if item_id in errors:
+                        failed.extend((task, errors[item_id]) for task in tasks_of_item)
+                    else:
+                        done.extend(tasks_of_item)
+
+            embedding_queue.complete(session, done)
+            embedding_queue.retry(session, failed)
+            session.commit()
+
+            for sync, item in embedded:
+                try:
+                    sync(session, item)
+                except Exception as e:
+                    logger.error(f"Failed to sync indexes for {item}: {e}", exc_info=True)
+
+        metrics.observe("embedding_queue.batch", (time.perf_counter() - start) * 1000)
+        logger.info(f"Embedded {len(embedded)} items ({len(failed)} tasks failed)")
+        return len(tasks)
+
+    def drain(self) -> int:
+        """Process batches until no task is ready; returns tasks claimed"""
+        claimed = 0
+        while True:
+            batch = self.process_batch()
+            if not batch:
+                return claimed
+            claimed += batch
+
+    def run(self) -> None:
+        """Process batches until stop(), waiting for work when the queue is idle"""
+        while not self._stop.is_set():
+            try:
+                claimed = self.process_batch()
+            except Exception as e:
+                logger.error(f"Embedding worker batch failed: {e}", exc_info=True)
+                claimed = 0
+            if not claimed:
+                # Idle: keep the embedding cache table bounded
+                embedding_cache.prune_if_due()
+                embedding_queue.wait(settings.EMBEDDING_QUEUE_POLL_SECONDS)
+
+    def start(self) -> None:
+        """Run the worker in a daemon thread of this process"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="embedding-worker", daemon=True)
+        self._thread.start()
+        logger.info("Started in-process embedding worker")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the worker thread after its current batch"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        embedding_queue.notify()
+        self._thread.join(timeout)
+        self._thread = None
+
+
+# Global instance
+embedding_worker = EmbeddingWorker()
@@ -0,0 +1,134 @@
+"""
+In-process latency metrics for the recommendation paths.
+
+Every ranking stage, similar-items lookup and response serialization records
+its wall time here under a dotted name (e.g. "ranking.jobs.retrieve"). Each
+metric keeps the last METRICS_WINDOW samples in a ring buffer, so the
+percentiles track recent traffic; snapshot() reports count, mean, p50, p95,
+p99 and max per metric and backs GET /recommendations/metrics.
+
+Histogram counts observations of a non-latency quantity (e.g. batch fill)
+into fixed buckets.
+
+Metrics are per worker process, like the result cache.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+from app.core.config import settings
+
+
+class _Samples:
+    """Ring buffer of the most recent samples of one metric"""
+
+    def __init__(self, window: int):
+        self.values = np.zeros(window, dtype=np.float64)
+        self.count = 0  # total observations, including overwritten ones
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+        self.total += value
+
+    def recent(self) -> np.ndarray:
+        return self.values[: min(self.count, len(self.values))]
+
+
+class MetricsRegistry:
+    """Named latency metrics with percentiles over a sliding window"""
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = window or settings.METRICS_WINDOW
+        self._lock = threading.Lock()
+        self._samples: Dict[str, _Samples] = {}
+
+    def observe(self, name: str, ms: float) -> None:
+        """Record one wall time in milliseconds"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = _Samples(self.window)
+            samples.add(ms)
+
+    @contextmanager
+    def time(self, name: str, trace=None) -> Iterator[None]:
+        """
+        Time a block into a metric and, in explain mode, into a RankingTrace
+
+        Args:
+            name: Dotted metric name; its last part names the trace stage
+            trace: Optional RankingTrace of the current request
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.observe(name, elapsed_ms)
+            if trace is not None:
+                trace.add_stage(name.rsplit(".", 1)[-1], elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean and percentiles (ms) of every metric"""
+        with self._lock:
+            recent = {
+                name: (samples.count, samples.total, samples.recent().copy())
+                for name, samples in self._samples.items()
+            }
+
+        report = {}
+        for name, (count, total, values) in sorted(recent.items()):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            report[name] = {
+                "count": count,
+                "mean_ms": round(total / count, 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(values.max()), 3),
+            }
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+class Histogram:
+    """Observation counts per bucket, given the buckets' upper bounds"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.bounds) + 1)  # last bucket: above all bounds
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self) -> Dict[str, object]:
+        """Count, mean and per-bucket counts keyed "<=bound" (and ">last")"""
+        with self._lock:
+            counts = list(self._counts)
+            count, total = self.count, self.total
+        buckets = {f"<={bound:g}": n for bound, n in zip(self.bounds, counts)}
+        buckets[f">{self.bounds[-1]:g}"] = counts[-1]
+        return {
+            "count": count,
+            "mean": round(total / count, 3) if count else None,
+            "buckets": buckets,
+        }
+
+
+# Global instance
+metrics = MetricsRegistry()
@@ -0,0 +1,310 @@
+"""
+Stored item-to-item neighbour lists for "similar jobs" and "similar resources".
+
+The top ITEM_NEIGHBOURS_K neighbours of every job and resource are kept in the
+item_neighbours table, so the similar-items endpoints are a single indexed
+lookup. Lists are built in bulk with blocked matrix multiplies and patched
+when an item is created, re-embedded or deleted: the item's own list is
+recomputed, and the item is spliced into (or evicted from) the lists of its
+nearest items and of the items that already list it.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from app.core.config import settings
+from app.db.model.job import Job
+from app.db.model.recommendation import ItemNeighbour
+from app.db.model.resources import Resource
+from app.db.session import SessionLocal
+from app.services.recommendation_service import recommendation_service
+from app.services.tfidf_service import JOBS, RESOURCES
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+MODELS = {JOBS: Job, RESOURCES: Resource}
+
+# Peak bytes per score of a block: float32 scores, their negation for
+# argpartition and its int64 indices
+BYTES_PER_SCORE = 16
+
+
+def build_block_size(item_count: int) -> int:
+    """Rows per matrix pass that keep a block within ITEM_NEIGHBOURS_BUILD_MEMORY_MB"""
+    budget = settings.ITEM_NEIGHBOURS_BUILD_MEMORY_MB * 1024 * 1024
+    return max(1, budget // (BYTES_PER_SCORE * max(item_count, 1)))
+
+
+class NeighbourService:
+    """Builds, maintains and serves the item_neighbours table"""
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ITEM_NEIGHBOURS_ENABLED
+
+    def build(self, db: Session, kind: str, block_size: Optional[int] = None) -> int:
+        """
+        Rebuild every neighbour list of an item type
+
+        Items are scored in blocks of `block_size` rows with one float32
+        matrix multiply per block; top-k per row is taken with argpartition.
+        A block holds block_size x item count scores, so by default its size
+        follows the item count (see build_block_size).
+
+        Args:
+            db: Database session
+            kind: JOBS or RESOURCES
+            block_size: Items scored per matrix pass (default: from the
+                memory budget)
+
+        Returns:
+            Number of items indexed
+        """
+        ids, matrix = recommendation_service.load_item_matrix(db, MODELS[kind], kind)
+        k = min(settings.ITEM_NEIGHBOURS_K, len(ids) - 1)
+        block_size = block_size or build_block_size(len(ids))
+
+        db.query(ItemNeighbour).filter(ItemNeighbour.item_type == kind).delete(
+            synchronize_session=False
+        )
+        for start in range(0, len(ids) if k > 0 else 0, block_size):
+            scores = matrix[start : start + block_size] @ matrix.T
+            rows = np.arange(scores.shape[0])
+            scores[rows, start + rows] = -np.inf  # An item is not its own neighbour
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            db.execute(
+                insert(ItemNeighbour),
+                [
+                    {
+                        "item_type": kind,
+                        "item_id": ids[start + row],
+                        "neighbour_id": ids[j],
+                        "score": float(score),
+                    }
+                    for row in rows
+                    for j, score in zip(top[row], top_scores[row])
+                ],
+            )
+        db.commit()
+
+        logger.info(f"Built {kind} neighbour lists for {len(ids)} items (k={k})")
+        return len(ids)
+
+    def ensure_built(self, db: Session) -> None:
+        """Build the lists of any item type that has none yet (called at startup)"""
+        if not self.enabled:
+            return
+        for kind in (JOBS, RESOURCES):
+            has_lists = db.query(
+                db.query(ItemNeighbour)
+                .filter(ItemNeighbour.item_type == kind)
+                .exists()
+            ).scalar()
+            if not has_lists:
+                self.build(db, kind)
+
+    def get_similar(
+        self, db: Session, kind: str, item_id: str, limit: int
+    ) -> List[Tuple]:
+        """
+        Read an item's stored neighbours
+
+        Args:
+            db: Database session
+            kind: JOBS or RESOURCES
+            item_id: ID of the job or resource
+            limit: Maximum number of results
+
+        Returns:
+            List of (item, similarity_score) tuples ordered by score desc,
+            empty if the item has no stored list
+        """
+        if not self.enabled:
+            return []
+        model = MODELS[kind]
+        rows = (
+            db.query(model, ItemNeighbour.score)
+            .join(ItemNeighbour, ItemNeighbour.neighbour_id == model.id)
+            .filter(
+                ItemNeighbour.item_type == kind,
+                ItemNeighbour.item_id == item_id,
+            )
+            .order_by(ItemNeighbour.score.desc())
+            .limit(limit)
+            .all()
+        )
+        return [(item, float(score)) for item, score in rows]
+
+    def on_item_changed(self, kind: str, item) -> None:
+        """
+        Patch the neighbour lists after an item was created or re-embedded
+
+        Args:
+            kind: JOBS or RESOURCES
+            item: The job or resource that was written
+        """
+        if not self.enabled or item.embedding is None:
+            return
+
+        with SessionLocal() as session:
+            try:
+                self._patch(session, kind, item.id, item.embedding)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to patch {kind} neighbour lists for {item.id}: {e}")
+
+    def remove_item(self, kind: str, item_id: str) -> None:
+        """Drop a deleted item's list and refill the lists that held it"""
+        if not self.enabled:
+            return
+
+        with SessionLocal() as session:
+            try:
+                holders = [
+                    holder_id
+                    for (holder_id,) in session.query(ItemNeighbour.item_id).filter(
+                        ItemNeighbour.item_type == kind,
+                        ItemNeighbour.neighbour_id == item_id,
+                    )
+                ]
+                session.query(ItemNeighbour).filter(
+                    ItemNeighbour.item_type == kind,
+                    (ItemNeighbour.item_id == item_id)
+                    | (ItemNeighbour.neighbour_id == item_id),
+                ).delete(synchronize_session=False)
+                self._refill(session, kind, holders)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to remove {kind} {item_id} from neighbour lists: {e}")
+
+    def _patch(self, session: Session, kind: str, item_id: str, embedding) -> None:
+        k = settings.ITEM_NEIGHBOURS_K
+        nearest = recommendation_service.nearest_items(
+            session,
+            kind,
+            embedding,
+            max(k, settings.ITEM_NEIGHBOURS_FANOUT),
+            exclude_id=item_id,
+        )
+        self._replace(session, kind, item_id, [(other.id, s) for other, s in nearest[:k]])
+
+        # Similarity is symmetric: the item's nearest items are the ones whose
+        # lists it is most likely to enter. Items already listing it are
+        # rescored too, since its vector may have moved away from them.
+        scores: Dict[str, float] = {other.id: score for other, score in nearest}
+        holders = [
+            holder_id
+            for (holder_id,) in session.query(ItemNeighbour.item_id).filter(
+                ItemNeighbour.item_type == kind,
+                ItemNeighbour.neighbour_id == item_id,
+            )
+            if holder_id not in scores
+        ]
+        if holders:
+            model = MODELS[kind]
+            query_vector = np.asarray(embedding, dtype=np.float32)
+            query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+            for holder_id, holder_embedding in session.query(
+                model.id, model.embedding
+            ).filter(model.id.in_(holders)):
+                vector = np.asarray(holder_embedding, dtype=np.float32)
+                scores[holder_id] = float(
+                    vector @ query_vector / max(float(np.linalg.norm(vector)), 1e-12)
+                )
+
+        lists: Dict[str, List[ItemNeighbour]] = {}
+        for row in session.query(ItemNeighbour).filter(
+            ItemNeighbour.item_type == kind,
+            ItemNeighbour.item_id.in_(scores.keys()),
+        ):
+            lists.setdefault(row.item_id, []).append(row)
+
+        refill = [
+            other_id
+            for other_id, score in scores.items()
+            if not self._splice(session, kind, other_id, lists.get(other_id, []), item_id, score)
+        ]
+        self._refill(session, kind, refill)
+
+    @staticmethod
+    def _splice(
+        session: Session,
+        kind: str,
+        owner_id: str,
+        rows: List[ItemNeighbour],
+        item_id: str,
+        score: float,
+    ) -> bool:
+        """
+        Insert, rescore or evict one neighbour in an item's list
+
+        Returns:
+            False if the neighbour was evicted and the list needs a refill
+        """
+        current = next((row for row in rows if row.neighbour_id == item_id), None)
+        others = [row for row in rows if row is not current]
+        floor = min((row.score for row in others), default=float("-inf"))
+        full = len(rows) >= settings.ITEM_NEIGHBOURS_K
+
+        if current is not None:
+            if score >= floor or not full:
+                current.score = score
+                return True
+            # Dropped out of the top-k; an unknown item now deserves the slot
+            session.delete(current)
+            return False
+
+        if score > floor or not full:
+            if full:
+                session.delete(min(others, key=lambda row: row.score))
+            session.add(
+                ItemNeighbour(
+                    item_type=kind, item_id=owner_id, neighbour_id=item_id, score=score
+                )
+            )
+        return True
+
+    def _replace(
+        self,
+        session: Session,
+        kind: str,
+        item_id: str,
+        neighbours: List[Tuple[str, float]],
+    ) -> None:
+        session.query(ItemNeighbour).filter(
+            ItemNeighbour.item_type == kind,
+            ItemNeighbour.item_id == item_id,
+        ).delete(synchronize_session=False)
+        session.add_all(
+            ItemNeighbour(
+                item_type=kind, item_id=item_id, neighbour_id=neighbour_id, score=score
+            )
+            for neighbour_id, score in neighbours
+        )
+
+    def _refill(self, session: Session, kind: str, item_ids: List[str]) -> None:
+        """Recompute the lists of the given items with a vector query each"""
+        if not item_ids:
+            return
+        session.flush()
+        model = MODELS[kind]
+        for item_id, embedding in (
+            session.query(model.id, model.embedding)
+            .filter(model.id.in_(item_ids), model.embedding.isnot(None))
+            .all()
+        ):
+            nearest = recommendation_service.nearest_items(
+                session, kind, embedding, settings.ITEM_NEIGHBOURS_K, exclude_id=item_id
+            )
+            self._replace(session, kind, item_id, [(other.id, s) for other, s in nearest])
+
+
+# Global instance
+neighbour_service = NeighbourService()
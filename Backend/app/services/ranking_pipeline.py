@@ -0,0 +1,611 @@
+"""
+Multi-stage ranking pipeline for hybrid recommendations.
+
+A ranking run passes a RankingContext through a fixed sequence of stages:
+
+    retrieve -> filter -> lexical -> fuse -> skills -> diversify -> truncate
+
+or, when the database fuses the vector and full-text rankings itself:
+
+    hybrid retrieve -> filter -> skills -> diversify -> truncate
+
+(the skills stage only ranks jobs; diversify applies MMR and per-company or
+per-platform caps when the request asks for them)
+
+Candidate scores are kept as NumPy arrays aligned with the candidate list, so
+filtering, fusion and top-k selection are vectorized. Every stage has a time
+budget. Overruns are logged, and the lexical stage - the only optional
+signal - is abandoned once its budget is spent, leaving vector-only scores.
+
+Stage wall times feed the metrics registry ("ranking.<kind>.<stage>"). In
+explain mode a RankingTrace also collects them per request, with candidate
+counts, the retrieval SQL plans and each result's component scores.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from app.core.config import settings
+from app.db.query_plan import explain_analyze
+from app.services.metrics import metrics
+from app.services.skill_index import skill_index
+from app.services.tfidf_service import tfidf_service, user_text_func
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Candidates retrieved per requested result, for re-ranking
+CANDIDATE_MULTIPLIER = 3
+
+# Lexical scoring runs here so the request thread can stop waiting for it
+_lexical_executor = ThreadPoolExecutor(
+    max_workers=settings.RANKING_LEXICAL_WORKERS, thread_name_prefix="lexical"
+)
+
+
+class RankingTrace:
+    """
+    Diagnostics of one request in explain mode
+
+    Records per-stage wall time and surviving candidate counts, the
+    retrieval statements and the component scores of the returned items.
+    The statements are EXPLAIN ANALYZE-d by finish(), after timing is over,
+    so the plans do not inflate the stage times.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: List[Dict] = []
+        self.plans: List[Dict] = []
+        self.items: List[Dict] = []
+        self.degraded: List[str] = []
+        self._statements: List[Tuple[str, object]] = []
+
+    def add_stage(self, name: str, ms: float, candidates: Optional[int] = None) -> None:
+        self.stages.append({"name": name, "ms": round(ms, 3), "candidates": candidates})
+
+    def add_statement(self, label: str, statement) -> None:
+        """Queue a SQL statement to be explained by finish()"""
+        self._statements.append((label, statement))
+
+    def add_plan(self, plan: Dict) -> None:
+        """Add an already summarized plan (e.g. an in-process index search)"""
+        self.plans.append(plan)
+
+    def record_ranking(self, ctx: "RankingContext") -> None:
+        """Component scores of the ranked results of a pipeline run"""
+        jaccard = ctx.skill_features.jaccard if ctx.skill_features is not None else None
+        order = ctx.order if ctx.order is not None else range(len(ctx.items))
+        self.items = [
+            {
+                "id": ctx.items[i].id,
+                "vector": float(ctx.vector_scores[i]),
+                "lexical": (
+                    float(ctx.lexical_scores[i]) if ctx.lexical_scores is not None else None
+                ),
+                "fused": (
+                    float(ctx.fused_scores[i]) if ctx.fused_scores is not None else None
+                ),
+                "skill": float(jaccard[i]) if jaccard is not None else None,
+                "score": float(ctx.scores[i]),
+            }
+            for i in order
+        ]
+        self.degraded = list(ctx.degraded)
+
+    def record_results(self, results: List[Tuple]) -> None:
+        """Component scores of plain (item, similarity) results"""
+        self.items = [
+            {
+                "id": item.id,
+                "vector": score,
+                "lexical": None,
+                "fused": None,
+                "skill": None,
+                "score": score,
+            }
+            for item, score in results
+        ]
+
+    def finish(self, db: Session) -> Dict:
+        """Explain the queued statements and return the full report"""
+        total_ms = (time.perf_counter() - self.start) * 1000
+        for label, statement in self._statements:
+            try:
+                # Savepoint, so a failed EXPLAIN leaves the session usable
+                with db.begin_nested():
+                    self.plans.append(explain_analyze(db, statement, label))
+            except Exception as e:
+                logger.error(f"EXPLAIN of '{label}' failed: {e}")
+                self.plans.append({"query": label, "nodes": [f"EXPLAIN failed: {e}"]})
+        self._statements = []
+        return {
+            "total_ms": round(total_ms, 3),
+            "stages": self.stages,
+            "plans": self.plans,
+            "items": self.items,
+            "degraded": self.degraded,
+        }
+
+
+class RankingContext:
+    """State of one ranking run, shared by all stages"""
+
+    def __init__(
+        self,
+        db: Session,
+        user_embedding: List[float],
+        user=None,
+        limit: int = 10,
+        embedding_weight: float = 0.6,
+        tfidf_weight: float = 0.4,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        exclude_ids: Optional[Set[str]] = None,
+        filters: Optional[List] = None,
+        diversity: float = 0.0,
+        max_per_group: Optional[int] = None,
+        trace: Optional[RankingTrace] = None,
+    ):
+        self.db = db
+        self.user_embedding = user_embedding
+        self.user = user
+        self.limit = limit
+        self.embedding_weight = embedding_weight
+        self.tfidf_weight = tfidf_weight
+        self.ef_search = ef_search
+        self.probes = probes
+        self.exclude_ids = exclude_ids or set()
+        self.filters = filters  # SQL criteria pushed into retrieval
+        self.diversity = diversity  # MMR trade-off, 0 = rank by score only
+        self.max_per_group = max_per_group  # cap per company / platform
+        self.trace = trace  # explain mode diagnostics
+
+        # Candidate items and the score arrays aligned with them
+        self.items: List = []
+        self.vector_scores = np.zeros(0, dtype=np.float32)
+        self.lexical_scores: Optional[np.ndarray] = None
+        self.fused_scores: Optional[np.ndarray] = None  # before skill blending
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.skill_features = None  # SkillFeatures aligned with items (jobs)
+        # Ranked candidate positions, set by diversify/truncate
+        self.order: Optional[np.ndarray] = None
+
+        self.timings: Dict[str, float] = {}  # stage name -> milliseconds
+        self.degraded: List[str] = []  # stages that fell back
+
+    @property
+    def fetch_limit(self) -> int:
+        return self.limit * CANDIDATE_MULTIPLIER
+
+    def keep(self, mask: np.ndarray) -> None:
+        """Keep only the candidates selected by a boolean mask"""
+        positions = np.flatnonzero(mask)
+        self.items = [self.items[i] for i in positions]
+        self.vector_scores = self.vector_scores[positions]
+        if self.lexical_scores is not None:
+            self.lexical_scores = self.lexical_scores[positions]
+        if self.fused_scores is not None:
+            self.fused_scores = self.fused_scores[positions]
+        if len(self.scores):
+            self.scores = self.scores[positions]
+
+    def results(self) -> List[Tuple]:
+        """Return (item, score) tuples in ranked order"""
+        order = self.order if self.order is not None else range(len(self.items))
+        return [(self.items[i], float(self.scores[i])) for i in order]
+
+
+class Stage:
+    """A pipeline step with a time budget in milliseconds"""
+
+    name = "stage"
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+
+    def run(self, ctx: RankingContext) -> None:
+        raise NotImplementedError
+
+
+class RetrieveStage(Stage):
+    """Fetch vector candidates with a (ctx) -> [(item, similarity)] function"""
+
+    name = "retrieve"
+
+    def __init__(self, retrieve: Callable[[RankingContext], List[Tuple]], budget_ms: float):
+        super().__init__(budget_ms)
+        self.retrieve = retrieve
+
+    def run(self, ctx: RankingContext) -> None:
+        candidates = self.retrieve(ctx)
+        ctx.items = [item for item, _ in candidates]
+        ctx.vector_scores = np.fromiter(
+            (similarity for _, similarity in candidates),
+            dtype=np.float32,
+            count=len(candidates),
+        )
+
+
+class HybridRetrieveStage(Stage):
+    """
+    Fetch candidates already fused with the lexical ranking, with a
+    (ctx) -> [(item, vector_similarity, lexical_score, fused_score)] function
+
+    Replaces the retrieve, lexical and fuse stages when fusion happens in the
+    database (LEXICAL_BACKEND=fulltext).
+    """
+
+    name = "retrieve"
+
+    def __init__(self, retrieve: Callable[[RankingContext], List[Tuple]], budget_ms: float):
+        super().__init__(budget_ms)
+        self.retrieve = retrieve
+
+    def run(self, ctx: RankingContext) -> None:
+        candidates = self.retrieve(ctx)
+        ctx.items = [candidate[0] for candidate in candidates]
+        scores = np.asarray(
+            [candidate[1:] for candidate in candidates], dtype=np.float32
+        ).reshape(-1, 3)
+        ctx.vector_scores = scores[:, 0]
+        ctx.lexical_scores = scores[:, 1]
+        ctx.fused_scores = scores[:, 2]
+        ctx.scores = ctx.fused_scores
+
+
+class FilterStage(Stage):
+    """Drop candidates for which any (ctx) -> boolean mask is False"""
+
+    name = "filter"
+
+    def __init__(
+        self,
+        masks: List[Callable[[RankingContext], np.ndarray]],
+        budget_ms: float,
+    ):
+        super().__init__(budget_ms)
+        self.masks = masks
+
+    def run(self, ctx: RankingContext) -> None:
+        keep = np.ones(len(ctx.items), dtype=bool)
+        for mask in self.masks:
+            keep &= mask(ctx)
+        if not keep.all():
+            ctx.keep(keep)
+
+
+def exclude_ids_mask(ctx: RankingContext) -> np.ndarray:
+    """Filter mask removing the item ids listed in ctx.exclude_ids"""
+    return np.fromiter(
+        (item.id not in ctx.exclude_ids for item in ctx.items),
+        dtype=bool,
+        count=len(ctx.items),
+    )
+
+
+def _lexical_scores(kind: str, user_text: str, item_ids: List[str]) -> Optional[np.ndarray]:
+    """TF-IDF cosine of the user text against the indexed rows of the items"""
+    query = tfidf_service.transform([user_text])
+    rows = tfidf_service.item_rows(kind, item_ids)
+    if query is None or rows is None:
+        return None
+    # Rows are L2-normalised by the vectorizer, so the dot product is cosine
+    return (rows @ query.T).toarray().ravel().astype(np.float32)
+
+
+class LexicalStage(Stage):
+    """
+    Score candidates with the corpus-wide TF-IDF model
+
+    ORM access (fitting, indexing unseen items) stays on the request thread;
+    only the sparse math runs in the worker pool, so the stage can stop
+    waiting once its budget is spent.
+    """
+
+    name = "lexical"
+
+    def __init__(self, kind: str, item_text_func: Callable, budget_ms: float):
+        super().__init__(budget_ms)
+        self.kind = kind
+        self.item_text_func = item_text_func
+
+    def run(self, ctx: RankingContext) -> None:
+        if ctx.user is None:
+            return
+
+        start = time.perf_counter()
+        try:
+            tfidf_service.ensure_fitted(ctx.db)
+            tfidf_service.index_missing(self.kind, ctx.items, self.item_text_func)
+            future = _lexical_executor.submit(
+                _lexical_scores,
+                self.kind,
+                user_text_func(ctx.user),
+                [item.id for item in ctx.items],
+            )
+        except Exception as e:
+            logger.error(f"TF-IDF calculation failed: {e}")
+            return
+
+        remaining = self.budget_ms / 1000 - (time.perf_counter() - start)
+        try:
+            ctx.lexical_scores = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            future.cancel()
+            ctx.degraded.append(self.name)
+            logger.warning(
+                f"Lexical stage exceeded {self.budget_ms}ms budget, "
+                f"using vector-only scores"
+            )
+        except Exception as e:
+            logger.error(f"TF-IDF calculation failed: {e}")
+
+
+class FuseStage(Stage):
+    """Weighted sum of the vector and lexical scores"""
+
+    name = "fuse"
+
+    def run(self, ctx: RankingContext) -> None:
+        if ctx.lexical_scores is None:
+            ctx.scores = ctx.vector_scores
+        else:
+            ctx.scores = (
+                ctx.embedding_weight * ctx.vector_scores
+                + ctx.tfidf_weight * ctx.lexical_scores
+            )
+        ctx.fused_scores = ctx.scores
+
+
+class SkillStage(Stage):
+    """
+    Blend exact skill overlap into job scores
+
+    The final score is (1 - weight) * score + weight * Jaccard(user skills,
+    job skills), computed for all candidates in one pass over the packed
+    skill bitsets, so scores stay within 0-1.
+    """
+
+    name = "skills"
+
+    def __init__(self, weight: float, budget_ms: float):
+        super().__init__(budget_ms)
+        self.weight = weight
+
+    def run(self, ctx: RankingContext) -> None:
+        if ctx.user is None:
+            return
+        skill_index.ensure_loaded(ctx.db)
+        ctx.skill_features = skill_index.features(
+            ctx.user.skills, [item.id for item in ctx.items]
+        )
+        if self.weight:
+            ctx.scores = (1 - self.weight) * ctx.scores + (
+                self.weight * ctx.skill_features.jaccard
+            )
+
+
+def _capped_by_score(
+    relevance: np.ndarray,
+    k: int,
+    order: List[int],
+    available: np.ndarray,
+    groups: Optional[np.ndarray],
+    max_per_group: Optional[int],
+    counts: Optional[np.ndarray],
+) -> None:
+    """Append available positions to `order` by descending score, honouring group caps"""
+    for position in np.argsort(-relevance, kind="stable"):
+        if len(order) >= k:
+            return
+        if not available[position]:
+            continue
+        if counts is not None:
+            group = groups[position]
+            if counts[group] >= max_per_group:
+                continue
+            counts[group] += 1
+        order.append(int(position))
+
+
+def mmr_order(
+    relevance: np.ndarray,
+    k: int,
+    diversity: float = 0.0,
+    vectors: Optional[np.ndarray] = None,
+    groups: Optional[np.ndarray] = None,
+    max_per_group: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[np.ndarray, bool]:
+    """
+    Greedy maximal marginal relevance selection with optional group caps
+
+    Each step picks the candidate maximizing
+
+        (1 - diversity) * relevance - diversity * max cosine to the picked ones
+
+    Pairwise cosines come from one Gram matrix of the candidate vectors, and
+    the max-cosine array is updated with one np.maximum per pick, so a page
+    costs one (n x n) product plus k O(n) steps. Picked and capped-out
+    candidates are masked with +inf similarity.
+
+    Args:
+        relevance: Candidate scores
+        k: Number of positions to select
+        diversity: Trade-off in [0, 1]; 0 ranks by relevance only
+        vectors: Normalized candidate vectors (required if diversity > 0)
+        groups: Integer group code per candidate (e.g. company)
+        max_per_group: Cap on selected candidates per group
+        deadline: time.perf_counter() value after which the rest of the page
+            is filled by relevance instead
+
+    Returns:
+        (selected positions in ranked order, whether MMR completed in time);
+        fewer than k positions if the caps leave too few candidates
+    """
+    n = len(relevance)
+    k = min(k, n)
+    order: List[int] = []
+    available = np.ones(n, dtype=bool)
+    counts = None
+    if groups is not None and max_per_group:
+        counts = np.zeros(int(groups.max()) + 1, dtype=np.int64)
+
+    if diversity <= 0 or vectors is None:
+        _capped_by_score(relevance, k, order, available, groups, max_per_group, counts)
+        return np.asarray(order, dtype=np.int64), True
+
+    gram = vectors @ vectors.T
+    base = (1 - diversity) * relevance.astype(np.float32)
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+    penalty = np.empty(n, dtype=np.float32)
+    scores = base.copy()  # no penalty before the first pick
+    while len(order) < k:
+        if deadline is not None and time.perf_counter() > deadline:
+            _capped_by_score(relevance, k, order, available, groups, max_per_group, counts)
+            return np.asarray(order, dtype=np.int64), False
+
+        pick = int(np.argmax(scores))
+        if scores[pick] == -np.inf:
+            break  # everything left is capped out
+        order.append(pick)
+        available[pick] = False
+        np.maximum(max_sim, gram[pick], out=max_sim)
+        max_sim[pick] = np.inf
+        if counts is not None:
+            group = groups[pick]
+            counts[group] += 1
+            if counts[group] >= max_per_group:
+                capped = groups == group
+                max_sim[capped] = np.inf
+                available[capped] = False
+        np.multiply(max_sim, diversity, out=penalty)
+        np.subtract(base, penalty, out=scores)
+
+    return np.asarray(order, dtype=np.int64), True
+
+
+def group_codes(values: List) -> np.ndarray:
+    """
+    Integer code per candidate for group caps (case/whitespace-folded;
+    missing values each get their own group)
+    """
+    codes: Dict[str, int] = {}
+    result = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        if value is None:
+            result[i] = len(values) + i  # above every shared code
+            continue
+        key = " ".join(str(value).lower().split())
+        result[i] = codes.setdefault(key, len(codes))
+    return result
+
+
+class DiversifyStage(Stage):
+    """
+    Re-rank candidates by maximal marginal relevance (see mmr_order)
+
+    Runs only when the request asks for diversity (ctx.diversity > 0) or a
+    group cap (ctx.max_per_group); otherwise ranking is left to the truncate
+    stage. Candidate vectors come from a (ctx) -> matrix function and groups
+    from the `group_attr` attribute of each item. If the budget runs out
+    mid-selection, the rest of the page is filled by score (still capped)
+    and the stage is marked degraded.
+    """
+
+    name = "diversify"
+
+    def __init__(
+        self,
+        load_vectors: Callable[[RankingContext], np.ndarray],
+        group_attr: Optional[str],
+        budget_ms: float,
+    ):
+        super().__init__(budget_ms)
+        self.load_vectors = load_vectors
+        self.group_attr = group_attr
+
+    def run(self, ctx: RankingContext) -> None:
+        if ctx.diversity <= 0 and not ctx.max_per_group:
+            return
+
+        start = time.perf_counter()
+        vectors = self.load_vectors(ctx) if ctx.diversity > 0 else None
+        groups = None
+        if ctx.max_per_group and self.group_attr:
+            groups = group_codes([getattr(item, self.group_attr) for item in ctx.items])
+
+        ctx.order, complete = mmr_order(
+            ctx.scores,
+            ctx.limit,
+            diversity=ctx.diversity,
+            vectors=vectors,
+            groups=groups,
+            max_per_group=ctx.max_per_group,
+            deadline=start + self.budget_ms / 1000,
+        )
+        if not complete:
+            ctx.degraded.append(self.name)
+            logger.warning(
+                f"Diversify stage exceeded {self.budget_ms}ms budget, "
+                f"rest of the page ranked by score"
+            )
+
+
+class TruncateStage(Stage):
+    """Keep the top `limit` candidates, selected with argpartition"""
+
+    name = "truncate"
+
+    def run(self, ctx: RankingContext) -> None:
+        if ctx.order is not None:
+            ctx.order = ctx.order[: ctx.limit]
+            return
+
+        k = min(ctx.limit, len(ctx.scores))
+        top = np.argpartition(-ctx.scores, k - 1)[:k]
+        ctx.order = top[np.argsort(-ctx.scores[top], kind="stable")]
+
+
+class RankingPipeline:
+    """Runs the ranking stages in order and records per-stage timings"""
+
+    def __init__(self, stages: List[Stage], name: str = "ranking"):
+        self.stages = stages
+        self.name = name  # metric prefix, e.g. the item type
+
+    def run(self, ctx: RankingContext) -> List[Tuple]:
+        """
+        Rank candidates for one request
+
+        Args:
+            ctx: Ranking context with the request parameters
+
+        Returns:
+            List of (item, score) tuples ordered by score desc
+        """
+        for stage in self.stages:
+            start = time.perf_counter()
+            stage.run(ctx)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            ctx.timings[stage.name] = elapsed_ms
+            metrics.observe(f"ranking.{self.name}.{stage.name}", elapsed_ms)
+            if ctx.trace is not None:
+                ctx.trace.add_stage(stage.name, elapsed_ms, len(ctx.items))
+
+            if elapsed_ms > stage.budget_ms and stage.name not in ctx.degraded:
+                logger.warning(
+                    f"Ranking stage '{stage.name}' took {elapsed_ms:.1f}ms "
+                    f"(budget {stage.budget_ms}ms)"
+                )
+            if not ctx.items:
+                return []
+
+        if ctx.trace is not None:
+            ctx.trace.record_ranking(ctx)
+        return ctx.results()
@@ -0,0 +1,109 @@
+"""
+Result cache in front of the recommendation endpoints.
+
+Entries are keyed on a hash of the user's embedding, the request parameters,
+the catalog version of the item type and a per-user version. Job/resource
+writes bump the catalog version and application writes bump the user's, so
+stale entries are never read again and age out of the LRU.
+The key doubles as the response ETag.
+
+Versions are per process: a write handled by another worker is only seen
+once the entry's TTL runs out.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+from app.core.config import settings
+
+
+class RecommendationCache:
+    """Size-bounded LRU cache with per-item-type catalog versions"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._user_versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def catalog_version(self, kind: str) -> int:
+        return self._versions.get(kind, 0)
+
+    def bump_version(self, kind: str) -> None:
+        """Invalidate every cached result for an item type"""
+        with self._lock:
+            self._versions[kind] = self._versions.get(kind, 0) + 1
+
+    def bump_user(self, user_id: str) -> None:
+        """Invalidate a user's cached results after a change the embedding
+        does not capture (applications, experience level)"""
+        with self._lock:
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+
+    def make_key(self, kind: str, embedding, user_id: str, **params) -> str:
+        """
+        Build a cache key / ETag for a recommendation request
+
+        Args:
+            kind: Item type (jobs or resources)
+            embedding: User's profile embedding
+            user_id: ID of the user (for per-user invalidation)
+            **params: Request parameters that change the result (limit, weights, ...)
+
+        Returns:
+            Hex digest identifying the result
+        """
+        digest = hashlib.sha256()
+        digest.update(np.asarray(embedding, dtype=np.float32).tobytes())
+        digest.update(repr(sorted(params.items())).encode())
+        digest.update(f"{kind}:{self.catalog_version(kind)}".encode())
+        digest.update(f"{user_id}:{self._user_versions.get(user_id, 0)}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "catalog_versions": dict(self._versions),
+        }
+
+
+# Global instance
+recommendation_cache = RecommendationCache(
+    max_entries=settings.RECOMMENDATION_CACHE_SIZE,
+    ttl_seconds=settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+)
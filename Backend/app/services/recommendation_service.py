@@ -1,80 +1,678 @@
 """
 Recommendation service for similarity-based recommendations using hybrid approach:
-- TF-IDF for keyword-based similarity
+- Keyword similarity: Postgres full-text search (default, see app/db/fulltext.py)
+  or a corpus-wide TF-IDF model (see tfidf_service)
 - Vector embeddings for semantic similarity
-- Combined scoring for better recommendations
+- Combined scoring for better recommendations: reciprocal-rank fusion in SQL
+  (full-text) or a weighted sum of similarities (TF-IDF)
 """
 
 import logging
-from typing import Dict, List, Tuple
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
-from app.db.model.job import Job
+from app.core.config import settings
+from app.db.fulltext import SEARCH_CONFIG, search_query_text, to_search_query
+from app.db.model.application import ApplicationList
+from app.db.model.job import ExperienceLevel, Job, JobLocation, JobType
 from app.db.model.resources import Resource
 from app.db.model.user import User
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
-
-from app.db.crud import job
+from app.db.vector_indexes import apply_search_params
+from app.services.ann_index import ann_service
+from app.services.metrics import metrics
+from app.services.ranking_pipeline import (
+    DiversifyStage,
+    FilterStage,
+    FuseStage,
+    HybridRetrieveStage,
+    LexicalStage,
+    RankingContext,
+    RankingPipeline,
+    RankingTrace,
+    RetrieveStage,
+    SkillStage,
+    TruncateStage,
+    exclude_ids_mask,
+)
+from app.services.tfidf_service import (
+    JOBS,
+    RESOURCES,
+    job_text_func,
+    resource_text_func,
+    tfidf_service,
+    user_text_func,
+)
+from sqlalchemy import (
+    ARRAY,
+    Float,
+    String,
+    any_,
+    bindparam,
+    cast,
+    desc,
+    exists,
+    false,
+    func,
+    inspect,
+    or_,
+    select,
+    true,
+)
+from sqlalchemy.orm import Session, undefer
 
 logger = logging.getLogger(__name__)
 
+# Default hybrid weights (vector similarity vs TF-IDF keyword similarity)
+DEFAULT_EMBEDDING_WEIGHT = 0.6
+DEFAULT_TFIDF_WEIGHT = 0.4
+
+# Growth factor of the candidate window when filters leave a page short
+WINDOW_GROWTH = 4
+
+FULLTEXT = "fulltext"
+
+# Item attribute capped by max_per_group in the diversify stage
+DIVERSITY_GROUPS = {JOBS: "company", RESOURCES: "platform"}
+
+# ts_rank_cd normalization: divide by 1 + log(document length), then map the
+# rank into [0, 1) with rank / (rank + 1)
+TS_RANK_NORMALIZATION = 1 | 32
+
+# Experience levels from least to most experienced; a user is eligible for
+# jobs at or below their own level
+EXPERIENCE_ORDER = [ExperienceLevel.STUDENT, ExperienceLevel.ENTRY, ExperienceLevel.JUNIOR]
+
+
+def _eligible_levels(user) -> List[ExperienceLevel]:
+    user_level = ExperienceLevel(user.experience_level.value)
+    return EXPERIENCE_ORDER[: EXPERIENCE_ORDER.index(user_level) + 1]
+
+
+def job_filters(user) -> List:
+    """
+    SQL criteria restricting jobs to a user's preferences
+
+    Applies the user's preferred job type and location (jobs without a
+    location always match), their experience level, and excludes jobs they
+    have already applied to.
+
+    Args:
+        user: User (or row with the preference columns and id)
+
+    Returns:
+        List of SQLAlchemy criteria on Job
+    """
+    criteria = []
+    if user.preferred_job_type is not None:
+        criteria.append(Job.job_type == JobType(user.preferred_job_type.value))
+    if user.preferred_job_location is not None:
+        criteria.append(
+            or_(
+                Job.job_location.is_(None),
+                Job.job_location == JobLocation(user.preferred_job_location.value),
+            )
+        )
+    if user.experience_level is not None:
+        criteria.append(Job.recommended_experience_level.in_(_eligible_levels(user)))
+    criteria.append(
+        ~exists().where(
+            ApplicationList.user_id == user.id, ApplicationList.job_id == Job.id
+        )
+    )
+    return criteria
+
+
+def job_matches_user(job, user, applied: bool = False) -> bool:
+    """Python counterpart of job_filters for a single loaded job"""
+    if applied:
+        return False
+    if (
+        user.preferred_job_type is not None
+        and job.job_type != JobType(user.preferred_job_type.value)
+    ):
+        return False
+    if (
+        user.preferred_job_location is not None
+        and job.job_location is not None
+        and job.job_location != JobLocation(user.preferred_job_location.value)
+    ):
+        return False
+    if (
+        user.experience_level is not None
+        and job.recommended_experience_level not in _eligible_levels(user)
+    ):
+        return False
+    return True
+
+
+def job_filter_values(user) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    A user's preferences as compared by job_filter_columns
+
+    Returns:
+        (job type, job location, comma-separated eligible experience levels),
+        as the enum member names Postgres stores; None where unset
+    """
+    return (
+        JobType(user.preferred_job_type.value).name
+        if user.preferred_job_type is not None
+        else None,
+        JobLocation(user.preferred_job_location.value).name
+        if user.preferred_job_location is not None
+        else None,
+        ",".join(level.name for level in _eligible_levels(user))
+        if user.experience_level is not None
+        else None,
+    )
+
+
+def job_filter_columns(preferences) -> List:
+    """
+    job_filters for many users in one query
+
+    Args:
+        preferences: Derived table with user_id, job_type, job_location and
+            levels columns holding job_filter_values of each user
+
+    Returns:
+        List of SQLAlchemy criteria on Job, correlated with `preferences`
+    """
+    return [
+        or_(
+            preferences.c.job_type.is_(None),
+            cast(Job.job_type, String) == preferences.c.job_type,
+        ),
+        or_(
+            preferences.c.job_location.is_(None),
+            Job.job_location.is_(None),
+            cast(Job.job_location, String) == preferences.c.job_location,
+        ),
+        or_(
+            preferences.c.levels.is_(None),
+            cast(Job.recommended_experience_level, String)
+            == any_(func.string_to_array(preferences.c.levels, ",")),
+        ),
+        ~exists()
+        .where(
+            ApplicationList.user_id == preferences.c.user_id,
+            ApplicationList.job_id == Job.id,
+        )
+        .correlate_except(ApplicationList),
+    ]
+
 
 class RecommendationService:
     """Service for generating recommendations using hybrid TF-IDF + vector similarity"""
 
-    def _calculate_tfidf_similarity(
-        self, user_text: str, items: List[Tuple], item_text_func
-    ) -> Dict[str, float]:
+    def __init__(self):
+        self._pipelines = {
+            JOBS: self._build_pipeline(Job, JOBS, job_text_func),
+            RESOURCES: self._build_pipeline(Resource, RESOURCES, resource_text_func),
+        }
+
+    def _build_pipeline(self, model, kind: str, item_text_func) -> RankingPipeline:
+        """Assemble the retrieve -> ... -> truncate pipeline for one item type"""
+
+        def retrieve(ctx: RankingContext) -> List[Tuple]:
+            return self._vector_candidates(
+                ctx.db,
+                model,
+                kind,
+                ctx.user_embedding,
+                ctx.fetch_limit,
+                ef_search=ctx.ef_search,
+                probes=ctx.probes,
+                filters=ctx.filters,
+                rerank_candidates=settings.ANN_BINARY_CANDIDATES_RECOMMENDED,
+                with_embeddings=ctx.diversity > 0,
+                trace=ctx.trace,
+            )
+
+        def hybrid_retrieve(ctx: RankingContext) -> List[Tuple]:
+            return self._hybrid_candidates(
+                ctx.db,
+                model,
+                kind,
+                ctx.user_embedding,
+                user_text_func(ctx.user) if ctx.user is not None else "",
+                ctx.fetch_limit,
+                embedding_weight=ctx.embedding_weight,
+                lexical_weight=ctx.tfidf_weight,
+                exclude_ids=ctx.exclude_ids,
+                ef_search=ctx.ef_search,
+                probes=ctx.probes,
+                filters=ctx.filters,
+                with_embeddings=ctx.diversity > 0,
+                trace=ctx.trace,
+            )
+
+        def load_vectors(ctx: RankingContext) -> np.ndarray:
+            return self.candidate_vectors(ctx.db, model, kind, ctx.items)
+
+        stage_budget = settings.RANKING_STAGE_BUDGET_MS
+        if settings.LEXICAL_BACKEND == FULLTEXT:
+            stages = [
+                HybridRetrieveStage(hybrid_retrieve, settings.RANKING_RETRIEVE_BUDGET_MS),
+                FilterStage([exclude_ids_mask], stage_budget),
+            ]
+        else:
+            stages = [
+                RetrieveStage(retrieve, settings.RANKING_RETRIEVE_BUDGET_MS),
+                FilterStage([exclude_ids_mask], stage_budget),
+                LexicalStage(kind, item_text_func, settings.RANKING_LEXICAL_BUDGET_MS),
+                FuseStage(stage_budget),
+            ]
+        if kind == JOBS:
+            stages.append(SkillStage(settings.RANKING_SKILL_WEIGHT, stage_budget))
+        stages += [
+            DiversifyStage(
+                load_vectors, DIVERSITY_GROUPS[kind], settings.RANKING_DIVERSIFY_BUDGET_MS
+            ),
+            TruncateStage(stage_budget),
+        ]
+        return RankingPipeline(stages, name=kind)
+
+    def _sql_candidates(
+        self,
+        db: Session,
+        model,
+        embedding: List[float],
+        limit: int,
+        exclude_id: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[List] = None,
+        with_embeddings: bool = False,
+        trace: Optional[RankingTrace] = None,
+    ) -> List[Tuple]:
+        """
+        Candidate generation with a pgvector similarity query
+
+        Embeddings are normalized, so the query orders by negative inner
+        product (`<#>`), which matches the vector_ip_ops ANN indexes.
+
+        Args:
+            db: Database session
+            model: Job or Resource
+            embedding: Query embedding
+            limit: Maximum number of candidates
+            exclude_id: Item ID to leave out (for "similar items")
+            ef_search: HNSW search breadth for this query
+            probes: IVFFlat probes for this query
+            filters: Extra SQL criteria on the model
+            with_embeddings: Load the deferred embeddings of the items too
+            trace: Explain-mode trace that records the statement
+
+        Returns:
+            List of (item, similarity) tuples ordered by similarity desc
+        """
+        apply_search_params(db, limit, ef_search=ef_search, probes=probes)
+
+        distance = model.embedding.max_inner_product(embedding)
+        query = (
+            db.query(model, (-distance).label("similarity"))
+            .filter(model.embedding.isnot(None))  # Filter out NULL embeddings
+        )
+        if exclude_id is not None:
+            query = query.filter(model.id != exclude_id)
+        if filters:
+            query = query.filter(*filters)
+        if with_embeddings:
+            query = query.options(undefer(model.embedding))
+
+        query = query.order_by(distance).limit(limit)
+        if trace is not None:
+            trace.add_statement("vector candidates (pgvector)", query.statement)
+        results = query.all()
+        return [(item, float(similarity)) for item, similarity in results]
+
+    def _ann_candidates(
+        self,
+        db: Session,
+        model,
+        kind: str,
+        embedding: List[float],
+        limit: int,
+        exclude_id: Optional[str] = None,
+        filters: Optional[List] = None,
+        ef: Optional[int] = None,
+        trace: Optional[RankingTrace] = None,
+    ) -> List[Tuple]:
+        """
+        Approximate candidate generation from the in-process index
+
+        Only the matched rows are loaded from the DB, by primary key. Filters
+        are applied to that lookup, so fewer than `limit` rows may come back.
+
+        Args:
+            db: Database session
+            model: Job or Resource
+            kind: Item type in the ANN index (jobs or resources)
+            embedding: Query embedding
+            limit: Maximum number of candidates
+            exclude_id: Item ID to leave out (for "similar items")
+            filters: Extra SQL criteria on the model
+            ef: Search breadth (index default if None)
+            trace: Explain-mode trace that records the index search and the
+                row lookup
+
+        Returns:
+            List of (item, similarity) tuples ordered by similarity desc
+        """
+        start = time.perf_counter()
+        hits = ann_service.search(kind, embedding, limit, exclude_id=exclude_id, ef=ef)
+        if trace is not None:
+            trace.add_plan(
+                {
+                    "query": "vector candidates (in-process index)",
+                    "planning_ms": None,
+                    "execution_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "nodes": [
+                        f"{ann_service.index_type(kind)}: k={limit} ef={ef} hits={len(hits)}"
+                    ],
+                }
+            )
+        if not hits:
+            return []
+
+        items = db.query(model).filter(model.id.in_([item_id for item_id, _ in hits]))
+        if filters:
+            items = items.filter(*filters)
+        if trace is not None:
+            trace.add_statement("index hit rows", items.statement)
+        items_by_id = {item.id: item for item in items}
+        # Rows deleted by another worker may still be in this worker's index
+        return [
+            (items_by_id[item_id], similarity)
+            for item_id, similarity in hits
+            if item_id in items_by_id
+        ]
+
+    def _hybrid_candidates(
+        self,
+        db: Session,
+        model,
+        kind: str,
+        embedding: List[float],
+        user_text: str,
+        limit: int,
+        embedding_weight: float = DEFAULT_EMBEDDING_WEIGHT,
+        lexical_weight: float = DEFAULT_TFIDF_WEIGHT,
+        exclude_ids: Optional[set] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[List] = None,
+        with_embeddings: bool = False,
+        trace: Optional[RankingTrace] = None,
+    ) -> List[Tuple]:
         """
-        Calculate TF-IDF similarity scores between user and items
+        Vector and full-text candidates fused by reciprocal rank
+
+        Each ranking contributes its top FULLTEXT_RRF_DEPTH items: the vector
+        one by inner product (pgvector or the in-process index, widened like
+        _vector_candidates while filters leave it short; see _vector_hits),
+        the lexical one by ts_rank_cd of the user's words against
+        search_vector, fused with the vector hits in one query. An item
+        scores weight / (k + rank) per ranking it appears in; the sum is
+        scaled so rank 1 in both rankings scores 1.0.
+        Filters apply inside both rankings, so keyword matches outside the
+        vector neighbourhood can still fill the page.
 
         Args:
-            user_text: User's profile text
-            items: List of items (jobs or resources)
-            item_text_func: Function to extract text from item
+            db: Database session
+            model: Job or Resource
+            kind: JOBS or RESOURCES
+            embedding: Query embedding
+            user_text: User keyword text (see user_text_func)
+            limit: Maximum number of candidates
+            embedding_weight: RRF weight of the vector ranking
+            lexical_weight: RRF weight of the full-text ranking
+            exclude_ids: Item IDs to leave out
+            ef_search: HNSW search breadth for the vector ranking
+            probes: IVFFlat probes for the vector ranking
+            filters: Extra SQL criteria on the model
+            with_embeddings: Load the deferred embeddings of the items too
+            trace: Explain-mode trace that records the statement
 
         Returns:
-            Dictionary mapping item_id to TF-IDF similarity score
-        """
-        if not items:
-            return {}
-
-        # Prepare documents: user text + all item texts
-        documents = [user_text]
-        item_ids = []
-
-        for item in items:
-            item_text = item_text_func(item)
-            documents.append(item_text)
-            item_ids.append(item.id)
-
-        # Calculate TF-IDF vectors
-        try:
-            vectorizer = TfidfVectorizer(
-                max_features=1000,
-                stop_words="english",
-                ngram_range=(1, 2),  # Use unigrams and bigrams
+            List of (item, vector_similarity, lexical_score, fused_score)
+            tuples ordered by fused score desc
+        """
+        depth = max(limit, settings.FULLTEXT_RRF_DEPTH)
+        criteria = list(filters or [])
+        if exclude_ids:
+            criteria.append(model.id.notin_(exclude_ids))
+
+        hits = self._vector_hits(
+            db, model, kind, embedding, depth, criteria, ef_search, probes, trace
+        )
+        arm = func.unnest(
+            bindparam("vector_ids", [item_id for item_id, _ in hits], type_=ARRAY(String)),
+            bindparam("vector_scores", [score for _, score in hits], type_=ARRAY(Float)),
+        ).table_valued("id", "similarity").render_derived(name="vector_hits")
+        # The join drops rows deleted since the in-process index was updated
+        vector_source = (
+            select(arm.c.id, arm.c.similarity)
+            .join(model, model.id == arm.c.id)
+            .subquery()
+        )
+        vector_arm = select(
+            vector_source.c.id,
+            vector_source.c.similarity,
+            func.row_number()
+            .over(order_by=vector_source.c.similarity.desc())
+            .label("rank"),
+        ).cte("vector_arm")
+
+        query_words = to_search_query(user_text)
+        lexical = func.ts_rank_cd(model.search_vector, query_words, TS_RANK_NORMALIZATION)
+        lexical_source = (
+            select(model.id, lexical.label("lexical"))
+            .where(
+                model.search_vector.op("@@")(query_words) if user_text.strip() else false(),
+                *criteria,
             )
-            tfidf_matrix = vectorizer.fit_transform(documents)
+            .order_by(lexical.desc())
+            .limit(depth)
+            .subquery()
+        )
+        lexical_arm = select(
+            lexical_source.c.id,
+            lexical_source.c.lexical,
+            func.row_number()
+            .over(order_by=lexical_source.c.lexical.desc())
+            .label("rank"),
+        ).cte("lexical_arm")
 
-            # Calculate cosine similarity between user (first doc) and all items
-            user_vector = tfidf_matrix[0:1]
-            item_vectors = tfidf_matrix[1:]
-            similarities = cosine_similarity(user_vector, item_vectors)[0]
+        rrf_k = settings.FULLTEXT_RRF_K
+        scale = (rrf_k + 1) / max(embedding_weight + lexical_weight, 1e-12)
+        fused_score = (
+            func.coalesce(embedding_weight / (rrf_k + vector_arm.c.rank), 0)
+            + func.coalesce(lexical_weight / (rrf_k + lexical_arm.c.rank), 0)
+        ) * scale
+        fused = (
+            select(
+                func.coalesce(vector_arm.c.id, lexical_arm.c.id).label("id"),
+                vector_arm.c.similarity,
+                func.coalesce(lexical_arm.c.lexical, 0).label("lexical"),
+                fused_score.label("fused"),
+            )
+            .select_from(
+                vector_arm.join(
+                    lexical_arm, vector_arm.c.id == lexical_arm.c.id, full=True
+                )
+            )
+            .subquery("fused")
+        )
 
-            # Create mapping of item_id to similarity score
-            tfidf_scores = {
-                item_ids[i]: float(similarities[i]) for i in range(len(item_ids))
-            }
+        # Keyword-only candidates are scored against the query vector too,
+        # unless the column cannot be scored in SQL (int8 storage)
+        similarity = (
+            func.coalesce(fused.c.similarity, 0)
+            if ann_service.required
+            else -model.embedding.max_inner_product(embedding)
+        )
+        query = db.query(model, similarity, fused.c.lexical, fused.c.fused).join(
+            fused, fused.c.id == model.id
+        )
+        if with_embeddings:
+            query = query.options(undefer(model.embedding))
+        query = query.order_by(fused.c.fused.desc()).limit(limit)
+        if trace is not None:
+            trace.add_statement("hybrid candidates (vector + full-text RRF)", query.statement)
+        rows = query.all()
+        return [
+            (item, float(vector or 0.0), float(lexical), float(score))
+            for item, vector, lexical, score in rows
+        ]
 
-            logger.debug(f"Calculated TF-IDF scores for {len(tfidf_scores)} items")
-            return tfidf_scores
-        except Exception as e:
-            logger.error(f"TF-IDF calculation failed: {e}")
-            return {}
+    def _vector_hits(
+        self,
+        db: Session,
+        model,
+        kind: str,
+        embedding: List[float],
+        depth: int,
+        criteria: List,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        trace: Optional[RankingTrace] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Top `depth` (item id, similarity) pairs of the vector ranking that
+        pass the criteria, from the in-process index if loaded, else pgvector
+
+        As in _vector_candidates, the search window widens geometrically
+        while the criteria leave fewer than `depth` hits, until the filtered
+        set is exhausted or RECOMMENDATION_MAX_CANDIDATE_WINDOW is reached.
+        """
+        window = max(depth, ef_search or settings.PGVECTOR_HNSW_EF_SEARCH)
+        probes = probes or settings.PGVECTOR_IVFFLAT_PROBES
+        max_window = max(window, settings.RECOMMENDATION_MAX_CANDIDATE_WINDOW)
+        hits: List[Tuple[str, float]] = []
+
+        while True:
+            previous = len(hits)
+            if ann_service.is_ready(kind):
+                ef = (
+                    max(settings.ANN_BINARY_CANDIDATES_RECOMMENDED, window)
+                    if ann_service.binary
+                    else None
+                )
+                hits = ann_service.search(kind, embedding, window, ef=ef)
+                if criteria and hits:
+                    matching = {
+                        item_id
+                        for (item_id,) in db.query(model.id).filter(
+                            model.id.in_([item_id for item_id, _ in hits]), *criteria
+                        )
+                    }
+                    hits = [hit for hit in hits if hit[0] in matching]
+                hits = hits[:depth]
+            else:
+                distance = model.embedding.max_inner_product(embedding)
+                apply_search_params(db, depth, ef_search=window, probes=probes)
+                query = (
+                    db.query(model.id, -distance)
+                    .filter(model.embedding.isnot(None), *criteria)
+                    .order_by(distance)
+                    .limit(depth)
+                )
+                if trace is not None:
+                    trace.add_statement("vector hits", query.statement)
+                hits = [(item_id, float(similarity)) for item_id, similarity in query]
+
+            if (
+                not criteria
+                or len(hits) >= depth
+                or len(hits) == previous  # filtered set exhausted
+                or window >= max_window
+            ):
+                return hits
+
+            window = min(window * WINDOW_GROWTH, max_window)
+            probes *= WINDOW_GROWTH
+            logger.debug(
+                f"Widening {kind} vector arm window to {window} "
+                f"({len(hits)}/{depth} matched)"
+            )
+
+    def _vector_candidates(
+        self,
+        db: Session,
+        model,
+        kind: str,
+        embedding: List[float],
+        limit: int,
+        exclude_id: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[List] = None,
+        rerank_candidates: Optional[int] = None,
+        with_embeddings: bool = False,
+        trace: Optional[RankingTrace] = None,
+    ) -> List[Tuple]:
+        """
+        Generate candidates from the in-process index if loaded, else pgvector
+
+        With filters, an index scan can return fewer than `limit` matching
+        rows (HNSW only visits ef_search nodes, IVFFlat only `probes` lists).
+        The search window then widens geometrically until the page is full,
+        the filtered set is exhausted or RECOMMENDATION_MAX_CANDIDATE_WINDOW
+        is reached.
+
+        With the binary-quantized index, `rerank_candidates` Hamming
+        candidates (at least the window) are reranked by exact cosine.
+        `with_embeddings` loads the items' embeddings on the pgvector path
+        (the in-process index already holds them).
+        """
+        window = max(limit, ef_search or settings.PGVECTOR_HNSW_EF_SEARCH)
+        probes = probes or settings.PGVECTOR_IVFFLAT_PROBES
+        max_window = max(window, settings.RECOMMENDATION_MAX_CANDIDATE_WINDOW)
+        results: List[Tuple] = []
+        if ann_service.required and not ann_service.is_ready(kind):
+            ann_service.load(db)
+
+        while True:
+            previous = len(results)
+            if ann_service.is_ready(kind):
+                ef = (
+                    max(rerank_candidates, window)
+                    if ann_service.binary and rerank_candidates
+                    else None
+                )
+                results = self._ann_candidates(
+                    db, model, kind, embedding, window, exclude_id, filters, ef, trace
+                )[:limit]
+            else:
+                results = self._sql_candidates(
+                    db,
+                    model,
+                    embedding,
+                    limit,
+                    exclude_id,
+                    ef_search=window,
+                    probes=probes,
+                    filters=filters,
+                    with_embeddings=with_embeddings,
+                    trace=trace,
+                )
+
+            if (
+                not filters
+                or len(results) >= limit
+                or len(results) == previous  # filtered set exhausted
+                or window >= max_window
+            ):
+                return results
+
+            window = min(window * WINDOW_GROWTH, max_window)
+            probes *= WINDOW_GROWTH
+            logger.debug(
+                f"Widening {kind} candidate window to {window} "
+                f"({len(results)}/{limit} matched)"
+            )
 
     # def initial_job_ranking(self,
     #     db: Session,
@@ -84,18 +682,53 @@ class RecommendationService:
     #     jobs = job.get_jobs(db)
     #     user.
 
+    def rank(self, kind: str, ctx: RankingContext) -> List[Tuple]:
+        """
+        Run the ranking pipeline of an item type
+
+        Args:
+            kind: JOBS or RESOURCES
+            ctx: Ranking context with the request parameters
+
+        Returns:
+            List of (item, combined_similarity_score) tuples ordered by score desc
+        """
+        results = self._pipelines[kind].run(ctx)
+        if not results:
+            logger.info(f"No {kind} with embeddings found")
+            return []
+
+        if settings.LEXICAL_BACKEND == FULLTEXT:
+            logger.info(f"Found {len(results)} recommended {kind} (full-text + vector, RRF)")
+            return results
+
+        logger.info(
+            f"Found {len(results)} recommended {kind} (hybrid TF-IDF + vector"
+            f"{', lexical skipped' if 'lexical' in ctx.degraded else ''})"
+        )
+        return results
+
     def get_recommended_jobs(
         self,
         db: Session,
         user_embedding: List[float],
         user: User = None,
         limit: int = 10,
-        embedding_weight: float = 0.6,
-        tfidf_weight: float = 0.4,
+        embedding_weight: float = DEFAULT_EMBEDDING_WEIGHT,
+        tfidf_weight: float = DEFAULT_TFIDF_WEIGHT,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        diversity: float = 0.0,
+        max_per_company: Optional[int] = None,
+        trace: Optional[RankingTrace] = None,
     ) -> List[Tuple[Job, float]]:
         """
         Get jobs most similar to user profile using hybrid TF-IDF + vector similarity
 
+        When a user is given, candidates are restricted to their preferred job
+        type, location and experience level, and jobs they applied to are left
+        out (see job_filters).
+
         Args:
             db: Database session
             user_embedding: User's 384-dim embedding vector
@@ -103,88 +736,46 @@ class RecommendationService:
             limit: Maximum number of results
             embedding_weight: Weight for embedding similarity (default: 0.6)
             tfidf_weight: Weight for TF-IDF similarity (default: 0.4)
+            ef_search: HNSW search breadth (recall/latency trade-off)
+            probes: IVFFlat probes (recall/latency trade-off)
+            diversity: MMR trade-off between score and novelty (0 = off)
+            max_per_company: Cap on jobs from one company
+            trace: Explain-mode trace to fill
 
         Returns:
-            List of (Job, combined_similarity_score) tuples ordered by score desc
+            List of (Job, combined_similarity_score) tuples in ranked order
         """
-        # Get candidates using vector similarity (fetch more for re-ranking)
-        fetch_limit = limit * 3
-        vector_results = (
-            db.query(
-                Job,
-                (1 - Job.embedding.cosine_distance(user_embedding)).label("similarity")
-            )
-            .filter(Job.embedding.isnot(None))
-            .order_by((1 - Job.embedding.cosine_distance(user_embedding)).desc())
-            .limit(fetch_limit)
-            .all()
+        return self.rank(
+            JOBS,
+            RankingContext(
+                db,
+                user_embedding,
+                user=user,
+                limit=limit,
+                embedding_weight=embedding_weight,
+                tfidf_weight=tfidf_weight,
+                ef_search=ef_search,
+                probes=probes,
+                filters=job_filters(user) if user is not None else None,
+                diversity=diversity,
+                max_per_group=max_per_company,
+                trace=trace,
+            ),
         )
 
-        if not vector_results:
-            logger.info("No jobs with embeddings found")
-            return []
-
-        # If user object provided, calculate TF-IDF scores
-        tfidf_scores = {}
-        if user:
-            user_text = " ".join(
-                [
-                    " ".join(user.skills) if user.skills else "",
-                    user.education_level or "",
-                    user.preferred_career_track or "",
-                ]
-            )
-
-            jobs = [job for job, _ in vector_results]
-
-            def job_text_func(job):
-                return " ".join(
-                    [
-                        job.title or "",
-                        job.description or "",
-                        " ".join(job.required_skills) if job.required_skills else "",
-                        job.recommended_experience_level.value
-                        if job.recommended_experience_level
-                        else "",
-                    ]
-                )
-
-            tfidf_scores = self._calculate_tfidf_similarity(
-                user_text, jobs, job_text_func
-            )
-
-        # Combine scores
-        combined_results = []
-        for job, vector_score in vector_results:
-            tfidf_score = tfidf_scores.get(job.id, 0.0) if tfidf_scores else 0.0
-
-            # Weighted combination
-            if tfidf_scores:
-                combined_score = (embedding_weight * float(vector_score)) + (
-                    tfidf_weight * tfidf_score
-                )
-            else:
-                combined_score = float(vector_score)
-
-            combined_results.append((job, combined_score))
-
-        # Sort by combined score and limit
-        combined_results.sort(key=lambda x: x[1], reverse=True)
-        final_results = combined_results[:limit]
-
-        logger.info(
-            f"Found {len(final_results)} recommended jobs (hybrid TF-IDF + vector)"
-        )
-        return final_results
-
     def get_recommended_resources(
         self,
         db: Session,
         user_embedding: List[float],
         user: User = None,
         limit: int = 10,
-        embedding_weight: float = 0.6,
-        tfidf_weight: float = 0.4,
+        embedding_weight: float = DEFAULT_EMBEDDING_WEIGHT,
+        tfidf_weight: float = DEFAULT_TFIDF_WEIGHT,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        diversity: float = 0.0,
+        max_per_platform: Optional[int] = None,
+        trace: Optional[RankingTrace] = None,
     ) -> List[Tuple[Resource, float]]:
         """
         Get resources most similar to user profile using hybrid TF-IDF + vector similarity
@@ -196,78 +787,389 @@ class RecommendationService:
             limit: Maximum number of results
             embedding_weight: Weight for embedding similarity (default: 0.6)
             tfidf_weight: Weight for TF-IDF similarity (default: 0.4)
+            ef_search: HNSW search breadth (recall/latency trade-off)
+            probes: IVFFlat probes (recall/latency trade-off)
+            diversity: MMR trade-off between score and novelty (0 = off)
+            max_per_platform: Cap on resources from one platform
+            trace: Explain-mode trace to fill
 
         Returns:
-            List of (Resource, combined_similarity_score) tuples ordered by score desc
+            List of (Resource, combined_similarity_score) tuples in ranked order
         """
-        # Get candidates using vector similarity (fetch more for re-ranking)
-        fetch_limit = limit * 3
-        vector_results = (
-            db.query(
-                Resource,
-                (1 - Resource.embedding.cosine_distance(user_embedding)).label(
-                    "similarity"
-                ),
+        return self.rank(
+            RESOURCES,
+            RankingContext(
+                db,
+                user_embedding,
+                user=user,
+                limit=limit,
+                embedding_weight=embedding_weight,
+                tfidf_weight=tfidf_weight,
+                ef_search=ef_search,
+                probes=probes,
+                diversity=diversity,
+                max_per_group=max_per_platform,
+                trace=trace,
+            ),
+        )
+
+    def candidate_vectors(self, db: Session, model, kind: str, items: List) -> np.ndarray:
+        """
+        Normalized embeddings of a candidate list, one row per item
+
+        Read from the in-process ANN index when it is loaded, else from the
+        items themselves when retrieval loaded their embeddings; anything
+        left is fetched in one query. Items without an embedding get a
+        zero row.
+        """
+        item_ids = [item.id for item in items]
+        if ann_service.is_ready(kind):
+            matrix, found = ann_service.vectors(kind, item_ids)
+            if found.all():
+                return matrix
+        else:
+            matrix = np.zeros((len(items), 384), dtype=np.float32)
+            found = np.zeros(len(items), dtype=bool)
+
+        embeddings = {}
+        unloaded = []
+        for i in np.flatnonzero(~found):
+            if "embedding" in inspect(items[i]).unloaded:
+                unloaded.append(item_ids[i])
+            else:
+                embeddings[item_ids[i]] = items[i].embedding
+        if unloaded:
+            embeddings.update(
+                db.query(model.id, model.embedding).filter(model.id.in_(unloaded)).all()
             )
-            .filter(Resource.embedding.isnot(None))
-            .order_by((1 - Resource.embedding.cosine_distance(user_embedding)).desc())
-            .limit(fetch_limit)
+
+        position = {item_id: i for i, item_id in enumerate(item_ids)}
+        for item_id, embedding in embeddings.items():
+            if embedding is not None:
+                vector = np.asarray(embedding, dtype=np.float32)
+                matrix[position[item_id]] = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        return matrix
+
+    def load_item_matrix(
+        self, db: Session, model, kind: str
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Load every item embedding as one normalized float32 matrix
+
+        Reuses the in-process ANN index vectors when it is loaded.
+
+        Returns:
+            (item_ids, matrix) with one row per item
+        """
+        if ann_service.is_ready(kind):
+            return ann_service.snapshot(kind)
+
+        rows = (
+            db.query(model.id, model.embedding)
+            .filter(model.embedding.isnot(None))
             .all()
         )
+        if not rows:
+            return [], np.zeros((0, 384), dtype=np.float32)
 
-        if not vector_results:
-            logger.info("No resources with embeddings found")
-            return []
+        matrix = np.asarray([embedding for _, embedding in rows], dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        return [item_id for item_id, _ in rows], matrix
 
-        # If user object provided, calculate TF-IDF scores
-        tfidf_scores = {}
-        if user:
-            user_text = " ".join(
-                [
-                    " ".join(user.skills) if user.skills else "",
-                    user.education_level or "",
-                    user.preferred_career_track or "",
-                ]
-            )
+    def iter_batch_recommended_jobs(
+        self,
+        db: Session,
+        user_ids: Optional[List[str]] = None,
+        limit: int = 10,
+        block_size: int = 256,
+        embedding_weight: float = DEFAULT_EMBEDDING_WEIGHT,
+        tfidf_weight: float = DEFAULT_TFIDF_WEIGHT,
+    ) -> Iterator[List[Dict]]:
+        """
+        Score many users against every job in blocked matrix passes
+
+        Each block of users is scored with one float32 matrix multiply for the
+        vector part; top-k per user is taken with argpartition. Jobs are
+        restricted to each user's preferences like the per-request path
+        (job_matches_user, evaluated once per distinct job type / location /
+        level, plus the block's applications). The keyword part follows
+        LEXICAL_BACKEND: with TF-IDF one sparse product per block, fused by
+        weighted sum over the whole catalog; with full-text one ranked
+        search per user (filtered like job_filters, one query per block),
+        fused with the vector ranking by reciprocal rank as in
+        _hybrid_candidates.
 
-            resources = [resource for resource, _ in vector_results]
+        Args:
+            db: Database session
+            user_ids: Users to score (default: every user with an embedding)
+            limit: Number of jobs per user
+            block_size: Users scored per matrix pass
+            embedding_weight: Weight for embedding similarity (default: 0.6)
+            tfidf_weight: Weight for keyword similarity (default: 0.4)
 
-            def resource_text_func(resource):
-                return " ".join(
-                    [
-                        resource.name or "",
-                        resource.description or "",
-                        " ".join(resource.tags) if resource.tags else "",
-                    ]
+        Yields:
+            One list per block of {"user_id", "recommendations"} dicts, where
+            recommendations are {"job_id", "similarity_score"} ordered by score
+            desc; users with fewer matching jobs get fewer recommendations
+        """
+        job_ids, job_matrix = self.load_item_matrix(db, Job, JOBS)
+        if not job_ids:
+            logger.info("No jobs with embeddings found")
+            return
+        position = {job_id: j for j, job_id in enumerate(job_ids)}
+        representatives, job_group = self._job_filter_groups(db, position)
+
+        fulltext = settings.LEXICAL_BACKEND == FULLTEXT
+        job_tfidf = None
+        if not fulltext:
+            tfidf_service.ensure_fitted(db)
+            job_tfidf = tfidf_service.item_rows(JOBS, job_ids)
+            if job_tfidf is not None:
+                job_tfidf_t = job_tfidf.T.tocsr()
+
+        if user_ids is None:
+            user_ids = [
+                user_id
+                for (user_id,) in db.query(User.id)
+                .filter(User.embedding.isnot(None))
+                .order_by(User.id)
+            ]
+
+        k = min(limit, len(job_ids))
+        depth = min(max(k, settings.FULLTEXT_RRF_DEPTH), len(job_ids))
+        for start in range(0, len(user_ids), block_size):
+            users = (
+                db.query(
+                    User.id,
+                    User.embedding,
+                    User.skills,
+                    User.education_level,
+                    User.preferred_career_track,
+                    User.preferred_job_type,
+                    User.preferred_job_location,
+                    User.experience_level,
                 )
+                .filter(User.id.in_(user_ids[start : start + block_size]))
+                .filter(User.embedding.isnot(None))
+                .all()
+            )
+            if not users:
+                continue
 
-            tfidf_scores = self._calculate_tfidf_similarity(
-                user_text, resources, resource_text_func
+            user_matrix = np.asarray([u.embedding for u in users], dtype=np.float32)
+            user_matrix /= np.maximum(
+                np.linalg.norm(user_matrix, axis=1, keepdims=True), 1e-12
             )
+            scores = user_matrix @ job_matrix.T
+
+            if job_tfidf is not None:
+                user_tfidf = tfidf_service.transform(
+                    [user_text_func(u) for u in users]
+                )
+                lexical = (user_tfidf @ job_tfidf_t).toarray()
+                scores = embedding_weight * scores + tfidf_weight * lexical
 
-        # Combine scores
-        combined_results = []
-        for resource, vector_score in vector_results:
-            tfidf_score = tfidf_scores.get(resource.id, 0.0) if tfidf_scores else 0.0
+            allowed = self._job_filter_mask(db, users, representatives, job_group, position)
+            scores = np.where(allowed, scores, -np.inf)
 
-            # Weighted combination
-            if tfidf_scores:
-                combined_score = (embedding_weight * float(vector_score)) + (
-                    tfidf_weight * tfidf_score
+            if fulltext:
+                scores = self._fuse_fulltext_block(
+                    db, users, scores, position, depth, embedding_weight, tfidf_weight
                 )
-            else:
-                combined_score = float(vector_score)
 
-            combined_results.append((resource, combined_score))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
 
-        # Sort by combined score and limit
-        combined_results.sort(key=lambda x: x[1], reverse=True)
-        final_results = combined_results[:limit]
+            yield [
+                {
+                    "user_id": user.id,
+                    "recommendations": [
+                        {"job_id": job_ids[j], "similarity_score": float(score)}
+                        for j, score in zip(top[row], top_scores[row])
+                        if np.isfinite(score)
+                    ],
+                }
+                for row, user in enumerate(users)
+            ]
 
-        logger.info(
-            f"Found {len(final_results)} recommended resources (hybrid TF-IDF + vector)"
+    @staticmethod
+    def _job_filter_groups(db: Session, position: Dict[str, int]) -> Tuple[List, np.ndarray]:
+        """
+        Group the scored jobs by the columns job_matches_user looks at
+
+        Returns:
+            (representatives, job_group): one job row per distinct
+            (job_type, job_location, recommended_experience_level), and the
+            group of each scored job (-1 for jobs no longer in the table)
+        """
+        groups: Dict[Tuple, int] = {}
+        representatives = []
+        job_group = np.full(len(position), -1, dtype=np.int64)
+        rows = db.query(
+            Job.id, Job.job_type, Job.job_location, Job.recommended_experience_level
+        )
+        for row in rows:
+            j = position.get(row.id)
+            if j is None:
+                continue
+            key = (row.job_type, row.job_location, row.recommended_experience_level)
+            if key not in groups:
+                groups[key] = len(representatives)
+                representatives.append(row)
+            job_group[j] = groups[key]
+        return representatives, job_group
+
+    @staticmethod
+    def _job_filter_mask(
+        db: Session,
+        users: List,
+        representatives: List,
+        job_group: np.ndarray,
+        position: Dict[str, int],
+    ) -> np.ndarray:
+        """Boolean (users x jobs) mask of the jobs each user may be recommended"""
+        # The extra last column is the group -1 of jobs deleted meanwhile
+        allowed = np.zeros((len(users), len(representatives) + 1), dtype=bool)
+        for row, user in enumerate(users):
+            allowed[row, :-1] = [job_matches_user(job, user) for job in representatives]
+        mask = allowed[:, job_group]
+
+        user_row = {user.id: row for row, user in enumerate(users)}
+        applications = db.query(ApplicationList.user_id, ApplicationList.job_id).filter(
+            ApplicationList.user_id.in_(list(user_row))
+        )
+        for user_id, job_id in applications:
+            j = position.get(job_id)
+            if j is not None:
+                mask[user_row[user_id], j] = False
+        return mask
+
+    @staticmethod
+    def _fuse_fulltext_block(
+        db: Session,
+        users: List,
+        scores: np.ndarray,
+        position: Dict[str, int],
+        depth: int,
+        embedding_weight: float,
+        lexical_weight: float,
+    ) -> np.ndarray:
+        """
+        Reciprocal-rank fusion of a block's vector scores with full-text search
+
+        Mirrors _hybrid_candidates: the top `depth` filtered jobs by vector
+        similarity and by ts_rank_cd each contribute weight / (k + rank),
+        scaled so rank 1 in both rankings scores 1.0. Jobs in neither ranking
+        score -inf.
+        """
+        rrf_k = settings.FULLTEXT_RRF_K
+        scale = (rrf_k + 1) / max(embedding_weight + lexical_weight, 1e-12)
+        fused = np.zeros_like(scores)
+
+        vector_top = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+        vector_scores = np.take_along_axis(scores, vector_top, axis=1)
+        order = np.argsort(-vector_scores, axis=1)
+        vector_top = np.take_along_axis(vector_top, order, axis=1)
+        vector_scores = np.take_along_axis(vector_scores, order, axis=1)
+        ranks = np.arange(1, depth + 1)
+        np.put_along_axis(
+            fused,
+            vector_top,
+            np.where(np.isfinite(vector_scores), embedding_weight / (rrf_k + ranks), 0.0),
+            axis=1,
+        )
+
+        user_row = {user.id: row for row, user in enumerate(users)}
+        hits = [
+            (user_row[user_id], position[job_id], rank)
+            for user_id, job_id, rank in RecommendationService._fulltext_hits(db, users, depth)
+            if job_id in position
+        ]
+        if hits:
+            rows, columns, hit_ranks = (np.asarray(values) for values in zip(*hits))
+            np.add.at(fused, (rows, columns), lexical_weight / (rrf_k + hit_ranks))
+
+        return np.where(fused > 0, fused * scale, -np.inf)
+
+    @staticmethod
+    def _fulltext_hits(db: Session, users: List, depth: int) -> List[Tuple[str, str, int]]:
+        """
+        Top `depth` jobs by ts_rank_cd for each user, in one query
+
+        The users' query texts and preferences are unnested into one derived
+        table, joined LATERAL to the ranked matches of each user's words
+        (filtered like job_filters, see job_filter_columns).
+
+        Returns:
+            (user_id, job_id, rank) tuples, rank starting at 1 per user
+        """
+        queries = [
+            (user.id, search_query_text(user_text_func(user)), *job_filter_values(user))
+            for user in users
+        ]
+        queries = [query for query in queries if query[1]]
+        if not queries:
+            return []
+
+        columns = ("user_id", "query_text", "job_type", "job_location", "levels")
+        preferences = func.unnest(
+            *(
+                bindparam(name, list(values), type_=ARRAY(String))
+                for name, values in zip(columns, zip(*queries))
+            )
+        ).table_valued(*columns).render_derived(name="user_queries")
+        query_words = func.websearch_to_tsquery(SEARCH_CONFIG, preferences.c.query_text)
+        lexical = func.ts_rank_cd(Job.search_vector, query_words, TS_RANK_NORMALIZATION)
+        matches = (
+            select(Job.id, lexical.label("lexical"))
+            .where(Job.search_vector.op("@@")(query_words), *job_filter_columns(preferences))
+            .order_by(lexical.desc())
+            .limit(depth)
+            .lateral("matches")
+        )
+        statement = select(
+            preferences.c.user_id,
+            matches.c.id,
+            func.row_number()
+            .over(partition_by=preferences.c.user_id, order_by=matches.c.lexical.desc())
+            .label("rank"),
+        ).select_from(preferences.join(matches, true()))
+        return [(user_id, job_id, rank) for user_id, job_id, rank in db.execute(statement)]
+
+    def nearest_items(
+        self,
+        db: Session,
+        kind: str,
+        embedding: List[float],
+        limit: int,
+        exclude_id: Optional[str] = None,
+    ) -> List[Tuple]:
+        """
+        Nearest jobs or resources to an embedding, by cosine similarity
+
+        Args:
+            db: Database session
+            kind: JOBS or RESOURCES
+            embedding: Query embedding
+            limit: Maximum number of results
+            exclude_id: Item ID to leave out
+
+        Returns:
+            List of (item, similarity_score) tuples ordered by score desc
+        """
+        model = Job if kind == JOBS else Resource
+        return self._vector_candidates(
+            db,
+            model,
+            kind,
+            embedding,
+            limit,
+            exclude_id=exclude_id,
+            rerank_candidates=settings.ANN_BINARY_CANDIDATES_SIMILAR,
         )
-        return final_results
 
     def get_similar_jobs(
         self,
@@ -275,6 +1177,9 @@ class RecommendationService:
         job_embedding: List[float],
         exclude_job_id: str,
         limit: int = 5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        trace: Optional[RankingTrace] = None,
     ) -> List[Tuple[Job, float]]:
         """
         Get jobs similar to a specific job using cosine similarity
@@ -284,24 +1189,31 @@ class RecommendationService:
             job_embedding: Job's 384-dim embedding vector
             exclude_job_id: ID of the job to exclude from results
             limit: Maximum number of results
+            ef_search: HNSW search breadth (recall/latency trade-off)
+            probes: IVFFlat probes (recall/latency trade-off)
+            trace: Explain-mode trace to fill
 
         Returns:
             List of (Job, similarity_score) tuples ordered by score desc
         """
-        results = (
-            db.query(
+        with metrics.time("similar.jobs.retrieve", trace):
+            results = self._vector_candidates(
+                db,
                 Job,
-                (1 - Job.embedding.cosine_distance(job_embedding)).label("similarity"),
+                JOBS,
+                job_embedding,
+                limit,
+                exclude_id=exclude_job_id,
+                ef_search=ef_search,
+                probes=probes,
+                rerank_candidates=settings.ANN_BINARY_CANDIDATES_SIMILAR,
+                trace=trace,
             )
-            .filter(Job.embedding.isnot(None))  # Filter out NULL embeddings
-            .filter(Job.id != exclude_job_id)  # Exclude the original job
-            .order_by((1 - Job.embedding.cosine_distance(job_embedding)).desc())
-            .limit(limit)
-            .all()
-        )
+        if trace is not None:
+            trace.record_results(results)
 
         logger.info(f"Found {len(results)} similar jobs for job {exclude_job_id}")
-        return [(job, float(similarity)) for job, similarity in results]
+        return results
 
     def get_similar_resources(
         self,
@@ -309,6 +1221,9 @@ class RecommendationService:
         resource_embedding: List[float],
         exclude_resource_id: str,
         limit: int = 5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        trace: Optional[RankingTrace] = None,
     ) -> List[Tuple[Resource, float]]:
         """
         Get resources similar to a specific resource using cosine similarity
@@ -318,30 +1233,33 @@ class RecommendationService:
             resource_embedding: Resource's 384-dim embedding vector
             exclude_resource_id: ID of the resource to exclude from results
             limit: Maximum number of results
+            ef_search: HNSW search breadth (recall/latency trade-off)
+            probes: IVFFlat probes (recall/latency trade-off)
+            trace: Explain-mode trace to fill
 
         Returns:
             List of (Resource, similarity_score) tuples ordered by score desc
         """
-        results = (
-            db.query(
+        with metrics.time("similar.resources.retrieve", trace):
+            results = self._vector_candidates(
+                db,
                 Resource,
-                (1 - Resource.embedding.cosine_distance(resource_embedding)).label(
-                    "similarity"
-                ),
+                RESOURCES,
+                resource_embedding,
+                limit,
+                exclude_id=exclude_resource_id,
+                ef_search=ef_search,
+                probes=probes,
+                rerank_candidates=settings.ANN_BINARY_CANDIDATES_SIMILAR,
+                trace=trace,
             )
-            .filter(Resource.embedding.isnot(None))  # Filter out NULL embeddings
-            .filter(Resource.id != exclude_resource_id)  # Exclude the original resource
-            .order_by(
-                (1 - Resource.embedding.cosine_distance(resource_embedding)).desc()
-            )
-            .limit(limit)
-            .all()
-        )
+        if trace is not None:
+            trace.record_results(results)
 
         logger.info(
             f"Found {len(results)} similar resources for resource {exclude_resource_id}"
         )
-        return [(resource, float(similarity)) for resource, similarity in results]
+        return results
 
 
 # Global instance
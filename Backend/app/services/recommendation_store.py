@@ -0,0 +1,460 @@
+"""
+Materialized per-user recommendations.
+
+The top-N jobs and resources of each user are kept in the user_recommendations
+table. A user's lists are recomputed when their profile embedding changes, and
+a job/resource write only touches the lists of the users in that item's
+neighbourhood. With the TF-IDF backend the item is scored for those users and
+spliced into their lists. With the full-text backend this is invalidation,
+not an incremental refresh: rank-fused scores depend on the whole candidate
+list, so the lists the item could enter or leave are marked stale and
+recomputed on their next read (see _invalidate_reachable).
+
+The recommendation endpoints read from the table and fall back to computing
+(and storing) the lists when they are missing, older than the freshness
+bound, or shorter than the request without being complete (a list is
+complete when it holds every item eligible for the user, e.g. after
+preferences and applications left fewer than RECOMMENDATION_STORE_SIZE).
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from app.core.config import settings
+from app.db.fulltext import SEARCH_CONFIG, search_query_text
+from app.db.model.application import ApplicationList
+from app.db.model.job import Job
+from app.db.model.recommendation import UserRecommendation
+from app.db.model.resources import Resource
+from app.db.model.user import User
+from app.db.session import SessionLocal
+from app.db.vector_indexes import apply_search_params
+from app.services.recommendation_service import (
+    DEFAULT_EMBEDDING_WEIGHT,
+    DEFAULT_TFIDF_WEIGHT,
+    FULLTEXT,
+    job_matches_user,
+    recommendation_service,
+)
+from app.services.skill_index import skill_index
+from app.services.tfidf_service import (
+    JOBS,
+    RESOURCES,
+    job_text_func,
+    resource_text_func,
+    tfidf_service,
+    user_text_func,
+)
+from sqlalchemy import ARRAY, String, bindparam, func
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+MODELS = {JOBS: Job, RESOURCES: Resource}
+TEXT_FUNCS = {JOBS: job_text_func, RESOURCES: resource_text_func}
+
+
+class RecommendationStore:
+    """Reads and maintains the user_recommendations table"""
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RECOMMENDATION_STORE_ENABLED
+
+    def _compute(self, db: Session, user: User, kind: str, limit: int) -> List[Tuple]:
+        if kind == JOBS:
+            return recommendation_service.get_recommended_jobs(
+                db=db, user_embedding=user.embedding, user=user, limit=limit
+            )
+        return recommendation_service.get_recommended_resources(
+            db=db, user_embedding=user.embedding, user=user, limit=limit
+        )
+
+    def _replace(
+        self, user_id: str, kind: str, results: List[Tuple], requested: int
+    ) -> None:
+        """Overwrite a user's stored list (in its own session, so the caller's
+        ORM objects are not expired by the commit); a list shorter than
+        `requested` is stored as complete"""
+        complete = len(results) < requested
+        with SessionLocal() as session:
+            try:
+                session.query(UserRecommendation).filter(
+                    UserRecommendation.user_id == user_id,
+                    UserRecommendation.item_type == kind,
+                ).delete(synchronize_session=False)
+                session.add_all(
+                    UserRecommendation(
+                        user_id=user_id,
+                        item_type=kind,
+                        item_id=item.id,
+                        score=score,
+                        complete=complete,
+                    )
+                    for item, score in results
+                )
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to store {kind} recommendations for user {user_id}: {e}")
+
+    def get_recommendations(
+        self, db: Session, user: User, kind: str, limit: int
+    ) -> List[Tuple]:
+        """
+        Get a user's recommendations, served from the store when fresh
+
+        Args:
+            db: Database session
+            user: Authenticated user (must have an embedding)
+            kind: JOBS or RESOURCES
+            limit: Maximum number of results
+
+        Returns:
+            List of (item, similarity_score) tuples ordered by score desc
+        """
+        if not self.enabled:
+            return self._compute(db, user, kind, limit)
+
+        cutoff = func.now() - timedelta(
+            seconds=settings.RECOMMENDATION_STORE_MAX_AGE_SECONDS
+        )
+        rows = (
+            db.query(
+                UserRecommendation.item_id,
+                UserRecommendation.score,
+                (UserRecommendation.computed_at >= cutoff).label("is_fresh"),
+                UserRecommendation.complete,
+            )
+            .filter(
+                UserRecommendation.user_id == user.id,
+                UserRecommendation.item_type == kind,
+            )
+            .order_by(UserRecommendation.score.desc())
+            .all()
+        )
+
+        complete = bool(rows) and all(row.complete for row in rows)
+        if (
+            rows
+            and (len(rows) >= limit or complete)
+            and all(row.is_fresh for row in rows)
+        ):
+            model = MODELS[kind]
+            rows = rows[:limit]
+            items = db.query(model).filter(model.id.in_([row.item_id for row in rows]))
+            items_by_id = {item.id: item for item in items}
+            if len(items_by_id) == len(rows):
+                logger.debug(f"Served {kind} recommendations for user {user.id} from store")
+                return [(items_by_id[row.item_id], row.score) for row in rows]
+
+        requested = max(limit, settings.RECOMMENDATION_STORE_SIZE)
+        results = self._compute(db, user, kind, requested)
+        # An empty list cannot be stored; skip the no-op rewrite at least
+        if results or rows:
+            self._replace(user.id, kind, results, requested)
+        return results[:limit]
+
+    def refresh_user(self, db: Session, user: User) -> None:
+        """Recompute a user's stored lists after their profile embedding changed"""
+        if not self.enabled or user.embedding is None:
+            return
+        for kind in (JOBS, RESOURCES):
+            try:
+                results = self._compute(
+                    db, user, kind, settings.RECOMMENDATION_STORE_SIZE
+                )
+            except Exception as e:
+                logger.error(f"Failed to refresh {kind} recommendations for user {user.id}: {e}")
+                continue
+            self._replace(user.id, kind, results, settings.RECOMMENDATION_STORE_SIZE)
+        logger.info(f"Refreshed stored recommendations for user {user.id}")
+
+    def on_item_changed(self, kind: str, item) -> None:
+        """
+        Patch the stored lists of users in a new/updated item's neighbourhood
+
+        The neighbourhood is the RECOMMENDATION_STORE_FANOUT users nearest to
+        the item embedding, plus every user whose list already holds the item.
+        For those users the item's hybrid score is computed in one vectorized
+        pass and spliced into the list if it beats the current N-th entry;
+        with the full-text backend the lists it could enter or leave are
+        marked stale instead (see _invalidate_reachable).
+
+        Args:
+            kind: JOBS or RESOURCES
+            item: The job or resource that was written
+        """
+        if not self.enabled or item.embedding is None:
+            return
+
+        with SessionLocal() as session:
+            try:
+                self._patch_neighbourhood(session, kind, item)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to patch stored recommendations for {kind} {item.id}: {e}")
+
+    def _patch_neighbourhood(self, session: Session, kind: str, item) -> None:
+        apply_search_params(session, settings.RECOMMENDATION_STORE_FANOUT)
+        nearest = (
+            session.query(User.id)
+            .filter(User.embedding.isnot(None))
+            .order_by(User.embedding.max_inner_product(item.embedding))
+            .limit(settings.RECOMMENDATION_STORE_FANOUT)
+        )
+        holders = session.query(UserRecommendation.user_id).filter(
+            UserRecommendation.item_type == kind,
+            UserRecommendation.item_id == item.id,
+        )
+        user_ids = {user_id for (user_id,) in nearest} | {
+            user_id for (user_id,) in holders
+        }
+        if not user_ids:
+            return
+
+        stored: Dict[str, List[UserRecommendation]] = {}
+        for row in session.query(UserRecommendation).filter(
+            UserRecommendation.user_id.in_(user_ids),
+            UserRecommendation.item_type == kind,
+        ):
+            stored.setdefault(row.user_id, []).append(row)
+        if not stored:
+            return  # Nobody in the neighbourhood has a materialized list yet
+
+        users = (
+            session.query(
+                User.id,
+                User.embedding,
+                User.skills,
+                User.education_level,
+                User.preferred_career_track,
+                User.preferred_job_type,
+                User.preferred_job_location,
+                User.experience_level,
+            )
+            .filter(User.id.in_(stored.keys()))
+            .all()
+        )
+        eligible = np.ones(len(users), dtype=bool)
+        if kind == JOBS:
+            # Jobs outside a user's preferences, or already applied to, are
+            # scored -inf so _splice evicts them
+            applied = {
+                user_id
+                for (user_id,) in session.query(ApplicationList.user_id).filter(
+                    ApplicationList.job_id == item.id,
+                    ApplicationList.user_id.in_(stored.keys()),
+                )
+            }
+            eligible = np.array(
+                [job_matches_user(item, user, user.id in applied) for user in users],
+                dtype=bool,
+            )
+
+        if settings.LEXICAL_BACKEND == FULLTEXT:
+            self._invalidate_reachable(session, kind, item, users, eligible, stored)
+            return
+
+        scores = np.where(eligible, self._item_scores(kind, item, users), -np.inf)
+        for user, score in zip(users, scores):
+            self._splice(session, stored[user.id], kind, item.id, float(score))
+
+    def _invalidate_reachable(
+        self,
+        session: Session,
+        kind: str,
+        item,
+        users,
+        eligible: np.ndarray,
+        stored: Dict[str, List[UserRecommendation]],
+    ) -> None:
+        """
+        Mark stale the stored lists a written item could enter or leave
+
+        Used with the full-text backend, where one item cannot be scored in
+        isolation. Lists holding the item are always marked. A list without
+        it is left alone when the item is not eligible for the user, or when
+        the list is full, the item shares no word with the user's text and
+        is less similar to the user than every listed item: it would then
+        rank below all of them in the vector ranking and be absent from the
+        full-text one (skill overlap, blended into job scores, is ignored).
+        """
+        stale = {
+            user_id
+            for user_id, rows in stored.items()
+            if any(row.item_id == item.id for row in rows)
+        }
+        candidates = []
+        for user, is_eligible in zip(users, eligible):
+            if user.id in stale or not is_eligible:
+                continue
+            if len(stored[user.id]) < settings.RECOMMENDATION_STORE_SIZE:
+                stale.add(user.id)  # Room left: any eligible item gets in
+            else:
+                candidates.append(user)
+
+        if candidates:
+            model = MODELS[kind]
+            listed_ids = list(
+                {row.item_id for user in candidates for row in stored[user.id]}
+            )
+            listed = session.query(model).filter(model.id.in_(listed_ids)).all()
+            position = {listed_item.id: i for i, listed_item in enumerate(listed)}
+            listed_matrix = recommendation_service.candidate_vectors(
+                session, model, kind, listed
+            )
+            item_vector = np.asarray(item.embedding, dtype=np.float32)
+            item_vector /= max(float(np.linalg.norm(item_vector)), 1e-12)
+
+            unmatched = []
+            for user in candidates:
+                user_vector = np.asarray(user.embedding, dtype=np.float32)
+                rows = [
+                    position[row.item_id]
+                    for row in stored[user.id]
+                    if row.item_id in position
+                ]
+                floor = (listed_matrix[rows] @ user_vector).min() if rows else np.inf
+                if item_vector @ user_vector >= floor:
+                    stale.add(user.id)
+                else:
+                    unmatched.append(user)
+            stale |= self._full_text_matches(session, model, item, unmatched)
+
+        for user_id in stale:
+            self._mark_stale(stored[user_id])
+        logger.debug(
+            f"Marked {len(stale)} of {len(stored)} stored {kind} lists stale for {item.id}"
+        )
+
+    @staticmethod
+    def _full_text_matches(session: Session, model, item, users) -> set:
+        """IDs of the users whose keyword text matches the item, in one query"""
+        queries = [(user.id, search_query_text(user_text_func(user))) for user in users]
+        queries = [(user_id, query) for user_id, query in queries if query]
+        if not queries:
+            return set()
+        user_queries = func.unnest(
+            bindparam("user_ids", [user_id for user_id, _ in queries], type_=ARRAY(String)),
+            bindparam("query_texts", [query for _, query in queries], type_=ARRAY(String)),
+        ).table_valued("user_id", "query_text").render_derived(name="user_queries")
+        matched = (
+            session.query(user_queries.c.user_id)
+            .select_from(user_queries)
+            .join(
+                model,
+                model.search_vector.op("@@")(
+                    func.websearch_to_tsquery(SEARCH_CONFIG, user_queries.c.query_text)
+                ),
+            )
+            .filter(model.id == item.id)
+        )
+        return {user_id for (user_id,) in matched}
+
+    def _item_scores(self, kind: str, item, users) -> np.ndarray:
+        """Hybrid score of one item for many users, matching the online ranker"""
+        user_matrix = np.asarray([u.embedding for u in users], dtype=np.float32)
+        item_vector = np.asarray(item.embedding, dtype=np.float32)
+        vector_scores = (user_matrix @ item_vector) / np.maximum(
+            np.linalg.norm(user_matrix, axis=1) * np.linalg.norm(item_vector), 1e-12
+        )
+
+        scores = vector_scores
+        user_tfidf = tfidf_service.transform([user_text_func(u) for u in users])
+        if user_tfidf is not None:
+            item_tfidf = tfidf_service.transform([TEXT_FUNCS[kind](item)])
+            lexical = (user_tfidf @ item_tfidf.T).toarray().ravel()
+            scores = DEFAULT_EMBEDDING_WEIGHT * vector_scores + DEFAULT_TFIDF_WEIGHT * lexical
+
+        if kind == JOBS:
+            weight = settings.RANKING_SKILL_WEIGHT
+            jaccard = skill_index.user_jaccard([u.skills for u in users], item.id)
+            scores = (1 - weight) * scores + weight * jaccard
+        return scores
+
+    @staticmethod
+    def _splice(
+        session: Session,
+        rows: List[UserRecommendation],
+        kind: str,
+        item_id: str,
+        score: float,
+    ) -> None:
+        """Insert, rescore or evict one item in a user's stored top-N list
+        (a score of -inf marks the item as ineligible for the user)"""
+        current = next((row for row in rows if row.item_id == item_id), None)
+        others = [row for row in rows if row is not current]
+        floor = min((row.score for row in others), default=float("-inf"))
+        full = len(rows) >= settings.RECOMMENDATION_STORE_SIZE
+        eligible = score != float("-inf")
+
+        if current is not None:
+            if eligible and (score >= floor or not full):
+                current.score = score
+            else:
+                session.delete(current)
+                if full:
+                    # The item dropped out of the top-N; an unknown item now
+                    # deserves the free slot, so mark the list stale to force
+                    # a recompute on the next read. A shorter list already
+                    # held every eligible item and stays valid
+                    RecommendationStore._mark_stale(others)
+        elif eligible and (score > floor or not full):
+            complete = rows[0].complete
+            if full:
+                session.delete(min(others, key=lambda row: row.score))
+                # Items beyond the new top-N are no longer all listed
+                complete = False
+                for row in others:
+                    row.complete = False
+            session.add(
+                UserRecommendation(
+                    user_id=rows[0].user_id,
+                    item_type=kind,
+                    item_id=item_id,
+                    score=score,
+                    computed_at=rows[0].computed_at,
+                    complete=complete,
+                )
+            )
+
+    @staticmethod
+    def _mark_stale(rows: List[UserRecommendation]) -> None:
+        """Age a stored list past the freshness bound"""
+        for row in rows:
+            row.computed_at = row.computed_at - timedelta(
+                seconds=settings.RECOMMENDATION_STORE_MAX_AGE_SECONDS + 1
+            )
+
+    def remove_item(self, kind: str, item_id: str, user_id: Optional[str] = None) -> None:
+        """Drop an item from every stored list, or from one user's list"""
+        if not self.enabled:
+            return
+        with SessionLocal() as session:
+            query = session.query(UserRecommendation).filter(
+                UserRecommendation.item_type == kind,
+                UserRecommendation.item_id == item_id,
+            )
+            if user_id is not None:
+                query = query.filter(UserRecommendation.user_id == user_id)
+            query.delete(synchronize_session=False)
+            session.commit()
+
+    def invalidate_user(self, user_id: str, kind: str) -> None:
+        """Drop a user's stored list so the next read recomputes it"""
+        if not self.enabled:
+            return
+        with SessionLocal() as session:
+            session.query(UserRecommendation).filter(
+                UserRecommendation.user_id == user_id,
+                UserRecommendation.item_type == kind,
+            ).delete(synchronize_session=False)
+            session.commit()
+
+
+# Global instance
+recommendation_store = RecommendationStore()
@@ -0,0 +1,266 @@
+"""
+Canonical skill dictionary shared by jobs, users and resources.
+
+Skills are free text (`Job.required_skills`, `User.skills`, `Resource.tags`).
+Every distinct skill is interned once in the `skills` table, and spellings
+resolve to it by:
+
+1. case and whitespace folding ("Python " -> "python")
+2. the `skill_aliases` table, seeded with BUILTIN_ALIASES ("nodejs" -> Node.js)
+3. dropping a trailing version number when the rest is a known skill and
+   either a built-in spelling ("Python3", "HTML5", "C++17" -> Python, HTML,
+   C++) or a word of 3+ letters before a dotted version ("Kotlin 1.9");
+   names like "S3", "EC2", "Web3" or "Auth0" are kept whole
+
+The resulting integer ids are stored beside the text arrays (see
+app/db/skill_ids.py), so skill filters are GIN index scans over integers.
+The name/alias -> id map is cached in-process; spellings missing from the
+cache are looked up in the database, so skills interned by other workers
+still resolve.
+"""
+
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.db.model.skill import Skill, SkillAlias
+from app.db.session import engine
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Canonical spelling -> alternative spellings (case/whitespace-insensitive)
+BUILTIN_ALIASES: Dict[str, List[str]] = {
+    "JavaScript": ["js", "ecmascript", "es6"],
+    "TypeScript": ["ts"],
+    "Python": ["py"],
+    "Node.js": ["node", "nodejs", "node js"],
+    "React": ["reactjs", "react.js", "react js"],
+    "Vue.js": ["vue", "vuejs"],
+    "Angular": ["angularjs", "angular.js"],
+    "Next.js": ["nextjs"],
+    "PostgreSQL": ["postgres", "postgre sql"],
+    "MongoDB": ["mongo"],
+    "Kubernetes": ["k8s"],
+    "Go": ["golang"],
+    "C#": ["c sharp", "csharp"],
+    "C++": ["cpp"],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    "REST API": ["rest", "restful api", "rest apis"],
+    "AWS": ["amazon web services"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Azure": ["microsoft azure"],
+    "Machine Learning": ["ml"],
+    "Natural Language Processing": ["nlp"],
+    "Scikit-learn": ["sklearn", "scikit learn"],
+    "Excel": ["ms excel", "microsoft excel"],
+    "Power BI": ["powerbi"],
+    "UX Design": ["ux", "user experience design"],
+    "UI Design": ["ui", "user interface design"],
+}
+
+# Trailing version: "python3", "python 3.11", "c++17", "angular v2"
+_VERSION_SUFFIX = re.compile(r"^(.*?[a-z+#])\s*v?(\d+(?:\.\d+)*)$")
+
+
+def normalize_skill(skill: str) -> str:
+    """Case- and whitespace-folded spelling of a skill"""
+    return " ".join(skill.lower().split())
+
+
+# Built-in canonical spellings and aliases, normalized
+_BUILTIN_KEYS = {
+    normalize_skill(spelling)
+    for canonical, aliases in BUILTIN_ALIASES.items()
+    for spelling in [canonical, *aliases]
+}
+
+
+def version_stem(key: str) -> Optional[str]:
+    """
+    Spelling of a normalized skill without its trailing version, or None
+
+    The version is only dropped from a built-in spelling ("python3") or from
+    a stem of at least 3 letters before a dotted version ("kotlin 1.9"), so
+    "s3", "ec2", "web3" or "auth0" do not collapse into other skills.
+    """
+    match = _VERSION_SUFFIX.match(key)
+    if not match:
+        return None
+    stem, version = match.groups()
+    if stem in _BUILTIN_KEYS:
+        return stem
+    if "." in version and sum(char.isalpha() for char in stem) >= 3:
+        return stem
+    return None
+
+
+class SkillDictionary:
+    """In-process cache of the canonical skill table and its aliases"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._ids: Dict[str, int] = {}  # canonical name or alias -> skill id
+        self._keys: Dict[int, str] = {}  # skill id -> canonical name
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, db: Session) -> None:
+        """Reload every skill and alias from the database"""
+        skills = db.query(Skill.id, Skill.name).all()
+        aliases = db.query(SkillAlias.alias, SkillAlias.skill_id).all()
+        with self._lock:
+            self._ids, self._keys = {}, {}
+            self._remember(skills, aliases)
+            self._loaded = True
+        logger.info(f"Loaded skill dictionary ({len(skills)} skills, {len(aliases)} aliases)")
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def _remember(
+        self, skills: Iterable[Tuple[int, str]], aliases: Iterable[Tuple[str, int]]
+    ) -> None:
+        with self._lock:
+            for skill_id, name in skills:
+                self._keys[skill_id] = name
+                self._ids.setdefault(name, skill_id)
+            # An alias wins over a skill interned under the same spelling
+            # before the alias existed
+            self._ids.update(aliases)
+
+    def _lookup(self, key: str) -> Optional[int]:
+        skill_id = self._ids.get(key)
+        if skill_id is None:
+            stem = version_stem(key)
+            if stem is not None:
+                skill_id = self._ids.get(stem)
+        return skill_id
+
+    def canonical_key(self, skill: str) -> str:
+        """
+        Canonical name of a skill if the cache knows it, else its normalized
+        spelling. Never touches the database.
+        """
+        key = normalize_skill(skill)
+        with self._lock:
+            skill_id = self._lookup(key)
+            return key if skill_id is None else self._keys.get(skill_id, key)
+
+    def _fetch(self, db: Session, keys: Iterable[str]) -> None:
+        """Cache the skills and aliases stored under any of the given spellings"""
+        candidates = set()
+        for key in keys:
+            candidates.add(key)
+            stem = version_stem(key)
+            if stem is not None:
+                candidates.add(stem)
+        skills = db.query(Skill.id, Skill.name).filter(Skill.name.in_(candidates)).all()
+        aliases = (
+            db.query(SkillAlias.alias, SkillAlias.skill_id)
+            .filter(SkillAlias.alias.in_(candidates))
+            .all()
+        )
+        aliased = {skill_id for _, skill_id in aliases} - {skill_id for skill_id, _ in skills}
+        if aliased:
+            skills += db.query(Skill.id, Skill.name).filter(Skill.id.in_(aliased)).all()
+        self._remember(skills, aliases)
+
+    def _create(self, spellings: Dict[str, str]) -> None:
+        """
+        Intern new skills (normalized name -> display spelling)
+
+        Runs in its own transaction, so an id is never cached for a row the
+        caller's transaction later rolls back; concurrent inserts of the same
+        name are absorbed by ON CONFLICT.
+        """
+        with engine.begin() as connection:
+            connection.execute(
+                insert(Skill)
+                .values(
+                    [{"name": key, "display_name": name} for key, name in spellings.items()]
+                )
+                .on_conflict_do_nothing(index_elements=[Skill.name])
+            )
+            skills = connection.execute(
+                select(Skill.id, Skill.name).where(Skill.name.in_(list(spellings)))
+            ).all()
+        self._remember(skills, [])
+
+    def resolve(
+        self, db: Session, skills: Optional[Sequence[str]], create: bool = True
+    ) -> List[int]:
+        """
+        Resolve free-text skills to canonical skill ids
+
+        Args:
+            db: Database session
+            skills: Skill spellings (None and blanks are ignored)
+            create: Intern skills that are not in the dictionary yet;
+                with False (filters) unknown skills are skipped
+
+        Returns:
+            Sorted distinct skill ids
+        """
+        self.ensure_loaded(db)
+        spellings: Dict[str, str] = {}
+        for skill in skills or []:
+            key = normalize_skill(skill)
+            if key:
+                spellings.setdefault(key, skill.strip())
+
+        with self._lock:
+            missing = [key for key in spellings if self._lookup(key) is None]
+        if missing:
+            self._fetch(db, missing)
+            with self._lock:
+                unknown = {
+                    key: spellings[key] for key in missing if self._lookup(key) is None
+                }
+            if unknown and create:
+                self._create(unknown)
+
+        with self._lock:
+            ids = {self._lookup(key) for key in spellings}
+        ids.discard(None)
+        return sorted(ids)
+
+    def seed_builtin_aliases(self) -> None:
+        """Intern the BUILTIN_ALIASES skills and aliases (existing rows are kept)"""
+        skills = [
+            {"name": normalize_skill(name), "display_name": name} for name in BUILTIN_ALIASES
+        ]
+        with engine.begin() as connection:
+            connection.execute(
+                insert(Skill).values(skills).on_conflict_do_nothing(index_elements=[Skill.name])
+            )
+            ids = dict(
+                connection.execute(
+                    select(Skill.name, Skill.id).where(
+                        Skill.name.in_([skill["name"] for skill in skills])
+                    )
+                ).all()
+            )
+            aliases = [
+                {"alias": normalize_skill(alias), "skill_id": ids[normalize_skill(name)]}
+                for name, spellings in BUILTIN_ALIASES.items()
+                for alias in spellings
+            ]
+            connection.execute(
+                insert(SkillAlias).values(aliases).on_conflict_do_nothing(
+                    index_elements=[SkillAlias.alias]
+                )
+            )
+        # Pick the aliases up on next use
+        self._loaded = False
+
+
+# Global instance
+skill_dictionary = SkillDictionary()
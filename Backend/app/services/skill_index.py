@@ -0,0 +1,213 @@
+"""
+Packed skill bitsets for exact skill-overlap features.
+
+Every distinct skill (by its canonical key in the skill dictionary, so case,
+whitespace, aliases and version suffixes are folded) gets an integer id in a
+shared vocabulary, and each job's required skills are held as one row of a
+bit-packed uint8 matrix. Overlap counts, Jaccard similarity and the matched /
+missing skills of a user against many jobs then come from a single AND /
+popcount pass over the candidate rows, without touching the database.
+
+The index is loaded from the DB on first use and kept in sync by the job
+CRUD module, like the ANN index.
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from app.db.model.job import Job
+from app.services.skill_dictionary import skill_dictionary
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Set bits per byte value
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def _skill_count(skills: Optional[Sequence[str]]) -> int:
+    """Distinct skills in a list, including ones the vocabulary has not seen"""
+    return len({skill_dictionary.canonical_key(skill) for skill in skills or []} - {""})
+
+
+class SkillFeatures:
+    """Skill-overlap features of one user against a list of jobs"""
+
+    def __init__(
+        self,
+        overlap: np.ndarray,
+        jaccard: np.ndarray,
+        matched: List[List[str]],
+        missing: List[List[str]],
+    ):
+        self.overlap = overlap  # shared skills per job
+        self.jaccard = jaccard  # |shared| / |user ∪ job| per job
+        self.matched = matched  # job skills the user has
+        self.missing = missing  # job skills the user lacks
+
+
+class SkillIndex:
+    """Skill vocabulary plus one packed bitset row per job"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ids_by_skill: Dict[str, int] = {}
+        self._names: List[str] = []  # skill id -> first spelling seen
+        self._bits = np.zeros((1024, 8), dtype=np.uint8)
+        self._slot_by_job: Dict[str, int] = {}
+        self._free_slots: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slot_by_job)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._names)
+
+    def load(self, db: Session) -> None:
+        """Rebuild the index from every job's required skills"""
+        skill_dictionary.ensure_loaded(db)
+        rows = db.query(Job.id, Job.required_skills).all()
+        with self._lock:
+            self._reset()
+            for job_id, skills in rows:
+                self.upsert(job_id, skills)
+            self._loaded = True
+        logger.info(
+            f"Loaded skill index for {len(rows)} jobs ({self.vocabulary_size} skills)"
+        )
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def _skill_ids(self, skills: Iterable[str], add: bool) -> List[int]:
+        ids = []
+        for skill in skills or []:
+            key = skill_dictionary.canonical_key(skill)
+            if not key:
+                continue
+            skill_id = self._ids_by_skill.get(key)
+            if skill_id is None and add:
+                skill_id = len(self._names)
+                self._ids_by_skill[key] = skill_id
+                self._names.append(skill.strip())
+            if skill_id is not None:
+                ids.append(skill_id)
+        return ids
+
+    def _pack(self, skill_ids: List[int]) -> np.ndarray:
+        """Bitset row of a set of skill ids, as wide as the matrix"""
+        width = self._bits.shape[1]
+        if skill_ids and max(skill_ids) >= width * 8:
+            # Vocabulary outgrew the matrix: double the row width
+            while max(skill_ids) >= width * 8:
+                width *= 2
+            self._bits = np.pad(self._bits, ((0, 0), (0, width - self._bits.shape[1])))
+        row = np.zeros(width * 8, dtype=bool)
+        row[skill_ids] = True
+        return np.packbits(row)
+
+    def upsert(self, job_id: str, skills: Optional[Sequence[str]]) -> None:
+        """Insert or replace a job's skill bitset"""
+        with self._lock:
+            row = self._pack(self._skill_ids(skills, add=True))
+            slot = self._slot_by_job.get(job_id)
+            if slot is None:
+                if self._free_slots:
+                    slot = self._free_slots.pop()
+                else:
+                    slot = len(self._slot_by_job)
+                    if slot == self._bits.shape[0]:
+                        self._bits = np.concatenate([self._bits, np.zeros_like(self._bits)])
+                self._slot_by_job[job_id] = slot
+            self._bits[slot] = row
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            slot = self._slot_by_job.pop(job_id, None)
+            if slot is not None:
+                self._bits[slot] = 0
+                self._free_slots.append(slot)
+
+    def features(
+        self, user_skills: Optional[Sequence[str]], job_ids: List[str]
+    ) -> SkillFeatures:
+        """
+        Compute skill-overlap features of a user against many jobs at once
+
+        Jobs missing from the index (e.g. written by another worker) get
+        zero overlap and no skill lists.
+
+        Args:
+            user_skills: The user's skills
+            job_ids: Candidate job IDs
+
+        Returns:
+            SkillFeatures with one entry per job, in job_ids order
+        """
+        with self._lock:
+            user_row = self._pack(self._skill_ids(user_skills, add=False))
+            slots = np.array(
+                [self._slot_by_job.get(job_id, -1) for job_id in job_ids], dtype=np.int64
+            )
+            rows = np.where((slots >= 0)[:, None], self._bits[slots], 0).astype(np.uint8)
+            names = self._names
+
+        shared = rows & user_row
+        overlap = _POPCOUNT[shared].sum(axis=1)
+        job_counts = _POPCOUNT[rows].sum(axis=1)
+        union = job_counts + _skill_count(user_skills) - overlap
+        jaccard = np.divide(
+            overlap, union, out=np.zeros(len(job_ids), dtype=np.float32), where=union > 0
+        ).astype(np.float32)
+
+        # Decode the matched / missing bit positions of every row in one pass
+        matched: List[List[str]] = [[] for _ in job_ids]
+        missing: List[List[str]] = [[] for _ in job_ids]
+        for lists, bits in ((matched, shared), (missing, rows & ~user_row)):
+            for row, skill_id in zip(*np.nonzero(np.unpackbits(bits, axis=1))):
+                lists[row].append(names[skill_id])
+
+        return SkillFeatures(overlap.astype(np.int32), jaccard, matched, missing)
+
+    def user_jaccard(
+        self, user_skill_lists: List[Optional[Sequence[str]]], job_id: str
+    ) -> np.ndarray:
+        """Jaccard similarity of many users' skills against one job"""
+        with self._lock:
+            slot = self._slot_by_job.get(job_id)
+            if slot is None:
+                return np.zeros(len(user_skill_lists), dtype=np.float32)
+            job_row = self._bits[slot].copy()
+            users = np.array(
+                [self._pack(self._skill_ids(skills, add=False)) for skills in user_skill_lists],
+                dtype=np.uint8,
+            ).reshape(len(user_skill_lists), -1)
+
+        overlap = _POPCOUNT[users & job_row].sum(axis=1)
+        union = (
+            np.array([_skill_count(skills) for skills in user_skill_lists])
+            + int(_POPCOUNT[job_row].sum())
+            - overlap
+        )
+        return np.divide(
+            overlap, union, out=np.zeros(len(users), dtype=np.float32), where=union > 0
+        ).astype(np.float32)
+
+    def explain(
+        self, user_skills: Optional[Sequence[str]], job_ids: List[str]
+    ) -> List[Tuple[List[str], List[str]]]:
+        """(matched_skills, missing_skills) per job, in job_ids order"""
+        features = self.features(user_skills, job_ids)
+        return list(zip(features.matched, features.missing))
+
+
+# Global instance
+skill_index = SkillIndex()
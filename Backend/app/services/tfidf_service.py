@@ -0,0 +1,371 @@
+"""
+Corpus-wide TF-IDF model for the keyword part of hybrid recommendations.
+
+The vectorizer is fitted once over every job and resource so IDF weights
+reflect the whole catalog. Item vectors are precomputed and kept in a sparse
+matrix keyed by item id, so a request only transforms the user text and takes
+one sparse dot product against the candidate rows.
+
+scikit-learn and scipy are imported on first fit, not at import: with the
+default fulltext lexical backend this model is never fitted, and importing
+the services (API, worker, scripts) should not pay for them.
+"""
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+
+from app.db.model.job import Job
+from app.db.model.resources import Resource
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from scipy import sparse
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+JOBS = "jobs"
+RESOURCES = "resources"
+
+
+def job_text_func(job) -> str:
+    """Build the keyword text for a job (title, description, skills, level)"""
+    return " ".join(
+        [
+            job.title or "",
+            job.description or "",
+            " ".join(job.required_skills) if job.required_skills else "",
+            job.recommended_experience_level.value
+            if job.recommended_experience_level
+            else "",
+        ]
+    )
+
+
+def resource_text_func(resource) -> str:
+    """Build the keyword text for a resource (name, description, tags)"""
+    return " ".join(
+        [
+            resource.name or "",
+            resource.description or "",
+            " ".join(resource.tags) if resource.tags else "",
+        ]
+    )
+
+
+def user_text_func(user) -> str:
+    """Build the keyword text for a user profile (skills, education, track)"""
+    return " ".join(
+        [
+            " ".join(user.skills) if user.skills else "",
+            user.education_level or "",
+            user.preferred_career_track or "",
+        ]
+    )
+
+
+class _ItemMatrix:
+    """
+    Sparse TF-IDF rows for one item type, keyed by item id
+
+    Rows added after the fit wait in a pending list and are appended to the
+    matrix in one vstack once they reach PENDING_RATIO of it, so a write
+    copies the matrix only every so many rows instead of on every upsert.
+    Row positions count the matrix rows first, then the pending rows.
+    """
+
+    PENDING_MIN_ROWS = 64
+    PENDING_RATIO = 0.1
+
+    def __init__(self, matrix: "sparse.csr_matrix", ids: List[str]):
+        self.matrix = matrix
+        self.pending: List["sparse.csr_matrix"] = []
+        self.row_by_id: Dict[str, int] = {item_id: i for i, item_id in enumerate(ids)}
+        self.stale_rows = 0
+
+    def append(self, row: "sparse.csr_matrix") -> int:
+        """Add a row; returns its position"""
+        position = self.matrix.shape[0] + len(self.pending)
+        self.pending.append(row)
+        if len(self.pending) >= max(
+            self.PENDING_MIN_ROWS, int(self.matrix.shape[0] * self.PENDING_RATIO)
+        ):
+            self.flush()
+        return position
+
+    def flush(self) -> None:
+        """Append the pending rows to the matrix"""
+        if self.pending:
+            from scipy import sparse
+
+            self.matrix = sparse.vstack([self.matrix, *self.pending], format="csr")
+            self.pending = []
+
+
+def _take_rows(
+    matrix: "sparse.csr_matrix",
+    pending: List["sparse.csr_matrix"],
+    rows: List[Optional[int]],
+) -> "sparse.csr_matrix":
+    """One row per position (matrix rows, then pending rows); None gives a zero row"""
+    from scipy import sparse
+
+    base = matrix.shape[0]
+    stored = [(i, row) for i, row in enumerate(rows) if row is not None and row < base]
+    selector = sparse.csr_matrix(
+        ([1.0] * len(stored), ([i for i, _ in stored], [row for _, row in stored])),
+        shape=(len(rows), base),
+    )
+    result = selector @ matrix
+
+    added = [(i, row - base) for i, row in enumerate(rows) if row is not None and row >= base]
+    if added:
+        tail = sparse.vstack([pending[row] for _, row in added], format="csr")
+        selector = sparse.csr_matrix(
+            ([1.0] * len(added), ([i for i, _ in added], list(range(len(added))))),
+            shape=(len(rows), len(added)),
+        )
+        result = result + selector @ tail
+    return result.tocsr()
+
+
+class TfidfService:
+    """Holds a TF-IDF vectorizer fitted on the job + resource corpus"""
+
+    # Refit once this fraction of the corpus has changed since the last fit,
+    # so IDF weights keep tracking the catalog without refitting per write.
+    REFIT_RATIO = 0.2
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._vectorizer: Optional["TfidfVectorizer"] = None
+        self._items: Dict[str, _ItemMatrix] = {}
+        self._corpus_size = 0
+        self._changes_since_fit = 0
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._vectorizer is not None
+
+    def fit(self, db: Session) -> None:
+        """
+        Fit the vectorizer on every job and resource and precompute item vectors
+
+        Args:
+            db: Database session
+        """
+        job_rows = db.query(
+            Job.id,
+            Job.title,
+            Job.description,
+            Job.required_skills,
+            Job.recommended_experience_level,
+        ).all()
+        resource_rows = db.query(
+            Resource.id, Resource.name, Resource.description, Resource.tags
+        ).all()
+
+        job_texts = [job_text_func(row) for row in job_rows]
+        resource_texts = [resource_text_func(row) for row in resource_rows]
+        corpus = job_texts + resource_texts
+
+        if not any(text.strip() for text in corpus):
+            logger.info("TF-IDF corpus is empty, skipping fit")
+            return
+
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = TfidfVectorizer(
+            max_features=20000,
+            stop_words="english",
+            ngram_range=(1, 2),  # Use unigrams and bigrams
+            sublinear_tf=True,
+        )
+        try:
+            matrix = vectorizer.fit_transform(corpus).tocsr()
+        except ValueError as e:
+            # Raised when the corpus only contains stop words
+            logger.warning(f"TF-IDF fit skipped: {e}")
+            return
+
+        items = {
+            JOBS: _ItemMatrix(matrix[: len(job_texts)], [row.id for row in job_rows]),
+            RESOURCES: _ItemMatrix(
+                matrix[len(job_texts) :], [row.id for row in resource_rows]
+            ),
+        }
+
+        with self._lock:
+            self._vectorizer = vectorizer
+            self._items = items
+            self._corpus_size = len(corpus)
+            self._changes_since_fit = 0
+
+        logger.info(
+            f"Fitted TF-IDF model on {len(corpus)} documents "
+            f"({len(vectorizer.vocabulary_)} terms)"
+        )
+
+    def ensure_fitted(self, db: Session) -> None:
+        """Fit on first use, and refit once enough of the corpus has drifted"""
+        if self._vectorizer is None or self._needs_refit():
+            try:
+                self.fit(db)
+            except Exception as e:
+                logger.error(f"TF-IDF fit failed: {e}", exc_info=True)
+
+    def _needs_refit(self) -> bool:
+        return self._changes_since_fit > max(
+            1, int(self._corpus_size * self.REFIT_RATIO)
+        )
+
+    def upsert(self, kind: str, item_id: str, text: str) -> None:
+        """
+        Add or replace the TF-IDF vector of a single item
+
+        Uses the current vocabulary and IDF weights. The previous row of an
+        updated item is left in place as a stale row and reclaimed on compaction.
+        New rows are buffered (see _ItemMatrix), not stacked one at a time.
+
+        Args:
+            kind: JOBS or RESOURCES
+            item_id: ID of the job or resource
+            text: Item text built with job_text_func/resource_text_func
+        """
+        with self._lock:
+            if self._vectorizer is None:
+                return
+            row = self._vectorizer.transform([text]).tocsr()
+            items = self._items.get(kind)
+            if items is None:
+                return
+
+            if item_id in items.row_by_id:
+                items.stale_rows += 1
+            items.row_by_id[item_id] = items.append(row)
+            self._changes_since_fit += 1
+
+            if items.stale_rows > len(items.row_by_id) // 2:
+                self._compact(items)
+
+    def remove(self, kind: str, item_id: str) -> None:
+        """Drop an item from the index"""
+        with self._lock:
+            items = self._items.get(kind)
+            if items is None or items.row_by_id.pop(item_id, None) is None:
+                return
+            items.stale_rows += 1
+            self._changes_since_fit += 1
+
+    @staticmethod
+    def _compact(items: _ItemMatrix) -> None:
+        """Rebuild the matrix without stale rows"""
+        items.flush()
+        ids = list(items.row_by_id.keys())
+        rows = [items.row_by_id[item_id] for item_id in ids]
+        items.matrix = items.matrix[rows]
+        items.row_by_id = {item_id: i for i, item_id in enumerate(ids)}
+        items.stale_rows = 0
+
+    def transform(self, texts: List[str]) -> Optional["sparse.csr_matrix"]:
+        """Transform query texts with the fitted vectorizer (None if not fitted)"""
+        vectorizer = self._vectorizer
+        if vectorizer is None:
+            return None
+        return vectorizer.transform(texts).tocsr()
+
+    def item_rows(
+        self, kind: str, item_ids: List[str]
+    ) -> Optional["sparse.csr_matrix"]:
+        """
+        Return the TF-IDF rows of the given items, in order
+
+        Items missing from the index get an all-zero row.
+
+        Args:
+            kind: JOBS or RESOURCES
+            item_ids: IDs of the items
+
+        Returns:
+            Sparse matrix with one row per item id, or None if not fitted
+        """
+        with self._lock:
+            items = self._items.get(kind)
+            if self._vectorizer is None or items is None:
+                return None
+            # flush() replaces the list, so the snapshot stays consistent
+            matrix, pending = items.matrix, items.pending
+            rows = [items.row_by_id.get(item_id) for item_id in item_ids]
+
+        return _take_rows(matrix, pending, rows)
+
+    def index_missing(
+        self, kind: str, items: Iterable, item_text_func: Callable
+    ) -> None:
+        """
+        Add items the index has not seen yet (e.g. written by another worker)
+
+        Args:
+            kind: JOBS or RESOURCES
+            items: Candidate items (jobs or resources)
+            item_text_func: Function to extract text from an unseen item
+        """
+        with self._lock:
+            index = self._items.get(kind)
+            if self._vectorizer is None or index is None:
+                return
+            unseen = [item for item in items if item.id not in index.row_by_id]
+        for item in unseen:
+            self.upsert(kind, item.id, item_text_func(item))
+
+    def score(
+        self,
+        kind: str,
+        query_text: str,
+        items: Iterable,
+        item_text_func: Callable,
+    ) -> Dict[str, float]:
+        """
+        Calculate TF-IDF cosine similarity between a query text and items
+
+        Items the index has not seen yet (e.g. written by another worker) are
+        transformed and added on the fly.
+
+        Args:
+            kind: JOBS or RESOURCES
+            query_text: User's profile text
+            items: Candidate items (jobs or resources)
+            item_text_func: Function to extract text from an unseen item
+
+        Returns:
+            Dictionary mapping item_id to TF-IDF similarity score
+        """
+        items = list(items)
+        if self._vectorizer is None or not items:
+            return {}
+
+        self.index_missing(kind, items, item_text_func)
+
+        # Vectorizer and rows are read together: a concurrent refit swaps both
+        with self._lock:
+            vectorizer = self._vectorizer
+            index = self._items.get(kind)
+            if vectorizer is None or index is None:
+                return {}
+            matrix, pending = index.matrix, index.pending
+            rows = [index.row_by_id.get(item.id) for item in items]
+
+        item_ids = [item.id for item, row in zip(items, rows) if row is not None]
+        rows = [row for row in rows if row is not None]
+        if not rows:
+            return {}
+
+        # Rows are L2-normalised by the vectorizer, so the dot product is cosine
+        query_vector = vectorizer.transform([query_text])
+        similarities = (_take_rows(matrix, pending, rows) @ query_vector.T).toarray().ravel()
+        return {item_ids[i]: float(similarities[i]) for i in range(len(item_ids))}
+
+
+# Global instance
+tfidf_service = TfidfService()
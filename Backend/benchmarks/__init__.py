@@ -0,0 +1,3 @@
+"""
+Benchmarks for retrieval quality and latency.
+"""
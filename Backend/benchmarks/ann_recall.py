@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compare the in-process HNSW index against the exact pgvector query.
+
+Uses stored job/resource embeddings as queries and reports recall@k of the
+ANN candidates against the exact SQL results, plus latency of both paths.
+
+Usage:
+    python -m benchmarks.ann_recall                  # jobs, k=10, 100 queries
+    python -m benchmarks.ann_recall --kind resources --k 20 --queries 200
+    python -m benchmarks.ann_recall --ef 32 --json   # machine-readable output
+
+With ANN_BINARY_ENABLED=true the binary-quantized index is measured instead,
+and --ef sets the number of Hamming candidates reranked.
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+from app.db.model.job import Job
+from app.db.model.resources import Resource
+from app.db.session import SessionLocal
+from app.services.ann_index import ann_service
+from app.services.recommendation_service import recommendation_service
+from app.services.tfidf_service import JOBS, RESOURCES
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000) if samples else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN recall/latency benchmark")
+    parser.add_argument("--kind", choices=[JOBS, RESOURCES], default=JOBS)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--ef", type=int, default=None, help="HNSW ef_search")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    model = Job if args.kind == JOBS else Resource
+    db = SessionLocal()
+    try:
+        build_start = time.perf_counter()
+        index = ann_service.build_index(db, args.kind)
+        build_seconds = time.perf_counter() - build_start
+        breadth = "candidates" if ann_service.binary else "ef_search"
+        if args.ef:
+            setattr(index, breadth, args.ef)
+
+        ids, vectors = index.snapshot()
+        if not ids:
+            logger.error(f"No {args.kind} with embeddings found")
+            return
+        sample = random.Random(0).sample(range(len(ids)), min(args.queries, len(ids)))
+
+        recalls, exact_latency, ann_latency = [], [], []
+        for i in sample:
+            query = vectors[i].tolist()
+
+            start = time.perf_counter()
+            exact = recommendation_service._sql_candidates(
+                db, model, query, args.k, exclude_id=ids[i]
+            )
+            exact_latency.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            approximate = index.search(query, args.k, exclude_id=ids[i])
+            ann_latency.append(time.perf_counter() - start)
+
+            exact_ids = {item.id for item, _ in exact}
+            if exact_ids:
+                hits = exact_ids & {item_id for item_id, _ in approximate}
+                recalls.append(len(hits) / len(exact_ids))
+    finally:
+        db.close()
+
+    report = {
+        "kind": args.kind,
+        "items": len(ids),
+        "queries": len(sample),
+        "k": args.k,
+        "index": type(index).__name__,
+        breadth: getattr(index, breadth),
+        "build_seconds": round(build_seconds, 3),
+        f"recall@{args.k}": round(float(np.mean(recalls)) if recalls else 0.0, 4),
+        "exact_sql_ms": {
+            "p50": percentile_ms(exact_latency, 50),
+            "p95": percentile_ms(exact_latency, 95),
+        },
+        "ann_ms": {
+            "p50": percentile_ms(ann_latency, 50),
+            "p95": percentile_ms(ann_latency, 95),
+        },
+    }
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Compare the embedding storage modes (float32 vector, halfvec, int8).
+
+For each mode reports bytes per vector and in-memory matrix size, recall@k of
+an exact search over the quantized vectors against float32 exact search, and
+query latency. Uses the stored job/resource embeddings, or random unit
+vectors with --synthetic. Also reports the current database footprint: the
+average stored column size and the table and embedding index sizes.
+
+Usage:
+    python -m benchmarks.embedding_storage                  # jobs, k=10, 100 queries
+    python -m benchmarks.embedding_storage --kind resources --k 20
+    python -m benchmarks.embedding_storage --synthetic 50000 --json
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+from app.db.embedding_types import (
+    EMBEDDING_DIM,
+    HALFVEC_STORAGE,
+    INT8,
+    STORAGE_MODES,
+    VECTOR,
+    round_trip,
+)
+from app.db.model.job import Job
+from app.db.model.resources import Resource
+from app.db.session import SessionLocal
+from app.services.ann_index import Int8FlatIndex
+from app.services.recommendation_service import recommendation_service
+from app.services.tfidf_service import JOBS, RESOURCES
+from sqlalchemy import text
+
+# On-disk payload per vector: pgvector stores a 4-byte header (dim + unused)
+# before the elements; int8 stores a float32 scale before the codes
+BYTES_PER_VECTOR = {
+    VECTOR: 4 + 4 * EMBEDDING_DIM,
+    HALFVEC_STORAGE: 4 + 2 * EMBEDDING_DIM,
+    INT8: 4 + EMBEDDING_DIM,
+}
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000) if samples else 0.0
+
+
+def load_vectors(kind: str, synthetic: int):
+    if synthetic:
+        rng = np.random.default_rng(0)
+        matrix = rng.standard_normal((synthetic, EMBEDDING_DIM)).astype(np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        return [str(i) for i in range(synthetic)], matrix
+
+    model = Job if kind == JOBS else Resource
+    db = SessionLocal()
+    try:
+        return recommendation_service.load_item_matrix(db, model, kind)
+    finally:
+        db.close()
+
+
+def database_footprint(kind: str):
+    """Average stored embedding size and table/index sizes of the live DB"""
+    db = SessionLocal()
+    try:
+        column_type = db.execute(
+            text(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = to_regclass(:table) AND attname = 'embedding' "
+                "AND NOT attisdropped"
+            ),
+            {"table": kind},
+        ).scalar()
+        avg_bytes = db.execute(
+            text(f"SELECT avg(pg_column_size(embedding)) FROM {kind}")
+        ).scalar()
+        table_bytes = db.execute(
+            text("SELECT pg_table_size(to_regclass(:table))"), {"table": kind}
+        ).scalar()
+        indexes = db.execute(
+            text(
+                "SELECT indexname, pg_relation_size(to_regclass(indexname)) "
+                "FROM pg_indexes WHERE tablename = :table AND indexname LIKE :pattern"
+            ),
+            {"table": kind, "pattern": f"ix_{kind}_embedding_%"},
+        ).all()
+    finally:
+        db.close()
+
+    return {
+        "column_type": column_type,
+        "avg_column_bytes": round(float(avg_bytes or 0), 1),
+        "table_bytes": int(table_bytes or 0),
+        "embedding_index_bytes": {name: int(size) for name, size in indexes},
+    }
+
+
+def exact_top_k(matrix, query, k, exclude):
+    scores = matrix @ query
+    scores[exclude] = -np.inf
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding storage mode benchmark")
+    parser.add_argument("--kind", choices=[JOBS, RESOURCES], default=JOBS)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument(
+        "--synthetic", type=int, default=0, help="Use N random vectors instead of the DB"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    ids, matrix = load_vectors(args.kind, args.synthetic)
+    if len(ids) <= args.k:
+        logger.error(f"Need more than k={args.k} {args.kind} with embeddings")
+        return
+    k = args.k
+    sample = random.Random(0).sample(range(len(ids)), min(args.queries, len(ids)))
+    truth = {i: set(exact_top_k(matrix, matrix[i], k, i).tolist()) for i in sample}
+
+    modes = {}
+    for mode in STORAGE_MODES:
+        stored = np.stack([round_trip(vector, storage=mode) for vector in matrix])
+        if mode == INT8:
+            # int8 is scored in-process; benchmark the index the service uses
+            index = Int8FlatIndex()
+            for item_id, vector in zip(ids, matrix):
+                index.add(item_id, vector)
+            position = {item_id: i for i, item_id in enumerate(ids)}
+            memory_bytes = len(ids) * (EMBEDDING_DIM + 4)
+
+            def search(i):
+                hits = index.search(matrix[i], k, exclude_id=ids[i])
+                return [position[item_id] for item_id, _ in hits]
+
+        else:
+            memory_bytes = int(stored.nbytes if mode == VECTOR else stored.size * 2)
+
+            def search(i):
+                return exact_top_k(stored, matrix[i], k, i).tolist()
+
+        recalls, latency = [], []
+        for i in sample:
+            start = time.perf_counter()
+            found = search(i)
+            latency.append(time.perf_counter() - start)
+            recalls.append(len(truth[i] & set(found)) / k)
+
+        modes[mode] = {
+            "bytes_per_vector": BYTES_PER_VECTOR[mode],
+            "memory_bytes": memory_bytes,
+            f"recall@{k}": round(float(np.mean(recalls)), 4),
+            "max_abs_error": float(np.abs(stored - matrix).max()),
+            "search_ms": {
+                "p50": percentile_ms(latency, 50),
+                "p95": percentile_ms(latency, 95),
+            },
+        }
+
+    report = {
+        "kind": args.kind,
+        "source": "synthetic" if args.synthetic else "database",
+        "items": len(ids),
+        "queries": len(sample),
+        "k": k,
+        "modes": modes,
+    }
+    if not args.synthetic:
+        report["database"] = database_footprint(args.kind)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
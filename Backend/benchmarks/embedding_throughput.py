@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Embedding throughput of the model session pool across core counts.
+
+For each core count the process is pinned to that many cores (CPU affinity)
+and each of these layouts is built:
+
+- pool:   the configured layout (EMBEDDING_POOL_SIZE / EMBEDDING_INTRA_OP_THREADS,
+          auto by default) for that many cores
+- single: one session using every core, i.e. one model shared by all callers
+- batched: the pool layout behind the micro-batcher (EMBEDDING_MICROBATCH_*),
+           which coalesces the concurrent requests into shared model calls
+
+Each layout runs two workloads over texts built from the seed jobs:
+
+- concurrent: --concurrency callers each embedding --request-size texts per
+  request (registrations and profile edits), reporting requests/s, texts/s
+  and p50/p95 request latency (plus the batch fill histogram for batched)
+- bulk:       one call embedding --bulk texts in EMBEDDING_BATCH_SIZE batches
+  (seeding, backfill), reporting texts/s
+
+The embedding cache is bypassed: every text is run through the model.
+
+Usage:
+    python -m benchmarks.embedding_throughput                 # 1, 2, 4, ... usable cores
+    python -m benchmarks.embedding_throughput --cores 1,4,8 --concurrency 16
+    python -m benchmarks.embedding_throughput --layouts pool --json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+from app.core.config import settings
+from app.db.seeded_data.jobs_seed import get_jobs_seed_data
+from app.services.embedding_batcher import MicroBatcher
+from app.services.embedding_pool import EmbeddingPool, pool_shape, usable_cores
+from app.services.embedding_service import MODEL_NAME, EmbeddingService
+from fastembed import TextEmbedding
+
+LAYOUTS = ("pool", "single", "batched")
+
+
+def make_texts(count: int, seed: int = 0) -> List[str]:
+    """Distinct job-like texts (seed job text plus a random skill tail)"""
+    rnd = random.Random(seed)
+    templates = [EmbeddingService.job_text(SimpleNamespace(**job)) for job in get_jobs_seed_data()]
+    words = sorted({word for text in templates for word in text.split()})
+    return [
+        f"{rnd.choice(templates)} {' '.join(rnd.sample(words, 5))}" for _ in range(count)
+    ]
+
+
+def build_pool(sessions: int, threads: int) -> EmbeddingPool:
+    return EmbeddingPool(
+        lambda: TextEmbedding(model_name=MODEL_NAME, threads=threads), sessions, threads
+    )
+
+
+def run_concurrent(
+    embed: Callable[[List[str]], np.ndarray],
+    texts: List[str],
+    concurrency: int,
+    request_size: int,
+) -> Dict:
+    requests = [
+        texts[i : i + request_size] for i in range(0, len(texts), request_size)
+    ]
+    latencies = []
+    lock = threading.Lock()
+
+    def request(batch: List[str]) -> None:
+        start = time.perf_counter()
+        embed(batch)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(request, requests))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests_per_second": round(len(requests) / elapsed, 1),
+        "texts_per_second": round(len(texts) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+    }
+
+
+def run_bulk(pool: EmbeddingPool, texts: List[str]) -> Dict:
+    start = time.perf_counter()
+    pool.embed(texts, settings.EMBEDDING_BATCH_SIZE)
+    return {"texts_per_second": round(len(texts) / (time.perf_counter() - start), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding pool throughput benchmark")
+    parser.add_argument(
+        "--cores", help="Comma-separated core counts (default: 1, 2, 4, ... usable cores)"
+    )
+    parser.add_argument(
+        "--layouts", default=",".join(LAYOUTS), help=f"Subset of {','.join(LAYOUTS)}"
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--request-size", type=int, default=1, help="Texts per request")
+    parser.add_argument("--bulk", type=int, default=2000, help="Texts in the bulk call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    if args.cores:
+        core_counts = [int(count) for count in args.cores.split(",")]
+    else:
+        core_counts, count = [], 1
+        while count < usable_cores():
+            core_counts.append(count)
+            count *= 2
+        core_counts.append(usable_cores())
+    layouts = [layout.strip() for layout in args.layouts.split(",")]
+    unknown = set(layouts) - set(LAYOUTS)
+    if unknown:
+        parser.error(f"Unknown layouts: {', '.join(sorted(unknown))}")
+
+    texts = make_texts(args.requests * args.request_size + args.bulk, args.seed)
+    concurrent_texts = texts[: args.requests * args.request_size]
+    bulk_texts = texts[len(concurrent_texts) :]
+
+    runs = []
+    try:
+        for cores in core_counts:
+            if available:
+                if cores > len(available):
+                    logger.warning(f"Skipping {cores} cores: only {len(available)} usable")
+                    continue
+                # Pin before building the sessions, so ONNX sizes its threads to it
+                os.sched_setaffinity(0, available[:cores])
+            for layout in layouts:
+                if layout == "single":
+                    sessions, threads = 1, cores
+                else:
+                    sessions, threads = pool_shape(
+                        cores,
+                        settings.EMBEDDING_POOL_SIZE,
+                        settings.EMBEDDING_INTRA_OP_THREADS,
+                    )
+                pool = build_pool(sessions, threads)
+                pool.embed(bulk_texts[: settings.EMBEDDING_BATCH_SIZE], settings.EMBEDDING_BATCH_SIZE)
+                batcher = None
+                if layout == "batched":
+                    batcher = MicroBatcher(
+                        lambda batch: pool.embed(batch, len(batch)),
+                        settings.EMBEDDING_MICROBATCH_MAX_SIZE,
+                        settings.EMBEDDING_MICROBATCH_MAX_WAIT_MS,
+                        concurrency=sessions,
+                    )
+                    embed = batcher.embed
+                else:
+                    embed = lambda batch: pool.embed(batch, settings.EMBEDDING_BATCH_SIZE)
+                run = {
+                    "cores": cores,
+                    "layout": layout,
+                    "sessions": sessions,
+                    "threads_per_session": threads,
+                    "concurrent": run_concurrent(
+                        embed, concurrent_texts, args.concurrency, args.request_size
+                    ),
+                    "bulk": run_bulk(pool, bulk_texts),
+                }
+                if batcher is not None:
+                    run["concurrent"]["batch_fill"] = batcher.fill.snapshot()
+                logger.info(
+                    f"{cores} cores, {layout} ({sessions}x{threads}): "
+                    f"{run['concurrent']['requests_per_second']} req/s, "
+                    f"bulk {run['bulk']['texts_per_second']} texts/s"
+                )
+                runs.append(run)
+    finally:
+        if available:
+            os.sched_setaffinity(0, available)
+
+    report = {
+        "model": MODEL_NAME,
+        "usable_cores": usable_cores(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "request_size": args.request_size,
+        "bulk": args.bulk,
+        "batch_size": settings.EMBEDDING_BATCH_SIZE,
+        "runs": runs,
+    }
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
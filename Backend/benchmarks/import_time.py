@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the entry points.
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+--repeat times. The report gives the median total import time, the modules
+with the largest self time, and which heavy dependencies (embedding model
+runtime, scikit-learn, scipy) ended up imported. With lazy loading none of
+them should appear: the model is loaded by the warm-up or the first
+embedding, and scikit-learn by the first TF-IDF fit.
+
+Usage:
+    python -m benchmarks.import_time                     # default entry points
+    python -m benchmarks.import_time --modules worker,app.db.crud.user
+    python -m benchmarks.import_time --repeat 5 --top 20 --json
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODULES = ("main", "worker", "seed_db", "app.db.crud.user", "app.db.crud.job")
+HEAVY_MODULES = ("fastembed", "onnxruntime", "sklearn", "scipy")
+
+
+def profile_import(module: str) -> Dict:
+    """Import a module in a fresh interpreter and parse its -X importtime log"""
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    self_us: Dict[str, int] = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        self_us[name.strip()] = int(own)
+        if not name.startswith("  "):  # top-level import of the probe
+            total_us += int(cumulative)
+    heavy = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+    return {
+        "total_ms": total_us / 1000,
+        "self_us": self_us,
+        "heavy": [name for name in heavy.split(",") if name],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entry point import-time profile")
+    parser.add_argument(
+        "--modules",
+        default=",".join(DEFAULT_MODULES),
+        help="Comma-separated modules to import",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules listed")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    for module in [name.strip() for name in args.modules.split(",")]:
+        runs = [profile_import(module) for _ in range(args.repeat)]
+        last = runs[-1]
+        slowest = sorted(last["self_us"].items(), key=lambda item: -item[1])[: args.top]
+        result = {
+            "module": module,
+            "median_total_ms": round(statistics.median(run["total_ms"] for run in runs), 1),
+            "heavy_imported": last["heavy"],
+            "slowest_self_ms": {name: round(us / 1000, 1) for name, us in slowest},
+        }
+        logger.info(
+            f"{module}: {result['median_total_ms']} ms, heavy: "
+            f"{', '.join(result['heavy_imported']) or 'none'}"
+        )
+        results.append(result)
+
+    report = {"python": sys.version.split()[0], "repeat": args.repeat, "modules": results}
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Offline ranking quality and latency benchmark over a synthetic corpus.
+
+For each corpus size, loads synthetic jobs and resources (see
+benchmarks/synthetic_corpus.py) into the database, builds the pgvector index
+the table size calls for plus every in-process index, and runs the same
+synthetic user profiles through each retrieval strategy of
+RecommendationService:
+
+- exact:    pgvector query with index scans disabled (the ground truth)
+- pgvector: pgvector query through the ANN index chosen for the table size
+- hnsw:     in-process HNSW index
+- int8:     in-process int8 flat index (quantized exact search)
+- binary:   in-process binary-quantized index with exact rerank
+- hybrid:   the full recommendation pipeline (vector + keywords + skills)
+
+and reports recall@k against exact search, NDCG@k against each user's
+held-out applications (jobs only) and p50/p95/p99 latency per query.
+
+Rows are written with "bench-" ids and deleted after the run (unless
+--keep). Run it against a scratch database: rows already in the tables take
+part in every search. The in-process HNSW index is pure Python, so building it
+over a million items takes a long time; select strategies with --strategies.
+
+Usage:
+    python -m benchmarks.ranking_eval                        # 1k items, k=10
+    python -m benchmarks.ranking_eval --sizes 1k,100k,1m --output run.json
+    python -m benchmarks.ranking_eval --strategies exact,pgvector,binary
+    python -m benchmarks.ranking_eval --output new.json --baseline old.json
+    python -m benchmarks.ranking_eval --compare old.json new.json
+
+The JSON report carries the git commit and the relevant settings; with
+--baseline (or --compare) metrics are compared per size, kind and strategy,
+and the exit code is 1 if recall or NDCG dropped, or p95 latency grew, by
+more than the tolerances.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import chain
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+from app.core.config import settings
+from app.db.embedding_types import INT8
+from app.db.fulltext import SEARCH_CONFIG
+from app.db.init_db import init_db
+from app.db.model.job import Job
+from app.db.model.resources import Resource
+from app.db.session import SessionLocal, engine
+from app.db.vector_indexes import choose_index_method, ensure_vector_indexes
+from app.services.ann_index import (
+    BinaryQuantizedIndex,
+    HNSWIndex,
+    Int8FlatIndex,
+    ann_service,
+)
+from app.services.recommendation_service import recommendation_service
+from app.services.skill_dictionary import skill_dictionary
+from app.services.skill_index import skill_index
+from app.services.tfidf_service import (
+    JOBS,
+    RESOURCES,
+    job_text_func,
+    resource_text_func,
+    tfidf_service,
+)
+from benchmarks.synthetic_corpus import (
+    ID_PREFIX,
+    HeldOutApplications,
+    SyntheticCorpus,
+    ndcg_at_k,
+)
+from sqlalchemy import bindparam, func, insert, text
+from sqlalchemy.orm import Session
+
+STRATEGIES = ["exact", "pgvector", "hnsw", "int8", "binary", "hybrid"]
+IN_PROCESS = {
+    "hnsw": lambda: HNSWIndex(
+        m=settings.ANN_HNSW_M,
+        ef_construction=settings.ANN_HNSW_EF_CONSTRUCTION,
+        ef_search=settings.ANN_HNSW_EF_SEARCH,
+        seed=0,
+    ),
+    "int8": Int8FlatIndex,
+    "binary": lambda: BinaryQuantizedIndex(
+        candidates=settings.ANN_BINARY_CANDIDATES_RECOMMENDED
+    ),
+}
+
+MODELS = {JOBS: Job, RESOURCES: Resource}
+TEXT_FUNCS = {JOBS: job_text_func, RESOURCES: resource_text_func}
+SKILL_COLUMNS = {JOBS: ("required_skills", "required_skill_ids"), RESOURCES: ("tags", "tag_ids")}
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(value: str) -> int:
+    """Parse a corpus size such as 1000, 100k or 1m"""
+    value = value.strip().lower()
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def percentiles_ms(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {
+        "mean": round(float(np.mean(samples) * 1000), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def clear_corpus() -> None:
+    """Delete every synthetic row from a previous size or run"""
+    with engine.begin() as connection:
+        for model in MODELS.values():
+            connection.execute(
+                text(f"DELETE FROM {model.__tablename__} WHERE id LIKE :prefix"),
+                {"prefix": f"{ID_PREFIX}%"},
+            )
+
+
+def load_corpus(
+    db: Session,
+    corpus: SyntheticCorpus,
+    kind: str,
+    size: int,
+    held_out: Optional[HeldOutApplications] = None,
+) -> float:
+    """
+    Insert `size` synthetic items of one kind with embeddings, search vectors
+    and skill ids; feeds every job batch to the held-out applications
+
+    Returns:
+        Seconds spent generating and inserting
+    """
+    model = MODELS[kind]
+    text_func = TEXT_FUNCS[kind]
+    skill_column, id_column = SKILL_COLUMNS[kind]
+    vocabulary_ids = {
+        skill: skill_dictionary.resolve(db, [skill]) for skill in corpus.vocabulary
+    }
+    statement = insert(model).values(
+        search_vector=func.to_tsvector(SEARCH_CONFIG, bindparam("document"))
+    )
+    generate = corpus.jobs if kind == JOBS else corpus.resources
+
+    start = time.perf_counter()
+    for rows, vectors in generate(size):
+        for row, vector in zip(rows, vectors):
+            row["embedding"] = vector
+            row[id_column] = sorted(
+                set(chain.from_iterable(vocabulary_ids[skill] for skill in row[skill_column]))
+            )
+            row["document"] = text_func(SimpleNamespace(**row))
+        db.execute(statement, rows)
+        db.commit()
+        if held_out is not None:
+            held_out.add([row["id"] for row in rows], vectors)
+    db.execute(text(f"ANALYZE {model.__tablename__}"))
+    db.commit()
+    return time.perf_counter() - start
+
+
+def build_indexes(db: Session, kind: str, strategies: List[str]) -> Dict[str, Dict]:
+    """Build the requested in-process indexes from the stored embeddings"""
+    model = MODELS[kind]
+    wanted = [name for name in strategies if name in IN_PROCESS]
+    if not wanted:
+        return {}
+    rows = (
+        db.query(model.id, model.embedding)
+        .filter(model.embedding.isnot(None))
+        .yield_per(5000)
+        .all()
+    )
+    built = {}
+    for name in wanted:
+        start = time.perf_counter()
+        index = IN_PROCESS[name]()
+        for item_id, embedding in rows:
+            index.add(item_id, embedding)
+        built[name] = {"index": index, "build_seconds": time.perf_counter() - start}
+        logger.info(f"Built {name} index over {len(rows)} {kind} in {built[name]['build_seconds']:.1f}s")
+    return built
+
+
+@contextmanager
+def installed(kind: str, index):
+    """Serve one kind from the given in-process index for the block"""
+    previous = ann_service._indexes.get(kind)
+    ann_service._indexes[kind] = index
+    try:
+        yield
+    finally:
+        if previous is None:
+            ann_service._indexes.pop(kind, None)
+        else:
+            ann_service._indexes[kind] = previous
+
+
+def strategy_search(db: Session, kind: str, name: str, k: int) -> Callable:
+    """Return a function user -> ranked item ids for one strategy"""
+    model = MODELS[kind]
+
+    def exact(user):
+        # Without index scans the ORDER BY ... LIMIT is a full scan and sort
+        db.execute(text("SET LOCAL enable_indexscan = off"))
+        results = recommendation_service._sql_candidates(db, model, user.embedding, k)
+        db.commit()
+        return results
+
+    def pgvector(user):
+        results = recommendation_service._sql_candidates(db, model, user.embedding, k)
+        db.commit()
+        return results
+
+    def in_process(user):
+        return recommendation_service._ann_candidates(db, model, kind, user.embedding, k)
+
+    def hybrid(user):
+        recommend = (
+            recommendation_service.get_recommended_jobs
+            if kind == JOBS
+            else recommendation_service.get_recommended_resources
+        )
+        return recommend(db=db, user_embedding=user.embedding, user=user, limit=k)
+
+    search = {"exact": exact, "pgvector": pgvector, "hybrid": hybrid}.get(name, in_process)
+    return lambda user: [item.id for item, _ in search(user)]
+
+
+def evaluate(
+    db: Session,
+    kind: str,
+    users,
+    labels: Optional[List[set]],
+    strategies: List[str],
+    indexes: Dict[str, Dict],
+    k: int,
+) -> Dict[str, Dict]:
+    """Run every strategy over the users and score it against exact search"""
+    report: Dict[str, Dict] = {}
+    exact_results: Optional[List[List[str]]] = None
+    # Exact first: it is the reference for recall
+    for name in sorted(strategies, key=lambda name: name != "exact"):
+        search = strategy_search(db, kind, name, k)
+        index = indexes.get(name, {}).get("index")
+        with installed(kind, index) if index is not None else _no_index(kind):
+            search(users[0])  # warm-up (plans, caches, lazy loads)
+            results, latencies = [], []
+            for user in users:
+                start = time.perf_counter()
+                results.append(search(user))
+                latencies.append(time.perf_counter() - start)
+        db.rollback()
+
+        if name == "exact":
+            exact_results = results
+        entry = {
+            "build_seconds": (
+                round(indexes[name]["build_seconds"], 3) if name in indexes else None
+            ),
+            f"recall@{k}": None,
+            f"ndcg@{k}": None,
+            "latency_ms": percentiles_ms(latencies),
+        }
+        if exact_results is not None:
+            recalls = [
+                len(set(found) & set(truth)) / len(truth)
+                for found, truth in zip(results, exact_results)
+                if truth
+            ]
+            entry[f"recall@{k}"] = round(float(np.mean(recalls)), 4) if recalls else None
+        if labels is not None:
+            scores = [ndcg_at_k(found, relevant, k) for found, relevant in zip(results, labels)]
+            scores = [score for score in scores if score is not None]
+            entry[f"ndcg@{k}"] = round(float(np.mean(scores)), 4) if scores else None
+        report[name] = entry
+        logger.info(f"{kind} {name}: {entry}")
+    return report
+
+
+@contextmanager
+def _no_index(kind: str):
+    """Hide the in-process index of one kind so SQL paths are measured"""
+    previous = ann_service._indexes.pop(kind, None)
+    try:
+        yield
+    finally:
+        if previous is not None:
+            ann_service._indexes[kind] = previous
+
+
+def run(args) -> Dict:
+    strategies = args.strategies
+    if settings.EMBEDDING_STORAGE == INT8:
+        # Postgres cannot score int8 (bytea) columns
+        strategies = [name for name in strategies if name not in ("exact", "pgvector")]
+        logger.warning("int8 storage: exact and pgvector strategies skipped, no recall")
+
+    init_db_sync()
+    corpus = SyntheticCorpus(seed=args.seed)
+    users, interests = corpus.users(args.queries)
+    runs = []
+    db = SessionLocal()
+    try:
+        for size in args.sizes:
+            clear_corpus()
+            held_out = HeldOutApplications(
+                interests, per_user=args.applications, seed=args.seed
+            )
+            insert_seconds = {
+                JOBS: load_corpus(db, corpus, JOBS, size, held_out),
+                RESOURCES: load_corpus(db, corpus, RESOURCES, size),
+            }
+            start = time.perf_counter()
+            ensure_vector_indexes()
+            index_seconds = time.perf_counter() - start
+
+            skill_index.load(db)
+            if settings.LEXICAL_BACKEND != "fulltext":
+                tfidf_service.fit(db)
+
+            for kind in args.kinds:
+                model = MODELS[kind]
+                items = db.query(func.count(model.id)).scalar()
+                indexes = build_indexes(db, kind, strategies)
+                labels = held_out.labels() if kind == JOBS else None
+                runs.append(
+                    {
+                        "size": size,
+                        "kind": kind,
+                        "items": items,
+                        "insert_seconds": round(insert_seconds[kind], 3),
+                        "pgvector_index": choose_index_method(items),
+                        "pgvector_index_seconds": round(index_seconds, 3),
+                        "strategies": evaluate(
+                            db, kind, users, labels, strategies, indexes, args.k
+                        ),
+                    }
+                )
+                del indexes
+    finally:
+        db.close()
+        if not args.keep:
+            clear_corpus()
+            ensure_vector_indexes()
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "EMBEDDING_STORAGE": settings.EMBEDDING_STORAGE,
+            "LEXICAL_BACKEND": settings.LEXICAL_BACKEND,
+            "PGVECTOR_INDEX_METHOD": settings.PGVECTOR_INDEX_METHOD,
+            "PGVECTOR_HNSW_EF_SEARCH": settings.PGVECTOR_HNSW_EF_SEARCH,
+            "ANN_HNSW_EF_SEARCH": settings.ANN_HNSW_EF_SEARCH,
+            "ANN_BINARY_CANDIDATES_RECOMMENDED": settings.ANN_BINARY_CANDIDATES_RECOMMENDED,
+        },
+        "k": args.k,
+        "queries": args.queries,
+        "seed": args.seed,
+        "runs": runs,
+    }
+
+
+def init_db_sync() -> None:
+    """Create the tables and columns the corpus needs (init_db is async)"""
+    asyncio.run(init_db())
+
+
+def compare(
+    baseline: Dict, current: Dict, max_quality_drop: float, max_latency_increase: float
+) -> List[str]:
+    """
+    Compare two reports per size, kind and strategy
+
+    Returns:
+        Descriptions of the regressions (empty if none)
+    """
+    k = current["k"]
+    previous = {
+        (run["size"], run["kind"], name): metrics
+        for run in baseline["runs"]
+        for name, metrics in run["strategies"].items()
+    }
+    regressions = []
+    for run in current["runs"]:
+        for name, metrics in run["strategies"].items():
+            key = (run["size"], run["kind"], name)
+            before = previous.get(key)
+            if before is None:
+                continue
+            label = f"{run['kind']}@{run['size']} {name}"
+            for metric in (f"recall@{k}", f"ndcg@{k}"):
+                old, new = before.get(metric), metrics.get(metric)
+                if old is not None and new is not None:
+                    print(f"{label} {metric}: {old} -> {new} ({new - old:+.4f})")
+                    if old - new > max_quality_drop:
+                        regressions.append(f"{label} {metric} dropped {old} -> {new}")
+            old, new = before["latency_ms"]["p95"], metrics["latency_ms"]["p95"]
+            print(f"{label} p95_ms: {old} -> {new}")
+            if old > 0 and new > old * (1 + max_latency_increase):
+                regressions.append(f"{label} p95 latency grew {old}ms -> {new}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranking quality/latency benchmark")
+    parser.add_argument(
+        "--sizes", default="1k", help="Comma-separated corpus sizes, e.g. 1k,100k,1m"
+    )
+    parser.add_argument(
+        "--strategies",
+        default=",".join(STRATEGIES),
+        help=f"Comma-separated subset of {','.join(STRATEGIES)}",
+    )
+    parser.add_argument(
+        "--kinds", default=f"{JOBS},{RESOURCES}", help="Item types to evaluate"
+    )
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100, help="Synthetic users")
+    parser.add_argument(
+        "--applications", type=int, default=5, help="Held-out applications per user"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Report to compare this run against")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two reports"
+    )
+    parser.add_argument("--max-quality-drop", type=float, default=0.01)
+    parser.add_argument(
+        "--max-latency-increase", type=float, default=0.2, help="Allowed p95 growth ratio"
+    )
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic rows")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            report = json.load(f)
+    else:
+        args.sizes = [parse_size(size) for size in args.sizes.split(",")]
+        args.strategies = [name.strip() for name in args.strategies.split(",")]
+        unknown = set(args.strategies) - set(STRATEGIES)
+        if unknown:
+            parser.error(f"Unknown strategies: {', '.join(sorted(unknown))}")
+        args.kinds = [kind.strip() for kind in args.kinds.split(",")]
+        report = run(args)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        print(json.dumps(report))
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+
+    if baseline is not None:
+        regressions = compare(
+            baseline, report, args.max_quality_drop, args.max_latency_increase
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Synthetic jobs, resources and users for the ranking benchmarks.
+
+Items are variations of the seed data (app/db/seeded_data): each synthetic
+job copies a seed job's title, description and type, keeps most of its
+required skills, picks up a few random ones from the seed vocabulary and is
+posted by one of a handful of branches of the seed company. Resources are
+built the same way from the seed resources and their tags.
+
+Embeddings are synthetic as well, so a million items can be generated
+without running the embedding model: every seed template and every skill
+gets a fixed random direction, and an item's vector is the normalized sum of
+its template direction, its skill directions and some noise. Items that
+share a template or skills are therefore close, like real embeddings of
+similar postings.
+
+Each synthetic user is interested in one seed job template and lists about
+half of its skills. The jobs the user would apply to - the top matches of the
+profile blended with the unlisted skills, with a little noise - are tracked
+while the jobs are generated and held out as relevance labels: they are
+never stored as applications, so the recommender cannot see them.
+"""
+
+import random
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from app.db.embedding_types import EMBEDDING_DIM
+from app.db.model.job import ExperienceLevel, JobLocation
+from app.db.model.user import User
+from app.db.seeded_data.jobs_seed import get_jobs_seed_data
+from app.db.seeded_data.resources_seed import get_resources_seed_data
+
+# Prefix of every synthetic row id, so a run can find and delete its rows
+ID_PREFIX = "bench-"
+
+BRANCHES = ["", " Labs", " Europe", " Asia", " Remote", " Studio"]
+EDUCATION_LEVELS = ["High School", "Bachelor's", "Master's"]
+
+# Weights (vector norms) of the embedding components
+TEMPLATE_WEIGHT = 1.0
+SKILL_WEIGHT = 1.2
+NOISE = 0.5
+# Weight of the skills a user has but did not list, in the interest that
+# picks the held-out applications, and the noise on the interest scores
+HIDDEN_INTEREST_WEIGHT = 0.5
+APPLICATION_NOISE = 0.02
+
+
+def _unit_rows(rng: np.random.Generator, count: int, dim: int) -> np.ndarray:
+    rows = rng.standard_normal((count, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+class SyntheticCorpus:
+    """Deterministic generator of synthetic jobs, resources and users"""
+
+    def __init__(self, seed: int = 0, dim: int = EMBEDDING_DIM):
+        self.seed = seed
+        self.dim = dim
+        self.job_templates = get_jobs_seed_data()
+        self.resource_templates = get_resources_seed_data()
+
+        vocabulary = set()
+        for job in self.job_templates:
+            vocabulary.update(job["required_skills"])
+        for resource in self.resource_templates:
+            vocabulary.update(resource["tags"])
+        self.vocabulary = sorted(vocabulary)
+        self._skill_slot = {skill: i for i, skill in enumerate(self.vocabulary)}
+
+        rng = np.random.default_rng(seed)
+        self._skill_vectors = _unit_rows(rng, len(self.vocabulary), dim)
+        self._job_template_vectors = _unit_rows(rng, len(self.job_templates), dim)
+        self._resource_template_vectors = _unit_rows(rng, len(self.resource_templates), dim)
+
+    def _embed(
+        self,
+        rng: np.random.Generator,
+        template_vectors: np.ndarray,
+        templates: np.ndarray,
+        skill_sets: Sequence[Sequence[str]],
+        noise: float = NOISE,
+    ) -> np.ndarray:
+        """Normalized template + skill + noise vectors of a batch of items"""
+        skill_sums = np.zeros((len(skill_sets), self.dim), dtype=np.float32)
+        for row, skills in enumerate(skill_sets):
+            if skills:
+                slots = [self._skill_slot[skill] for skill in skills]
+                skill_sums[row] = self._skill_vectors[slots].sum(axis=0) / np.sqrt(len(slots))
+        vectors = (
+            TEMPLATE_WEIGHT * template_vectors[templates]
+            + SKILL_WEIGHT * skill_sums
+            + noise
+            * rng.standard_normal((len(skill_sets), self.dim)).astype(np.float32)
+            / np.sqrt(self.dim)
+        )
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def _vary_skills(self, rnd: random.Random, skills: List[str]) -> List[str]:
+        """Keep most of a template's skills and add up to two random ones"""
+        kept = [skill for skill in skills if rnd.random() < 0.8] or skills[:1]
+        extra = rnd.sample(self.vocabulary, rnd.randint(0, 2))
+        return list(dict.fromkeys(kept + extra))
+
+    def jobs(
+        self, count: int, batch_size: int = 5000
+    ) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        """
+        Generate synthetic jobs in batches
+
+        Yields:
+            Tuples of (Job column dicts without the embedding, normalized
+            embedding matrix aligned with them)
+        """
+        rnd = random.Random(self.seed + 1)
+        rng = np.random.default_rng(self.seed + 1)
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            templates = np.array(
+                [rnd.randrange(len(self.job_templates)) for _ in range(size)]
+            )
+            rows = []
+            for offset, template_slot in enumerate(templates):
+                template = self.job_templates[template_slot]
+                rows.append(
+                    {
+                        **template,
+                        "id": f"{ID_PREFIX}job-{start + offset}",
+                        "company": template["company"] + rnd.choice(BRANCHES),
+                        "job_location": rnd.choice(list(JobLocation)),
+                        "required_skills": self._vary_skills(
+                            rnd, template["required_skills"]
+                        ),
+                    }
+                )
+            vectors = self._embed(
+                rng,
+                self._job_template_vectors,
+                templates,
+                [row["required_skills"] for row in rows],
+            )
+            yield rows, vectors
+
+    def resources(
+        self, count: int, batch_size: int = 5000
+    ) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        """
+        Generate synthetic resources in batches
+
+        Yields:
+            Tuples of (Resource column dicts without the embedding,
+            normalized embedding matrix aligned with them)
+        """
+        rnd = random.Random(self.seed + 2)
+        rng = np.random.default_rng(self.seed + 2)
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            templates = np.array(
+                [rnd.randrange(len(self.resource_templates)) for _ in range(size)]
+            )
+            rows = []
+            for offset, template_slot in enumerate(templates):
+                template = self.resource_templates[template_slot]
+                rows.append(
+                    {
+                        **template,
+                        "id": f"{ID_PREFIX}resource-{start + offset}",
+                        "tags": self._vary_skills(rnd, template["tags"]),
+                    }
+                )
+            vectors = self._embed(
+                rng,
+                self._resource_template_vectors,
+                templates,
+                [row["tags"] for row in rows],
+            )
+            yield rows, vectors
+
+    def users(self, count: int) -> Tuple[List[User], np.ndarray]:
+        """
+        Generate synthetic (unsaved) users
+
+        Returns:
+            Tuple of (users with skills and profile embeddings, normalized
+            interest vectors: the profile blended with the full skill set of
+            each user's template)
+        """
+        rnd = random.Random(self.seed + 3)
+        rng = np.random.default_rng(self.seed + 3)
+        templates = np.array(
+            [rnd.randrange(len(self.job_templates)) for _ in range(count)]
+        )
+        users, skill_sets, interest_sets = [], [], []
+        for i, template_slot in enumerate(templates):
+            template = self.job_templates[template_slot]
+            required = template["required_skills"]
+            skills = rnd.sample(required, max(1, len(required) // 2))
+            skills += rnd.sample(self.vocabulary, 1)
+            skills = list(dict.fromkeys(skills))
+            users.append(
+                User(
+                    id=f"{ID_PREFIX}user-{i}",
+                    full_name=f"Benchmark User {i}",
+                    email=f"{ID_PREFIX}user-{i}@example.com",
+                    education_level=rnd.choice(EDUCATION_LEVELS),
+                    preferred_career_track=template["title"],
+                    hashed_password="",
+                    skills=skills,
+                    experience_level=rnd.choice(list(ExperienceLevel)),
+                )
+            )
+            skill_sets.append(skills)
+            interest_sets.append(required)
+
+        profiles = self._embed(rng, self._job_template_vectors, templates, skill_sets)
+        for user, profile in zip(users, profiles):
+            user.embedding = profile.tolist()
+        hidden = self._embed(
+            rng, self._job_template_vectors, templates, interest_sets, noise=0.0
+        )
+        interests = profiles + HIDDEN_INTEREST_WEIGHT * hidden
+        return users, interests / np.linalg.norm(interests, axis=1, keepdims=True)
+
+
+class HeldOutApplications:
+    """
+    Running top-n jobs per user by noisy interest score
+
+    Fed with every generated job batch; the final top-n are the jobs each
+    user applied to.
+    """
+
+    def __init__(self, interests: np.ndarray, per_user: int = 5, seed: int = 0):
+        self.interests = interests
+        self.per_user = per_user
+        self._rng = np.random.default_rng(seed + 4)
+        self._scores = np.full((len(interests), 0), -np.inf, dtype=np.float32)
+        self._ids = np.empty((len(interests), 0), dtype=object)
+
+    def add(self, ids: List[str], vectors: np.ndarray) -> None:
+        scores = self.interests @ vectors.T
+        scores += APPLICATION_NOISE * self._rng.standard_normal(scores.shape).astype(
+            np.float32
+        )
+        scores = np.concatenate([self._scores, scores], axis=1)
+        ids = np.concatenate(
+            [self._ids, np.broadcast_to(np.array(ids, dtype=object), (len(scores), len(ids)))],
+            axis=1,
+        )
+        if scores.shape[1] > self.per_user:
+            top = np.argpartition(-scores, self.per_user - 1, axis=1)[:, : self.per_user]
+            scores = np.take_along_axis(scores, top, axis=1)
+            ids = np.take_along_axis(ids, top, axis=1)
+        self._scores, self._ids = scores, ids
+
+    def labels(self) -> List[set]:
+        """Set of applied job ids per user"""
+        return [set(row) for row in self._ids]
+
+
+def ndcg_at_k(ranked_ids: Sequence[str], relevant: set, k: int) -> Optional[float]:
+    """NDCG@k with binary relevance (None when nothing is relevant)"""
+    if not relevant:
+        return None
+    dcg = sum(
+        1.0 / np.log2(rank + 2)
+        for rank, item_id in enumerate(ranked_ids[:k])
+        if item_id in relevant
+    )
+    ideal = sum(1.0 / np.log2(rank + 2) for rank in range(min(len(relevant), k)))
+    return float(dcg / ideal)
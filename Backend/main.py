@@ -14,6 +14,14 @@ from app.core.config import settings
 # from app.core.exceptions import register_exception_handlers
 from app.core.logging_config import get_logger, setup_logging
 from app.db.init_db import init_db
+from app.db.session import SessionLocal, database_status
+from app.services.ann_index import ann_service
+from app.services.embedding_service import embedding_service
+from app.services.embedding_worker import embedding_worker
+from app.services.neighbour_service import neighbour_service
+from app.services.recommendation_service import FULLTEXT
+from app.services.skill_index import skill_index
+from app.services.tfidf_service import tfidf_service
 
 # from dotenv import load_dotenv
 from fastapi import FastAPI, Request
@@ -51,6 +59,36 @@ async def lifespan(app: FastAPI):
     # Example: Initialize database connections, load models, etc.
     await init_db()
 
+    # Fit the corpus-wide TF-IDF model (tfidf lexical backend only), load the
+    # ANN index (if enabled) and skill bitsets, and build missing neighbour
+    # lists up front so the first request doesn't pay
+    db = SessionLocal()
+    try:
+        if settings.LEXICAL_BACKEND != FULLTEXT:
+            tfidf_service.ensure_fitted(db)
+        ann_service.load(db)
+        skill_index.load(db)
+        neighbour_service.ensure_built(db)
+    finally:
+        db.close()
+
+    # Load the embedding model off the event loop; /ready turns healthy once
+    # it has run on every session, so the balancer only routes to warm workers
+    if settings.EMBEDDING_WARMUP:
+        embedding_service.start_warm_up()
+
+    # Drain the embedding queue in this process (python worker.py runs a
+    # standalone worker instead). The in-process ANN index only learns about
+    # items embedded by this process, so it always needs the local worker
+    if settings.EMBEDDING_QUEUE_ENABLED:
+        if ann_service.enabled and not settings.EMBEDDING_QUEUE_IN_PROCESS_WORKER:
+            logger.warning(
+                "In-process ANN index enabled: starting the in-process embedding "
+                "worker despite EMBEDDING_QUEUE_IN_PROCESS_WORKER=false"
+            )
+        if settings.EMBEDDING_QUEUE_IN_PROCESS_WORKER or ann_service.enabled:
+            embedding_worker.start()
+
     if settings.ENVIRONMENT in ["development", "staging", "production"]:
         logger.info("Creating database tables")
         # Base.metadata.create_all(bind=sync_engine)
@@ -59,6 +97,7 @@ async def lifespan(app: FastAPI):
 
     # Shutdown: Clean up resources
     logger.info("Shutting down application...")
+    embedding_worker.stop()
     # Example: Close database connections
     # await close_db()
 
@@ -120,6 +159,23 @@ def create_application() -> FastAPI:
         """Health check endpoint."""
         return {"status": "ok", "version": settings.VERSION}
 
+    # Readiness endpoint for load balancers: 503 until the embedding model is
+    # warm (when EMBEDDING_WARMUP) and the database answers
+    @app.get("/ready")
+    def readiness_check():
+        """Readiness check endpoint."""
+        model = embedding_service.readiness()
+        database = database_status()
+        ready = database["ready"] and (model["warm"] or not settings.EMBEDDING_WARMUP)
+        return JSONResponse(
+            status_code=200 if ready else 503,
+            content={
+                "status": "ready" if ready else "starting",
+                "model": model,
+                "database": database,
+            },
+        )
+
     # Root endpoint (optional)
     @app.get("/", tags=["root"])
     async def read_root():
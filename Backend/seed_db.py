@@ -6,6 +6,7 @@ Usage:
     python seed_db.py              # Seed the database
     python seed_db.py --check      # Check seed status without seeding
     python seed_db.py --force      # Force seed without confirmation
+    python seed_db.py --reembed    # Recompute every stored embedding in batches
 """
 
 import argparse
@@ -29,9 +30,21 @@ def main():
     parser.add_argument(
         "--force", action="store_true", help="Force seed without confirmation"
     )
+    parser.add_argument(
+        "--reembed",
+        action="store_true",
+        help="Recompute every job, resource and user embedding, then exit "
+        "(restart the API afterwards to reload its indexes)",
+    )
 
     args = parser.parse_args()
 
+    if args.reembed:
+        from app.db.embedding_backfill import reembed_all
+
+        reembed_all()
+        return
+
     # Check status
     status = check_seed_status()
     logger.info(f"Current database status:")
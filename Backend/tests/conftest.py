@@ -0,0 +1,83 @@
+"""
+Shared test fixtures.
+
+Tests that need Postgres (with pgvector) take the `db` fixture and are
+skipped when DATABASE_URL is unreachable; point it at a disposable database.
+The embedding model is replaced by a deterministic fake, so no model is
+downloaded and the embedding cache table is left alone.
+"""
+
+import hashlib
+import uuid
+
+import numpy as np
+import pytest
+
+
+class FakeTextEmbedding:
+    """Stand-in for fastembed.TextEmbedding: a fixed unit vector per text"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def embed(self, texts, **kwargs):
+        for text in texts:
+            seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).standard_normal(384).astype(np.float32)
+            yield vector / np.linalg.norm(vector)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Create the tables once, or skip if the database is unreachable"""
+    from app.db.base import Base
+    from app.db.init_db import ensure_vector_extension
+    from app.db.session import database_status, engine
+
+    status = database_status()
+    if not status["ready"]:
+        pytest.skip(f"Database unavailable: {status.get('error')}")
+    ensure_vector_extension()
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture(scope="session")
+def fake_model():
+    """Serve embeddings from FakeTextEmbedding, without the persistent cache"""
+    fastembed = pytest.importorskip("fastembed")
+    from app.services.embedding_cache import embedding_cache
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(fastembed, "TextEmbedding", FakeTextEmbedding)
+        patch.setattr(embedding_cache, "persistent", False)
+        yield
+
+
+@pytest.fixture
+def db(database, fake_model):
+    """Database session; rows registered with db.info["cleanup"] are deleted after the test"""
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    session.info["cleanup"] = []
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for row in reversed(session.info["cleanup"]):
+            session.delete(session.merge(row))
+        session.commit()
+        session.close()
+
+
+@pytest.fixture
+def inline_embeddings(monkeypatch):
+    """Embed inside the CRUD functions instead of queueing for the worker"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "EMBEDDING_QUEUE_ENABLED", False)
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:8]}"
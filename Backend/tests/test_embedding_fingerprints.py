@@ -0,0 +1,175 @@
+"""Re-embedding and keyword index updates are gated on the embedded text"""
+
+import pytest
+
+from app.db.crud.job import create_job, delete_job, update_job
+from app.db.crud.resources import create_resource, delete_resource, update_resource
+from app.db.crud.user import update_user
+from app.db.fulltext import to_search_query
+from app.db.model.embedding_task import EmbeddingTask
+from app.db.model.job import ExperienceLevel, Job, JobType
+from app.db.model.resources import Resource
+from app.db.model.user import User
+from app.services.embedding_service import embedding_service
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_store import recommendation_store
+
+from conftest import unique
+
+
+@pytest.fixture
+def embed_calls(monkeypatch):
+    """Count the single-item embedding calls of the CRUD functions"""
+    calls = []
+    for name in (
+        "generate_job_embedding",
+        "generate_resource_embedding",
+        "generate_user_embedding",
+    ):
+        original = getattr(embedding_service, name)
+
+        def counted(item, original=original):
+            calls.append(item.id)
+            return original(item)
+
+        monkeypatch.setattr(embedding_service, name, counted)
+    return calls
+
+
+@pytest.fixture
+def job(db, inline_embeddings):
+    job = create_job(
+        db,
+        {
+            "title": "Zebrafish Engineer",
+            "description": "Builds aquarium software",
+            "company": "Test Co",
+            "job_type": JobType.FULL_TIME,
+            "recommended_experience_level": ExperienceLevel.ENTRY,
+            "required_skills": ["Python"],
+        },
+    )
+    yield job
+    db.query(EmbeddingTask).filter(EmbeddingTask.item_id == job.id).delete()
+    db.commit()
+    delete_job(db, job.id)
+
+
+@pytest.fixture
+def resource(db, inline_embeddings):
+    resource = create_resource(
+        db,
+        {
+            "name": "Zebrafish Course",
+            "description": "Aquarium software basics",
+            "url": "https://example.com/course",
+            "tags": ["Python"],
+        },
+    )
+    yield resource
+    db.query(EmbeddingTask).filter(EmbeddingTask.item_id == resource.id).delete()
+    db.commit()
+    delete_resource(db, resource.id)
+
+
+def matches(db, model, item_id: str, words: str) -> bool:
+    """Whether the item's full-text document matches the words"""
+    return db.query(model.search_vector.op("@@")(to_search_query(words))).filter(
+        model.id == item_id
+    ).scalar()
+
+
+def test_job_is_reembedded_only_when_its_text_changes(db, job, embed_calls):
+    fingerprint = job.embedding_fingerprint
+    assert fingerprint is not None
+
+    update_job(db, job.id, {"company": "Other Co", "url": "https://example.com/job"})
+    assert embed_calls == []
+    assert job.embedding_fingerprint == fingerprint
+
+    update_job(db, job.id, {"title": "Narwhal Engineer"})
+    assert embed_calls == [job.id]
+    assert job.embedding_fingerprint != fingerprint
+    assert matches(db, Job, job.id, "narwhal")
+
+
+def test_reverted_job_edit_restores_the_search_document(db, job, monkeypatch):
+    from app.core.config import settings
+
+    # Queued: the worker never runs, so the stored embedding keeps matching "A"
+    monkeypatch.setattr(settings, "EMBEDDING_QUEUE_ENABLED", True)
+
+    update_job(db, job.id, {"title": "Narwhal Engineer"})
+    assert matches(db, Job, job.id, "narwhal")
+
+    update_job(db, job.id, {"title": "Zebrafish Engineer"})
+    assert not embedding_service.needs_embedding(job)
+    assert matches(db, Job, job.id, "zebrafish")
+    assert not matches(db, Job, job.id, "narwhal")
+
+
+def test_resource_is_reembedded_only_when_its_text_changes(db, resource, embed_calls):
+    fingerprint = resource.embedding_fingerprint
+
+    update_resource(db, resource.id, {"platform": "Elsewhere", "duration": "2h"})
+    assert embed_calls == []
+    assert resource.embedding_fingerprint == fingerprint
+
+    update_resource(db, resource.id, {"tags": ["Python", "Narwhal"]})
+    assert embed_calls == [resource.id]
+    assert resource.embedding_fingerprint != fingerprint
+    assert matches(db, Resource, resource.id, "narwhal")
+
+
+@pytest.fixture
+def user(db, inline_embeddings):
+    user = User(
+        id=unique("user"),
+        full_name="Fingerprint Test",
+        email=f"{unique('fingerprints')}@example.com",
+        education_level="BSc",
+        preferred_career_track="Testing",
+        hashed_password="-",
+        skills=["Python"],
+    )
+    db.add(user)
+    db.commit()
+    embedding_service.store_embedding(user, embedding_service.generate_user_embedding(user))
+    db.commit()
+    db.info["cleanup"].append(user)
+    return user
+
+
+def test_user_preference_change_refreshes_stored_lists(db, user, embed_calls, monkeypatch):
+    refreshed, bumped = [], []
+    monkeypatch.setattr(
+        recommendation_store, "refresh_user", lambda db, user: refreshed.append(user.id)
+    )
+    monkeypatch.setattr(recommendation_cache, "bump_user", bumped.append)
+
+    update_user(db, user.id, {"bio": "Unrelated to recommendations"})
+    assert (embed_calls, refreshed, bumped) == ([], [], [])
+
+    update_user(db, user.id, {"preferred_job_type": "internship"})
+    assert embed_calls == []
+    assert refreshed == [user.id]
+    assert bumped == [user.id]
+
+
+@pytest.mark.parametrize("queued", [False, True])
+def test_job_filter_change_patches_stored_lists_once(db, job, monkeypatch, queued):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "EMBEDDING_QUEUE_ENABLED", queued)
+    patched = []
+    monkeypatch.setattr(
+        recommendation_store,
+        "on_item_changed",
+        lambda kind, item: patched.append(item.id),
+    )
+
+    update_job(db, job.id, {"job_type": JobType.INTERNSHIP, "title": "Narwhal Intern"})
+    assert patched == [job.id]
+
+    update_job(db, job.id, {"job_type": JobType.FREELANCE})
+    assert patched == [job.id, job.id]
@@ -0,0 +1,106 @@
+"""job_filters, job_filter_columns (SQL) and job_matches_user (Python) must select the same jobs"""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.schemas.user import ExperienceLevel as UserExperienceLevel
+from app.api.schemas.user import PreferredJobLocation, PreferredJobType
+from app.db.model.application import ApplicationList
+from app.db.model.job import ExperienceLevel, Job, JobLocation, JobType
+from app.db.model.user import User
+from app.services.recommendation_service import (
+    job_filter_columns,
+    job_filter_values,
+    job_filters,
+    job_matches_user,
+)
+from sqlalchemy import ARRAY, String, bindparam, func, select, true
+
+from conftest import unique
+
+
+@pytest.fixture
+def catalog(db):
+    """One job per job type, location (or none) and experience level, and a user who applied to one"""
+    jobs = [
+        Job(
+            id=unique("job"),
+            title="Filter test job",
+            description="Filter test",
+            company="Test Co",
+            job_type=job_type,
+            job_location=location,
+            recommended_experience_level=level,
+            required_skills=[],
+        )
+        for job_type, location, level in itertools.product(
+            JobType, [None, *JobLocation], ExperienceLevel
+        )
+    ]
+    user = User(
+        id=unique("user"),
+        full_name="Filter Test",
+        email=f"{unique('filters')}@example.com",
+        education_level="BSc",
+        preferred_career_track="Testing",
+        hashed_password="-",
+    )
+    application = ApplicationList(user_id=user.id, job_id=jobs[0].id)
+    db.add_all([*jobs, user])
+    db.flush()
+    db.add(application)
+    db.commit()
+    db.info["cleanup"].extend([*jobs, user, application])
+    return jobs, user, {jobs[0].id}
+
+
+PREFERENCES = [
+    (None, None, None),
+    (PreferredJobType.FULL_TIME, None, None),
+    (None, PreferredJobLocation.REMOTE, None),
+    (None, None, UserExperienceLevel.STUDENT),
+    (None, None, UserExperienceLevel.JUNIOR),
+    (PreferredJobType.INTERNSHIP, PreferredJobLocation.ON_SITE, UserExperienceLevel.ENTRY),
+]
+
+
+@pytest.mark.parametrize("job_type, location, level", PREFERENCES)
+def test_job_filters_agree_with_job_matches_user(db, catalog, job_type, location, level):
+    jobs, user, applied = catalog
+    preferences = SimpleNamespace(
+        id=user.id,
+        preferred_job_type=job_type,
+        preferred_job_location=location,
+        experience_level=level,
+    )
+    job_ids = [job.id for job in jobs]
+
+    in_sql = {
+        job_id
+        for (job_id,) in db.query(Job.id).filter(Job.id.in_(job_ids), *job_filters(preferences))
+    }
+    in_python = {
+        job.id for job in jobs if job_matches_user(job, preferences, applied=job.id in applied)
+    }
+
+    columns = ("user_id", "job_type", "job_location", "levels")
+    preferences = func.unnest(
+        *(
+            bindparam(name, [value], type_=ARRAY(String))
+            for name, value in zip(columns, (user.id, *job_filter_values(preferences)))
+        )
+    ).table_valued(*columns).render_derived(name="preferences")
+    by_column = {
+        job_id
+        for (job_id,) in db.execute(
+            select(Job.id)
+            .select_from(preferences.join(Job, true()))
+            .where(Job.id.in_(job_ids), *job_filter_columns(preferences))
+        )
+    }
+
+    assert in_sql == in_python
+    assert by_column == in_python
+    assert not in_sql & applied
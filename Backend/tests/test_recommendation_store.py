@@ -0,0 +1,117 @@
+"""Stored recommendation lists (see app/services/recommendation_store.py)"""
+
+import pytest
+
+from app.api.schemas.user import PreferredJobType
+from app.db.crud.job import create_job, delete_job
+from app.db.model.job import ExperienceLevel, JobType
+from app.db.model.user import User
+from app.services.embedding_service import embedding_service
+from app.services.recommendation_store import recommendation_store
+from app.services.tfidf_service import JOBS
+
+from conftest import unique
+
+
+@pytest.fixture
+def jobs(db, inline_embeddings):
+    """Three freelance jobs and one full-time job"""
+    created = [
+        create_job(
+            db,
+            {
+                "title": f"Store test {job_type.value} job {i}",
+                "description": "Python backend work",
+                "company": "Test Co",
+                "job_type": job_type,
+                "recommended_experience_level": ExperienceLevel.STUDENT,
+                "required_skills": ["Python"],
+            },
+        )
+        for i, job_type in enumerate([JobType.FREELANCE] * 3 + [JobType.FULL_TIME])
+    ]
+    yield created
+    for job in created:
+        delete_job(db, job.id)
+
+
+@pytest.fixture
+def freelancer(db, jobs):
+    """A user who only wants freelance work"""
+    user = User(
+        id=unique("user"),
+        full_name="Store Test",
+        email=f"{unique('store')}@example.com",
+        education_level="BSc",
+        preferred_career_track="Backend development",
+        hashed_password="-",
+        skills=["Python"],
+        preferred_job_type=PreferredJobType.FREELANCE,
+    )
+    db.add(user)
+    db.commit()
+    embedding_service.store_embedding(user, embedding_service.generate_user_embedding(user))
+    db.commit()
+    db.info["cleanup"].append(user)
+    return user
+
+
+def test_short_complete_list_is_served_from_the_store(db, jobs, freelancer, monkeypatch):
+    computed = []
+    compute = recommendation_store._compute
+
+    def counted(*args):
+        computed.append(args[2:])
+        return compute(*args)
+
+    monkeypatch.setattr(recommendation_store, "_compute", counted)
+    first = recommendation_store.get_recommendations(db, freelancer, JOBS, 10)
+    second = recommendation_store.get_recommendations(db, freelancer, JOBS, 10)
+
+    assert first and all(item.job_type == JobType.FREELANCE for item, _ in first)
+    assert [item.id for item, _ in second] == [item.id for item, _ in first]
+    assert len(computed) == 1
+
+
+def test_fulltext_job_write_only_invalidates_lists_it_can_reach(
+    db, jobs, freelancer, monkeypatch
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "LEXICAL_BACKEND", "fulltext")
+    monkeypatch.setattr(settings, "RECOMMENDATION_STORE_SIZE", 2)
+    computed = []
+    compute = recommendation_store._compute
+
+    def counted(*args):
+        computed.append(args[2:])
+        return compute(*args)
+
+    monkeypatch.setattr(recommendation_store, "_compute", counted)
+
+    def write_job(job_type):
+        job = create_job(
+            db,
+            {
+                "title": f"Store test new {job_type.value} job",
+                "description": "Python backend work",
+                "company": "Test Co",
+                "job_type": job_type,
+                "recommended_experience_level": ExperienceLevel.STUDENT,
+                "required_skills": ["Python"],
+            },
+        )
+        jobs.append(job)  # Deleted by the fixture
+
+    recommendation_store.get_recommendations(db, freelancer, JOBS, 2)
+    assert len(computed) == 1
+
+    # Not eligible for a freelancer: the full list is left fresh
+    write_job(JobType.FULL_TIME)
+    recommendation_store.get_recommendations(db, freelancer, JOBS, 2)
+    assert len(computed) == 1
+
+    # Eligible and sharing the user's words: the list is recomputed
+    write_job(JobType.FREELANCE)
+    recommendation_store.get_recommendations(db, freelancer, JOBS, 2)
+    assert len(computed) == 2
@@ -0,0 +1,40 @@
+"""Skill spelling normalization (see app/services/skill_dictionary.py)"""
+
+import pytest
+
+from app.services.skill_dictionary import normalize_skill, version_stem
+
+
+@pytest.mark.parametrize(
+    "spelling, key",
+    [
+        ("Python ", "python"),
+        ("  Node   JS", "node js"),
+        ("C++", "c++"),
+    ],
+)
+def test_normalize_skill_folds_case_and_whitespace(spelling, key):
+    assert normalize_skill(spelling) == key
+
+
+@pytest.mark.parametrize(
+    "key, stem",
+    [
+        ("python3", "python"),
+        ("python 3.11", "python"),
+        ("html5", "html"),
+        ("css3", "css"),
+        ("c++17", "c++"),
+        ("angular v2", "angular"),
+        ("vue 3", "vue"),
+        ("kotlin 1.9", "kotlin"),
+        ("spring boot 3.2", "spring boot"),
+    ],
+)
+def test_version_stem_drops_versions_of_known_or_dotted_skills(key, stem):
+    assert version_stem(key) == stem
+
+
+@pytest.mark.parametrize("key", ["s3", "ec2", "web3", "auth0", "d3", "kotlin 2", "python"])
+def test_version_stem_keeps_names_ending_in_digits(key):
+    assert version_stem(key) is None
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Standalone embedding worker CLI.
+
+Usage:
+    python worker.py            # Process embedding tasks until interrupted
+    python worker.py --once     # Drain the ready tasks, then exit
+    python worker.py --reconcile --once
+                                # Queue missing/stale embeddings, drain, exit
+
+Run with EMBEDDING_QUEUE_IN_PROCESS_WORKER=false on the API processes to move
+all embedding work here; any number of workers can run side by side.
+
+Refuses to start while the API uses an in-process ANN index (ANN_INDEX_ENABLED,
+ANN_BINARY_ENABLED or EMBEDDING_STORAGE=int8): only the process that embeds
+an item adds it to its index, so items embedded here would not be found by
+the API until it restarts. Keep the in-process worker in that configuration.
+"""
+
+import argparse
+import logging
+
+# Simple logging setup for CLI
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+from app.services.ann_index import ann_service
+from app.services.embedding_worker import embedding_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process background embedding tasks")
+    parser.add_argument(
+        "--once", action="store_true", help="Drain the ready tasks, then exit"
+    )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="First queue every row whose embedding is missing or stale "
+        "(text fingerprint or model changed)",
+    )
+
+    args = parser.parse_args()
+
+    if ann_service.enabled:
+        parser.error(
+            "the API uses an in-process ANN index (ANN_INDEX_ENABLED, "
+            "ANN_BINARY_ENABLED or EMBEDDING_STORAGE=int8), which only the "
+            "embedding process updates; run the in-process worker instead "
+            "(EMBEDDING_QUEUE_IN_PROCESS_WORKER=true)"
+        )
+
+    if args.reconcile:
+        from app.db.embedding_backfill import reconcile_embeddings
+
+        counts = reconcile_embeddings()
+        logger.info(f"Reconciled embeddings: {counts}")
+
+    if args.once:
+        claimed = embedding_worker.drain()
+        logger.info(f"Processed {claimed} embedding tasks")
+        return
+
+    logger.info("Embedding worker started")
+    try:
+        embedding_worker.run()
+    except KeyboardInterrupt:
+        logger.info("Embedding worker stopped")
+
+
+if __name__ == "__main__":
+    main()